@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from .storage import CompletedDownload, Storage, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+class InputCache:
+    """
+    워커 로컬 디스크에 두는 입력 오디오 read-through 캐시.
+
+    - key + ETag 로 항목을 구분하므로, 같은 key 에 새 파일이 올라오면 자동으로 miss
+    - 항목의 mtime 을 마지막 사용 시각으로 쓰는 LRU (Celery prefork 자식들끼리도 공유)
+    - 전체 크기가 max_bytes 를 넘으면 오래 안 쓴 항목부터 삭제
+    """
+
+    def __init__(self, root: str | Path | None = None, max_bytes: int | None = None):
+        self.root = Path(root or settings.DRUM_INPUT_CACHE_DIR)
+        self.max_bytes = settings.DRUM_INPUT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key: str, etag: str) -> Path:
+        digest = hashlib.sha1(f"{key}\0{etag}".encode("utf-8")).hexdigest()
+        return self.root / f"{digest}{Path(key).suffix}"
+
+    def fetch(self, key: str, local_path: str | Path, storage: Storage | None = None):
+        """
+        key 를 local_path 로 가져오는 다운로드 객체를 반환.
+        캐시 hit 이면 네트워크 없이 바로 완료된 다운로드를,
+        miss 면 storage 다운로드를 감싸 완료 시(wait) 캐시에 저장하는 객체를 돌려준다.
+        """
+        storage = storage or get_storage()
+        local_path = Path(local_path)
+
+        if self.max_bytes <= 0:
+            return storage.start_download(key, local_path)
+
+        info = storage.head(key)
+        entry = self._entry_path(key, info["etag"])
+
+        if entry.exists():
+            try:
+                os.utime(entry)
+                _link_or_copy(entry, local_path)
+                logger.info("[INPUT CACHE] HIT key=%s bytes=%d", key, info["size"])
+                return CompletedDownload(local_path)
+            except FileNotFoundError:
+                # 다른 프로세스가 방금 evict 한 경우
+                pass
+
+        logger.info("[INPUT CACHE] MISS key=%s bytes=%d", key, info["size"])
+        return _CachingDownload(self, storage.start_download(key, local_path), entry)
+
+    def store(self, local_path: Path, entry: Path) -> None:
+        size = local_path.stat().st_size
+        if size > self.max_bytes:
+            return
+
+        # 임시 이름으로 만든 뒤 rename 해서 다른 프로세스가 반쯤 쓴 파일을 보지 않게 함
+        tmp = entry.with_name(f".{entry.name}.{uuid.uuid4().hex}")
+        try:
+            _link_or_copy(local_path, tmp)
+            os.replace(tmp, entry)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            for path in self.root.iterdir():
+                if path.name.startswith("."):
+                    continue
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                logger.info("[INPUT CACHE] EVICT %s bytes=%d", path.name, size)
+
+
+class _CachingDownload:
+    # 다운로드가 끝나면(wait) 받은 파일을 캐시에 넣는 래퍼
+
+    def __init__(self, cache: InputCache, download, entry: Path):
+        self._cache = cache
+        self._download = download
+        self._entry = entry
+        self._stored = False
+
+    @property
+    def finished_at(self):
+        return self._download.finished_at
+
+    def open_stream(self):
+        return self._download.open_stream()
+
+    def wait(self) -> Path:
+        local_path = Path(self._download.wait())
+        if not self._stored:
+            self._stored = True
+            try:
+                self._cache.store(local_path, self._entry)
+            except OSError as e:
+                logger.warning("[INPUT CACHE] store failed %s: %s", self._entry, e)
+        return local_path
+
+    def close(self) -> None:
+        self._download.close()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    # 같은 파일시스템이면 하드링크(복사 없음), 아니면 복사
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+_input_cache: InputCache | None = None
+_input_cache_lock = threading.Lock()
+
+
+def get_input_cache() -> InputCache:
+    global _input_cache
+
+    with _input_cache_lock:
+        if _input_cache is None:
+            _input_cache = InputCache()
+        return _input_cache
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 작업 공간 디렉터리 이름: {prefix}.{pid}.{random} (pid 는 로그 / 디버깅용)
+# 주인 프로세스는 작업 공간의 OWNER_LOCK_FILE 에 flock 을 쥐고 있고, 프로세스가 죽으면 커널이 풀어 준다.
+# lock 을 잡을 수 있는 작업 공간이 고아(orphan). pid 재사용 / 다른 pid namespace 와 상관없이 판단된다
+RESERVE_FILE = ".reserve"
+OWNER_LOCK_FILE = ".owner.lock"
+# 여유 공간 확인 + 예약을 같은 호스트의 모든 워커 프로세스(prefork 포함) 사이에서 한 번에 하나씩 (root 아래)
+ADMISSION_LOCK_FILE = ".admission.lock"
+
+
+class ScratchSpaceError(Exception):
+    pass
+
+
+class ScratchSpaceFull(ScratchSpaceError):
+    # 디스크 여유 공간이 부족해 새 작업 공간을 만들 수 없음 (잠시 뒤 재시도)
+    pass
+
+
+class ScratchBudgetExceeded(ScratchSpaceError):
+    # job 하나가 작업 공간 한도(budget)를 넘게 사용함
+    pass
+
+
+class ScratchSpace:
+    """
+    job 별 임시 작업 공간 관리자.
+
+    - workspace(prefix, reserve_bytes) 로 job 마다 작업 디렉터리를 만들고, 끝나면 cleanup()
+    - 디스크 여유 공간 - (다른 작업 공간이 아직 쓰지 않은 예약분) - reserve_bytes 가
+      min_free_bytes 보다 적으면 ScratchSpaceFull
+    - 작은 중간 산출물은 RAM(tmpfs) 디렉터리, 큰 것은 디스크 디렉터리 (Workspace.dir_for)
+    - 주인 프로세스가 owner lock 을 놓은 작업 공간은 collect_orphans() 로 정리 (오래 걸리는 job 이라도 살아 있으면 두고)
+    """
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        ram_root: str | Path | None = None,
+        ram_max_bytes: int | None = None,
+        job_max_bytes: int | None = None,
+        min_free_bytes: int | None = None,
+    ):
+        self.root = Path(root or settings.DRUM_SCRATCH_DIR)
+        ram_root = settings.DRUM_SCRATCH_RAM_DIR if ram_root is None else ram_root
+        self.ram_root = Path(ram_root) if ram_root else None
+        self.ram_max_bytes = settings.DRUM_SCRATCH_RAM_MAX_BYTES if ram_max_bytes is None else ram_max_bytes
+        self.job_max_bytes = settings.DRUM_SCRATCH_JOB_MAX_BYTES if job_max_bytes is None else job_max_bytes
+        self.min_free_bytes = settings.DRUM_SCRATCH_MIN_FREE_BYTES if min_free_bytes is None else min_free_bytes
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.ram_root is not None:
+            try:
+                self.ram_root.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning("[SCRATCH] RAM tier disabled %s: %s", self.ram_root, e)
+                self.ram_root = None
+
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+
+    def workspace(self, prefix: str, reserve_bytes: int = 0, max_bytes: int | None = None) -> "Workspace":
+        """
+        새 작업 공간. reserve_bytes 는 이 job 이 쓸 것으로 예상하는 디스크 용량으로,
+        사용량이 그만큼 찰 때까지 다른 job 의 여유 공간 계산에서 미리 빼 둔다.
+        """
+        self._maybe_collect_orphans()
+
+        # threading.Lock 은 같은 프로세스의 스레드끼리, flock 은 프로세스끼리
+        with self._lock, _file_lock(self.root / ADMISSION_LOCK_FILE):
+            free = shutil.disk_usage(self.root).free
+            reserved = self._outstanding_reservations()
+            if free - reserved - reserve_bytes < self.min_free_bytes:
+                raise ScratchSpaceFull(
+                    f"not enough scratch space: free={free} reserved={reserved} "
+                    f"need={reserve_bytes} min_free={self.min_free_bytes}"
+                )
+
+            name = f"{prefix}.{os.getpid()}.{uuid.uuid4().hex[:8]}"
+            disk_dir = self.root / name
+            disk_dir.mkdir()
+            owner_fd = _hold_lock(disk_dir / OWNER_LOCK_FILE)
+            (disk_dir / RESERVE_FILE).write_text(str(reserve_bytes))
+
+        ram_dir = self.ram_root / name if self.ram_root is not None else None
+        return Workspace(self, disk_dir, ram_dir, self.job_max_bytes if max_bytes is None else max_bytes, owner_fd)
+
+    def ram_available(self) -> int:
+        # RAM 디렉터리에 더 넣을 수 있는 바이트 수 (한도와 tmpfs 실제 여유 중 작은 값).
+        # 작업 공간이 예약해 두고 아직 쓰지 않은 용량도 쓰는 중으로 본다
+        if self.ram_root is None:
+            return 0
+        used = claimed = 0
+        for path in self.ram_root.iterdir():
+            size = _tree_size(path)
+            used += size
+            claimed += max(size, _reserved_bytes(path))
+        free = shutil.disk_usage(self.ram_root).free - (claimed - used)
+        return max(0, min(self.ram_max_bytes - claimed, free))
+
+    def reserve_ram(self, ram_dir: Path, size: int) -> bool:
+        """
+        ram_dir 에 size 바이트를 더 쓸 수 있으면 예약하고 True.
+        확인 + 예약은 디스크 작업 공간처럼 admission lock 안에서 → 여러 워커가 같은 여유 공간을 보고 넘치게 쓰지 않는다.
+        """
+        with self._lock, _file_lock(self.root / ADMISSION_LOCK_FILE):
+            if size > self.ram_available():
+                return False
+            ram_dir.mkdir(exist_ok=True)
+            current = max(_tree_size(ram_dir), _reserved_bytes(ram_dir))
+            (ram_dir / RESERVE_FILE).write_text(str(current + size))
+        return True
+
+    def collect_orphans(self) -> int:
+        # 주인 프로세스가 없는 작업 공간 삭제. 지운 개수 반환
+        now = time.time()
+        removed = 0
+
+        # 만드는 중(owner lock 을 잡기 전)인 작업 공간을 고아로 보지 않도록 admission lock 안에서
+        with self._lock, _file_lock(self.root / ADMISSION_LOCK_FILE):
+            for root in (self.root, self.ram_root):
+                if root is None or not root.exists():
+                    continue
+                for path in root.iterdir():
+                    if path.name.startswith("."):
+                        continue
+                    try:
+                        age = now - path.stat().st_mtime
+                    except FileNotFoundError:
+                        continue
+                    # RAM 디렉터리의 주인은 같은 이름의 디스크 작업 공간의 owner lock 으로 판단.
+                    # 오래됐어도 주인이 살아 있으면(긴 job) 지우지 않는다
+                    if _owner_alive(self.root / path.name):
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+                    logger.info("[SCRATCH] removed orphan %s (age=%ds)", path, age)
+
+        self._last_gc = time.monotonic()
+        return removed
+
+    def _maybe_collect_orphans(self) -> None:
+        if time.monotonic() - self._last_gc < settings.DRUM_SCRATCH_GC_INTERVAL:
+            return
+        try:
+            self.collect_orphans()
+        except OSError as e:
+            logger.warning("[SCRATCH] orphan collection failed: %s", e)
+
+    def _outstanding_reservations(self) -> int:
+        # 살아 있는 작업 공간들이 예약했지만 아직 쓰지 않은 용량의 합
+        total = 0
+        for path in self.root.iterdir():
+            if path.name.startswith("."):
+                # admission lock 파일
+                continue
+            total += max(0, _reserved_bytes(path) - _tree_size(path))
+        return total
+
+
+class Workspace:
+    """
+    job 하나의 작업 공간. disk_dir 은 항상 있고, ram_dir 은 RAM tier 가 켜져 있을 때만 쓴다.
+    with 블록으로 쓰면 끝날 때 cleanup().
+    """
+
+    def __init__(
+        self,
+        space: ScratchSpace,
+        disk_dir: Path,
+        ram_dir: Path | None,
+        max_bytes: int,
+        owner_fd: int | None = None,
+    ):
+        self.space = space
+        self.disk_dir = disk_dir
+        self.ram_dir = ram_dir
+        self.max_bytes = max_bytes
+        # 작업 공간을 쓰는 동안 쥐고 있는 owner lock (cleanup 에서 놓음)
+        self._owner_fd = owner_fd
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
+
+    def dir_for(self, size_hint: int | None) -> Path:
+        # 예상 크기를 RAM tier 에 예약할 수 있으면 RAM 디렉터리, 모르거나 크면 디스크 디렉터리
+        if self.ram_dir is not None and size_hint is not None and self.space.reserve_ram(self.ram_dir, size_hint):
+            return self.ram_dir
+        return self.disk_dir
+
+    def usage(self) -> int:
+        return _tree_size(self.disk_dir) + (_tree_size(self.ram_dir) if self.ram_dir is not None else 0)
+
+    def check_budget(self) -> int:
+        # 현재 사용량. 한도를 넘었으면 ScratchBudgetExceeded
+        used = self.usage()
+        if used > self.max_bytes:
+            raise ScratchBudgetExceeded(
+                f"job scratch usage {used} bytes exceeds budget {self.max_bytes} bytes"
+            )
+        return used
+
+    def cleanup(self) -> None:
+        for path in (self.disk_dir, self.ram_dir):
+            if path is not None and path.exists():
+                shutil.rmtree(path, ignore_errors=True)
+        if self._owner_fd is not None:
+            os.close(self._owner_fd)
+            self._owner_fd = None
+        logger.info("[SCRATCH] workspace removed: %s", self.disk_dir.name)
+
+
+@contextmanager
+def _file_lock(path: Path):
+    # path 에 대한 배타 flock (프로세스 사이). 블록이 끝나면 fd 를 닫아 놓는다
+    fd = _hold_lock(path)
+    try:
+        yield
+    finally:
+        os.close(fd)
+
+
+def _hold_lock(path: Path) -> int:
+    # path 를 열어 배타 flock 을 잡고 fd 반환 (닫거나 프로세스가 죽으면 풀림)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _owner_alive(disk_dir: Path) -> bool:
+    # 누가 disk_dir 의 owner lock 을 쥐고 있으면 True. lock 파일이 없으면(작업 공간이 없음) False
+    try:
+        fd = os.open(disk_dir / OWNER_LOCK_FILE, os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def _reserved_bytes(path: Path) -> int:
+    # 작업 공간이 RESERVE_FILE 로 예약해 둔 바이트 수 (없으면 0)
+    try:
+        return int((path / RESERVE_FILE).read_text())
+    except (OSError, ValueError):
+        return 0
+
+
+def _tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.stat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+_scratch_space: ScratchSpace | None = None
+_scratch_space_lock = threading.Lock()
+
+
+def get_scratch_space() -> ScratchSpace:
+    global _scratch_space
+
+    with _scratch_space_lock:
+        if _scratch_space is None:
+            _scratch_space = ScratchSpace()
+        return _scratch_space
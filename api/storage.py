@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .utils_s3 import (
+    RangedDownload,
+    ResultUploader,
+    create_presigned_get_url,
+    get_s3_client,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Storage(ABC):
+    """
+    입력 오디오 / 결과물 저장소 인터페이스.
+
+    - head(key)                       → {"size", "etag"}
+    - content_hash(key)               → 내용이 같으면 같은 값 (중복 job 판별용)
+    - read_range(key, start, length)  → 일부 구간 bytes (헤더로 길이 추정용)
+    - start_download(key, local_path) → open_stream() / wait() / close() 를 제공하는 다운로드
+    - uploader()                      → submit() / wait() 를 제공하는 업로더
+    - url(key, expires_in, disposition) → 다운로드 URL
+    - delete(key)                     → 객체 삭제 (단계 사이 중간 산출물 정리용)
+    """
+
+    name = ""
+
+    @abstractmethod
+    def head(self, key: str) -> dict:
+        ...
+
+    @abstractmethod
+    def content_hash(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        ...
+
+    @abstractmethod
+    def start_download(self, key: str, local_path: str | Path):
+        ...
+
+    @abstractmethod
+    def uploader(self):
+        ...
+
+    @abstractmethod
+    def url(self, key: str, expires_in: int = 600, disposition: str | None = None) -> str:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class S3Storage(Storage):
+    name = "s3"
+
+    def __init__(self, bucket: str | None = None):
+        self.bucket = bucket or settings.AWS_S3_BUCKET_NAME
+        if not self.bucket:
+            raise ImproperlyConfigured("AWS_STORAGE_BUCKET_NAME is not set in settings.")
+
+    def head(self, key: str) -> dict:
+        head = get_s3_client().head_object(Bucket=self.bucket, Key=key)
+        return {
+            "size": int(head["ContentLength"]),
+            "etag": head.get("ETag", "").strip('"'),
+        }
+
+    def content_hash(self, key: str) -> str:
+        # S3 ETag 는 내용의 MD5 (multipart 면 파트 MD5 들의 MD5 + "-N") 라 내용이 같으면 같다
+        return self.head(key)["etag"]
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        resp = get_s3_client().get_object(
+            Bucket=self.bucket,
+            Key=key,
+            Range=f"bytes={start}-{start + length - 1}",
+        )
+        return resp["Body"].read()
+
+    def start_download(self, key: str, local_path: str | Path) -> RangedDownload:
+        return RangedDownload(key, local_path, bucket=self.bucket).start()
+
+    def uploader(self) -> ResultUploader:
+        return ResultUploader(bucket=self.bucket)
+
+    def url(self, key: str, expires_in: int = 600, disposition: str | None = None) -> str:
+        return create_presigned_get_url(key, expires_in=expires_in, disposition=disposition)
+
+    def delete(self, key: str) -> None:
+        get_s3_client().delete_object(Bucket=self.bucket, Key=key)
+
+
+class LocalStorage(Storage):
+    """
+    로컬 디렉터리를 S3 버킷처럼 사용하는 백엔드.
+    AWS 없이 파이프라인 전체를 돌리거나 벤치마크할 때 사용한다.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root or settings.DRUM_LOCAL_STORAGE_ROOT)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"잘못된 key 입니다: {key}")
+        return path
+
+    def head(self, key: str) -> dict:
+        st = self.path(key).stat()
+        return {"size": st.st_size, "etag": f"{st.st_mtime_ns:x}-{st.st_size:x}"}
+
+    def content_hash(self, key: str) -> str:
+        # 로컬 etag 는 mtime 기반이라 내용 해시를 직접 계산
+        digest = hashlib.sha256()
+        with open(self.path(key), "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def start_download(self, key: str, local_path: str | Path) -> "CompletedDownload":
+        local_path = Path(local_path)
+        shutil.copyfile(self.path(key), local_path)
+        return CompletedDownload(local_path)
+
+    def uploader(self) -> "LocalUploader":
+        return LocalUploader(self)
+
+    def url(self, key: str, expires_in: int = 600, disposition: str | None = None) -> str:
+        return self.path(key).as_uri()
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+
+class CompletedDownload:
+    # 이미 로컬에 모두 존재하는 파일을 RangedDownload 와 같은 모양으로 감싼 것
+
+    def __init__(self, local_path: str | Path):
+        self.local_path = Path(local_path)
+        self.finished_at = time.time()
+
+    def open_stream(self) -> "LocalFileStream":
+        return LocalFileStream(self.local_path)
+
+    def wait(self) -> Path:
+        return self.local_path
+
+    def close(self) -> None:
+        pass
+
+
+class LocalFileStream(io.FileIO):
+    def __init__(self, path: str | Path):
+        super().__init__(str(path), "rb")
+        self.local_path = Path(path)
+
+    def wait_complete(self) -> Path:
+        return self.local_path
+
+
+class LocalUploader:
+    # ResultUploader 와 같은 인터페이스로 LocalStorage 에 파일을 복사
+
+    def __init__(self, storage: LocalStorage):
+        self.storage = storage
+        self._futures: list[Future] = []
+
+    def submit(self, local_path: str | Path, key: str, content_type: str | None = None) -> Future:
+        local_path = Path(local_path)
+        future: Future = Future()
+
+        started = time.perf_counter()
+        try:
+            dest = self.storage.path(key)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(local_path, dest)
+            future.set_result({
+                "key": key,
+                "filename": local_path.name,
+                "contentType": content_type,
+                "bytes": local_path.stat().st_size,
+                "seconds": round(time.perf_counter() - started, 3),
+            })
+        except Exception as e:
+            future.set_exception(e)
+
+        self._futures.append(future)
+        return future
+
+    def wait(self) -> list[dict]:
+        return [future.result() for future in self._futures]
+
+
+STORAGE_BACKENDS = {
+    "s3": S3Storage,
+    "local": LocalStorage,
+}
+
+_storage: Storage | None = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    # settings.DRUM_STORAGE_BACKEND 에 맞는 저장소를 프로세스당 하나만 만든다
+    global _storage
+
+    with _storage_lock:
+        if _storage is None or _storage.name != settings.DRUM_STORAGE_BACKEND:
+            backend = STORAGE_BACKENDS.get(settings.DRUM_STORAGE_BACKEND)
+            if backend is None:
+                raise ImproperlyConfigured(
+                    f"Unknown DRUM_STORAGE_BACKEND: {settings.DRUM_STORAGE_BACKEND}"
+                )
+            _storage = backend()
+        return _storage
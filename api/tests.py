@@ -1,3 +1,414 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
 
-# Create your tests here.
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from api import storage as storage_module
+from api.input_cache import InputCache
+from api.scratch import OWNER_LOCK_FILE, ScratchBudgetExceeded, ScratchSpace, ScratchSpaceFull
+from api.storage import CompletedDownload, LocalStorage, Storage, get_storage
+from api.utils_s3 import RangedDownload
+
+# 웹 프로세스에서 import 되면 안 되는 무거운 모듈 (드럼 파이프라인 전용)
+HEAVY_MODULES = ("torch", "torchaudio", "demucs", "librosa", "numba")
+
+
+class WebImportTests(SimpleTestCase):
+    def test_urlconf_does_not_import_heavy_modules(self):
+        # 테스트 프로세스에는 이미 import 된 모듈이 있을 수 있으므로 새 프로세스에서 URLconf 만 로드
+        code = (
+            "import json, sys, django; django.setup(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print(json.dumps(sorted(sys.modules)))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"}
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        loaded = set(json.loads(result.stdout.splitlines()[-1]))
+
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        self.assertEqual(heavy, [], f"web URLconf imports heavy modules: {heavy}")
+
+
+class _FakeS3:
+    # head_object / get_object(Range) 만 흉내 내는 S3 클라이언트. gates[i] 가 있으면 i 번째 청크는 set() 될 때까지 대기
+    def __init__(self, data: bytes, chunk_size: int, gates=None, fail_chunk=None):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.gates = gates or {}
+        self.fail_chunk = fail_chunk
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.data), "ETag": '"etag-1"'}
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = (int(value) for value in Range.removeprefix("bytes=").split("-"))
+        with self._lock:
+            self.ranges.append((start, end))
+        index = start // self.chunk_size
+        if index in self.gates:
+            self.gates[index].wait(5)
+        if index == self.fail_chunk:
+            raise OSError("connection reset")
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+
+class RangedDownloadTests(SimpleTestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.path = tmp / "input.wav"
+        self.data = bytes(range(256)) * 4 + b"tail"
+
+    def _start(self, s3):
+        download = RangedDownload("uploads/a.wav", self.path, s3=s3, bucket="b", chunk_size=100, max_workers=3)
+        self.addCleanup(download.close)
+        return download.start()
+
+    def test_chunks_cover_object_once(self):
+        s3 = _FakeS3(self.data, 100)
+        download = self._start(s3)
+
+        self.assertEqual(download.wait().read_bytes(), self.data)
+        self.assertEqual(download.etag, "etag-1")
+        self.assertEqual(sorted(s3.ranges), [(i, min(i + 99, len(self.data) - 1)) for i in range(0, len(self.data), 100)])
+        self.assertIsNotNone(download.finished_at)
+
+    def test_stream_reads_arrived_bytes_before_download_finishes(self):
+        later = threading.Event()
+        s3 = _FakeS3(self.data, 100, gates={i: later for i in range(1, 11)})
+        download = self._start(s3)
+
+        with download.open_stream() as stream:
+            # 첫 청크만 도착한 상태에서도 앞부분은 바로 읽힌다
+            self.assertEqual(stream.read(100), self.data[:100])
+            self.assertIsNone(download.finished_at)
+
+            later.set()
+            self.assertEqual(stream.read(), self.data[100:])
+            stream.seek(-4, io.SEEK_END)
+            self.assertEqual(stream.read(), b"tail")
+
+    def test_chunk_error_reaches_reader_and_wait(self):
+        s3 = _FakeS3(self.data, 100, fail_chunk=2)
+        download = self._start(s3)
+
+        with self.assertRaises(OSError):
+            with download.open_stream() as stream:
+                stream.read()
+        with self.assertRaises(OSError):
+            download.wait()
+
+    def test_close_cancels_pending_chunks_and_wakes_readers(self):
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+        s3 = _FakeS3(self.data, 100, gates={i: gate for i in range(1, 11)})
+        download = self._start(s3)
+        self.assertEqual(download.read_at(0, 10), self.data[:10])
+
+        errors = []
+
+        def read():
+            try:
+                download.read_at(150, 10)
+            except OSError as e:
+                errors.append(e)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        closer = threading.Thread(target=download.close)
+        closer.start()
+
+        # 받는 중인 청크를 기다리던 reader 는 close() 로 깨어나 실패한다
+        reader.join(5)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(len(errors), 1)
+
+        gate.set()
+        closer.join(5)
+        self.assertFalse(closer.is_alive())
+        # 요청하지 않은 청크는 취소된다
+        self.assertLess(len(s3.ranges), 11)
+
+
+class InputCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.tmp = tmp
+        self.storage = LocalStorage(tmp / "storage")
+        self.cache = InputCache(tmp / "cache", max_bytes=250)
+        for name in ("a", "b", "c"):
+            self._put(f"uploads/{name}.wav", name.encode() * 100)
+
+    def _put(self, key, data):
+        path = self.storage.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def _fetch(self, key):
+        # 작업 공간마다 새 경로로 받는 것처럼 매번 다른 로컬 경로
+        local_path = self.tmp / f"{uuid.uuid4().hex}.wav"
+        with mock.patch.object(self.storage, "start_download", wraps=self.storage.start_download) as start:
+            download = self.cache.fetch(key, local_path, self.storage)
+            path = download.wait()
+            download.close()
+        return path.read_bytes(), start.call_count, download
+
+    def test_second_fetch_is_served_from_cache(self):
+        data, downloads, _ = self._fetch("uploads/a.wav")
+        self.assertEqual((data, downloads), (b"a" * 100, 1))
+
+        data, downloads, download = self._fetch("uploads/a.wav")
+        self.assertEqual((data, downloads), (b"a" * 100, 0))
+        self.assertIsInstance(download, CompletedDownload)
+
+    def test_new_upload_to_same_key_misses(self):
+        self._fetch("uploads/a.wav")
+        self._put("uploads/a.wav", b"new" * 10)
+
+        data, downloads, _ = self._fetch("uploads/a.wav")
+        self.assertEqual((data, downloads), (b"new" * 10, 1))
+
+    def test_evicts_least_recently_used_entry(self):
+        self._fetch("uploads/a.wav")
+        self._fetch("uploads/b.wav")
+        entries = sorted(self.cache.root.iterdir())
+        for age, entry in enumerate(entries):
+            os.utime(entry, (1000 + age, 1000 + age))
+        # a 를 다시 쓰면 b 가 가장 오래 안 쓴 항목
+        self._fetch("uploads/a.wav")
+        self._fetch("uploads/c.wav")
+
+        self.assertEqual(self._fetch("uploads/a.wav")[1], 0)
+        self.assertEqual(self._fetch("uploads/c.wav")[1], 0)
+        self.assertEqual(self._fetch("uploads/b.wav")[1], 1)
+
+    def test_disabled_cache_downloads_every_time(self):
+        self.cache.max_bytes = 0
+        self.assertEqual(self._fetch("uploads/a.wav")[1], 1)
+        self.assertEqual(self._fetch("uploads/a.wav")[1], 1)
+        self.assertEqual(list(self.cache.root.iterdir()), [])
+
+
+class StorageBackendTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(storage_module, "_storage", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_backend_is_chosen_by_setting(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        with override_settings(DRUM_STORAGE_BACKEND="local", DRUM_LOCAL_STORAGE_ROOT=tmp):
+            self.assertIsInstance(get_storage(), LocalStorage)
+            self.assertIs(get_storage(), get_storage())
+
+    def test_unknown_backend(self):
+        with override_settings(DRUM_STORAGE_BACKEND="ftp"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_storage()
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class HeadOnlyStorage(Storage):
+            def head(self, key):
+                return {"size": 0, "etag": ""}
+
+        with self.assertRaises(TypeError):
+            HeadOnlyStorage()
+
+
+@override_settings(AWS_S3_BUCKET_NAME="bucket", MAX_UPLOAD_SIZE=50 * 1024 * 1024, MULTIPART_UPLOAD_PART_SIZE=8 * 1024 * 1024)
+class MultipartUploadTests(SimpleTestCase):
+    def setUp(self):
+        self.s3 = mock.Mock()
+        self.s3.create_multipart_upload.return_value = {"UploadId": "up-1"}
+        self.s3.generate_presigned_url.side_effect = lambda ClientMethod, Params, ExpiresIn: f"https://s3/{Params['PartNumber']}"
+        self.s3.head_object.return_value = {"ContentLength": 20 * 1024 * 1024}
+        patcher = mock.patch("api.views_uploads.get_s3_client", return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.cookies["guest_id"] = "guest-1"
+        self.key = "uploads/guest-1/abc.wav"
+
+    def _post(self, action, body):
+        return self.client.post(f"/api/uploads/multipart/{action}", body, content_type="application/json")
+
+    def _complete(self, **body):
+        return self._post("complete", {
+            "key": self.key,
+            "uploadId": "up-1",
+            "parts": [{"partNumber": 2, "etag": "e2"}, {"partNumber": 1, "etag": "e1"}],
+            **body,
+        })
+
+    def test_create_returns_guest_key_and_part_plan(self):
+        response = self._post("create", {"filename": "song.wav", "size": 20 * 1024 * 1024, "contentType": "audio/wav"})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["key"].startswith("uploads/guest-1/"))
+        self.assertTrue(body["key"].endswith(".wav"))
+        self.assertEqual((body["uploadId"], body["partCount"]), ("up-1", 3))
+
+    def test_create_rejects_oversized_file(self):
+        response = self._post("create", {"filename": "song.wav", "size": 51 * 1024 * 1024, "contentType": "audio/wav"})
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "INVALID_SIZE"))
+        self.s3.create_multipart_upload.assert_not_called()
+
+    def test_presign_limits_part_numbers_to_max_upload_size(self):
+        ok = self._post("presign", {"key": self.key, "uploadId": "up-1", "partNumbers": [1, 2, 7]})
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual(sorted(ok.json()["urls"]), ["1", "2", "7"])
+
+        too_many = self._post("presign", {"key": self.key, "uploadId": "up-1", "partNumbers": [8]})
+        self.assertEqual((too_many.status_code, too_many.json()["error"]), (400, "INVALID_PART_NUMBERS"))
+
+    def test_other_guests_key_is_forbidden(self):
+        response = self._post("presign", {"key": "uploads/guest-2/abc.wav", "uploadId": "up-1", "partNumbers": [1]})
+        self.assertEqual(response.status_code, 403)
+
+    def test_complete_sorts_parts(self):
+        response = self._complete()
+
+        self.assertEqual(response.status_code, 200)
+        parts = self.s3.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+        self.assertEqual([p["PartNumber"] for p in parts], [1, 2])
+        self.s3.delete_object.assert_not_called()
+
+    def test_complete_deletes_object_over_max_upload_size(self):
+        # 파트 크기는 클라이언트 마음대로라 파트 수 제한만으로는 크기를 막을 수 없다
+        self.s3.head_object.return_value = {"ContentLength": 50 * 1024 * 1024 + 1}
+
+        response = self._complete()
+
+        self.assertEqual((response.status_code, response.json()["error"]), (413, "FILE_TOO_LARGE"))
+        self.s3.delete_object.assert_called_once_with(Bucket="bucket", Key=self.key)
+
+    def test_complete_requires_parts(self):
+        response = self._complete(parts=[])
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "INVALID_PARTS"))
+        self.s3.complete_multipart_upload.assert_not_called()
+
+
+class ScratchSpaceTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        self.root = Path(tmp) / "disk"
+        self.ram_root = Path(tmp) / "ram"
+
+    def _space(self, **kwargs):
+        kwargs = {"ram_max_bytes": 100, "job_max_bytes": 1000, "min_free_bytes": 0, **kwargs}
+        return ScratchSpace(root=self.root, ram_root=self.ram_root, **kwargs)
+
+    def _disk_free(self, free):
+        usage = shutil._ntuple_diskusage(free * 2, free, free)
+        return mock.patch("api.scratch.shutil.disk_usage", return_value=usage)
+
+    def test_admission_counts_outstanding_reservations(self):
+        space = self._space(min_free_bytes=100)
+        with self._disk_free(1000):
+            first = space.workspace("job", reserve_bytes=600)
+            self.addCleanup(first.cleanup)
+            # 1000 - 600(아직 쓰지 않은 예약) - 400 < 100
+            with self.assertRaises(ScratchSpaceFull):
+                space.workspace("job", reserve_bytes=400)
+
+            # 예약한 만큼 쓰고 나면 남은 예약은 0 (실제 사용량은 disk_usage 가 반영)
+            (first.disk_dir / "stems.wav").write_bytes(b"\0" * 600)
+            with space.workspace("job", reserve_bytes=400):
+                pass
+
+            first.cleanup()
+            with space.workspace("job", reserve_bytes=800):
+                pass
+
+    def test_collect_orphans_keeps_live_owner(self):
+        space = self._space()
+        ws = space.workspace("job")
+        self.addCleanup(ws.cleanup)
+        ram_dir = ws.dir_for(10)
+        self.assertEqual(ram_dir, ws.ram_dir)
+        # 오래 걸리는 job: 디렉터리가 오래됐어도 주인이 살아 있으면 두어야 한다
+        old = time.time() - 7 * 24 * 3600
+        for path in (ws.disk_dir, ram_dir):
+            os.utime(path, (old, old))
+
+        self.assertEqual(space.collect_orphans(), 0)
+        self.assertTrue(ws.disk_dir.exists())
+        self.assertTrue(ram_dir.exists())
+
+    def test_collect_orphans_removes_dead_owner(self):
+        space = self._space()
+        ws = space.workspace("job")
+        ram_dir = ws.dir_for(10)
+        # 주인 프로세스가 죽으면 커널이 owner lock 을 풀어 준다
+        os.close(ws._owner_fd)
+        ws._owner_fd = None
+        # owner lock 을 잡기 전에 죽은 작업 공간 / 같은 이름의 디스크 작업 공간이 없는 RAM 디렉터리
+        (self.root / "job.1.deadbeef").mkdir()
+        (self.root / "job.1.deadbeef" / OWNER_LOCK_FILE).touch()
+        (self.ram_root / "job.2.deadbeef").mkdir()
+
+        self.assertEqual(space.collect_orphans(), 4)
+        self.assertFalse(ws.disk_dir.exists())
+        self.assertFalse(ram_dir.exists())
+        self.assertEqual([p.name for p in self.root.iterdir() if not p.name.startswith(".")], [])
+        self.assertEqual(list(self.ram_root.iterdir()), [])
+
+    def test_ram_reservation_limits_other_workspaces(self):
+        space = self._space(ram_max_bytes=100)
+        with space.workspace("job") as first, space.workspace("job") as second:
+            self.assertEqual(first.dir_for(60), first.ram_dir)
+            # 아직 아무것도 쓰지 않았어도 예약한 60 바이트는 쓰는 중으로 본다
+            self.assertEqual(space.ram_available(), 40)
+            self.assertEqual(second.dir_for(60), second.disk_dir)
+            self.assertEqual(second.dir_for(40), second.ram_dir)
+            self.assertEqual(space.ram_available(), 0)
+            # 크기를 모르면 디스크
+            self.assertEqual(first.dir_for(None), first.disk_dir)
+
+        self.assertEqual(space.ram_available(), 100)
+
+    def test_ram_tier_disabled(self):
+        space = ScratchSpace(root=self.root, ram_root="", ram_max_bytes=100, job_max_bytes=1000, min_free_bytes=0)
+        with space.workspace("job") as ws:
+            self.assertIsNone(ws.ram_dir)
+            self.assertEqual(ws.dir_for(10), ws.disk_dir)
+
+    def test_check_budget(self):
+        space = self._space()
+        with space.workspace("job", max_bytes=100) as ws:
+            # RAM / 디스크 디렉터리 사용량을 합쳐서 본다
+            (ws.dir_for(40) / "a.bin").write_bytes(b"\0" * 40)
+            (ws.dir_for(None) / "b.bin").write_bytes(b"\0" * 40)
+            self.assertGreaterEqual(ws.check_budget(), 80)
+
+            (ws.disk_dir / "c.bin").write_bytes(b"\0" * 30)
+            with self.assertRaises(ScratchBudgetExceeded):
+                ws.check_budget()
+
+        self.assertFalse(ws.disk_dir.exists())
+        self.assertFalse(ws.ram_dir.exists())
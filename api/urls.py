@@ -1,11 +1,23 @@
 from django.urls import path
 from .views_guest import guest_init
-from .views_uploads import upload_presign
+from .views_uploads import (
+    upload_presign,
+    multipart_create,
+    multipart_presign,
+    multipart_parts,
+    multipart_complete,
+    multipart_abort,
+)
 from .views_drums import process_drum
 
 urlpatterns = [
     path("guest/init", guest_init),
     path("uploads/presign", upload_presign, name="upload-presign"),
+    path("uploads/multipart/create", multipart_create, name="upload-multipart-create"),
+    path("uploads/multipart/presign", multipart_presign, name="upload-multipart-presign"),
+    path("uploads/multipart/parts", multipart_parts, name="upload-multipart-parts"),
+    path("uploads/multipart/complete", multipart_complete, name="upload-multipart-complete"),
+    path("uploads/multipart/abort", multipart_abort, name="upload-multipart-abort"),
     path("drums/process", process_drum, name="drums-process"),
 
 ]
\ No newline at end of file
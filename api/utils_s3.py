@@ -1,85 +1,408 @@
 from __future__ import annotations
 
+import io
+import logging
 import os
-import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from django.conf import settings
 
 
+logger = logging.getLogger(__name__)
+
+
+# 프로세스 공용 S3 클라이언트 설정
+# - 커넥션 풀 크기는 동시 업로드 스레드 x 파트 동시성 이상으로 잡는다
+S3_CLIENT_CONFIG = Config(
+    signature_version="s3v4",
+    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=settings.S3_CONNECT_TIMEOUT,
+    read_timeout=settings.S3_READ_TIMEOUT,
+    retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "standard"},
+)
+
+# boto3 클라이언트는 스레드 세이프하므로 프로세스당 하나만 만들어 재사용
+# (fork 된 자식 프로세스는 부모의 커넥션을 공유하면 안 되므로 pid 로 구분)
+_s3_client = None
+_s3_client_pid: int | None = None
+_s3_client_lock = threading.Lock()
+
+# presigned GET URL 캐시: (key, expires_in, disposition) -> (url, 만료 시각)
+# 폴링마다 새로 서명하지 않고, 만료가 가까워질 때까지 같은 URL 을 재사용
+_presign_cache: OrderedDict[tuple[str, int, str | None], tuple[str, float]] = OrderedDict()
+_presign_cache_lock = threading.Lock()
+
+# 결과물 업로드용 TransferConfig
+# - multipart_threshold 이상이면 multipart 로 쪼개서 파트 단위 병렬 업로드
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=settings.S3_TRANSFER_MAX_CONCURRENCY,
+    use_threads=True,
+)
+
+# 여러 결과물을 동시에 올리기 위한 프로세스 공용 스레드풀
+# (Celery prefork 자식 프로세스에서는 pid 가 바뀌므로 새로 만든다)
+_upload_executor: ThreadPoolExecutor | None = None
+_upload_executor_pid: int | None = None
+_upload_executor_lock = threading.Lock()
+
+
 def get_s3_client():
-    return boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME,
-    )
+    global _s3_client, _s3_client_pid
 
+    client = _s3_client
+    if client is not None and _s3_client_pid == os.getpid():
+        return client
 
-def download_from_s3_to_temp(key: str, suffix: str | None = None) -> str:
+    with _s3_client_lock:
+        if _s3_client is None or _s3_client_pid != os.getpid():
+            # 클라이언트 생성은 세션 단위로 해야 스레드 세이프
+            session = boto3.session.Session()
+            _s3_client = session.client(
+                "s3",
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_S3_REGION_NAME or "ap-northeast-2",
+                config=S3_CLIENT_CONFIG,
+            )
+            _s3_client_pid = os.getpid()
+        return _s3_client
 
-    # S3 객체를 임시 파일로 다운로드하고 로컬 경로(문자열)를 반환.
 
-    s3 = get_s3_client()
-    bucket = settings.AWS_S3_BUCKET_NAME
+class RangedDownload:
+    """
+    S3 객체를 Range GET 여러 개로 나눠 병렬로 받아 local_path 에 기록.
 
-    # key에 확장자가 있으면 그대로 suffix로 사용
-    if suffix is None:
-        _, dot, ext = key.rpartition(".")
-        suffix = f".{ext}" if dot and ext else ""
+        download = RangedDownload(key, local_path).start()
+        with download.open_stream() as stream:
+            librosa.load(stream, ...)   # 받는 중인 구간까지 바로 디코딩
+        download.wait()                 # 파일 전체가 필요할 때
 
-    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
-    os.close(fd)
+    청크는 앞에서부터 순서대로 요청되고, open_stream() 의 reader 는 읽으려는
+    바이트가 도착할 때까지만 블록하므로 디코딩이 다운로드 완료를 기다리지 않는다.
+    """
 
-    s3.download_file(bucket, key, tmp_path)
-    return tmp_path
+    # 청크 하나를 읽어 들일 때 한 번에 쓰는 크기
+    READ_SIZE = 256 * 1024
 
+    def __init__(
+        self,
+        key: str,
+        local_path: str | Path,
+        s3=None,
+        bucket: str | None = None,
+        chunk_size: int | None = None,
+        max_workers: int | None = None,
+    ):
+        self.key = key
+        self.local_path = Path(local_path)
+        self.s3 = s3 or get_s3_client()
+        self.bucket = bucket or settings.AWS_S3_BUCKET_NAME
+        self.chunk_size = chunk_size or settings.S3_DOWNLOAD_CHUNKSIZE
+        self.max_workers = max_workers or settings.S3_DOWNLOAD_WORKERS
 
-def download_from_s3_to_temp_path(key: str, suffix: str | None = None) -> Path:
-    # 위 함수의 Path 버전. 파이프라인 코드에서 Path 객체로 쓰기 좋게 래핑.
+        self.size = 0
+        self.etag: str | None = None
+        # 모든 청크를 다 받은 시각 (time.time())
+        self.finished_at: float | None = None
 
-    return Path(download_from_s3_to_temp(key, suffix=suffix))
+        self._fd: int | None = None
+        self._filled: list[int] = []
+        self._futures: list[Future] = []
+        self._error: BaseException | None = None
+        self._cancelled = False
+        self._cond = threading.Condition()
 
+    def start(self) -> "RangedDownload":
+        head = self.s3.head_object(Bucket=self.bucket, Key=self.key)
+        self.size = int(head["ContentLength"])
+        self.etag = head.get("ETag", "").strip('"') or None
 
-def upload_file_to_s3(local_path: str | Path, key: str) -> None:
-    # 로컬 파일을 S3에 업로드.
+        self._fd = os.open(self.local_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, self.size)
 
-    s3 = get_s3_client()
-    bucket = settings.AWS_S3_BUCKET_NAME
-    s3.upload_file(str(local_path), bucket, key)
+        num_chunks = max(1, -(-self.size // self.chunk_size))
+        self._filled = [0] * num_chunks
 
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, num_chunks),
+            thread_name_prefix="s3-download",
+        )
+        self._futures = [executor.submit(self._fetch_chunk, i) for i in range(num_chunks)]
+        executor.shutdown(wait=False)
 
-def create_presigned_get_url(key: str, expires_in: int = 600) -> str:
-    # S3 객체에 대한 다운로드용 presigned URL 생성.
+        logger.info(
+            "[S3 DOWNLOAD] key=%s bytes=%d chunks=%d", self.key, self.size, num_chunks
+        )
+        return self
 
-    s3 = get_s3_client()
-    bucket = settings.AWS_S3_BUCKET_NAME
-    return s3.generate_presigned_url(
-        ClientMethod="get_object",
-        Params={"Bucket": bucket, "Key": key},
-        ExpiresIn=expires_in,
-    )
+    def _chunk_range(self, index: int) -> tuple[int, int]:
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size)
+
+    def _fetch_chunk(self, index: int) -> None:
+        start, end = self._chunk_range(index)
+        if end <= start:
+            return
+
+        try:
+            resp = self.s3.get_object(
+                Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end - 1}"
+            )
+            body = resp["Body"]
+            offset = start
+            while offset < end and not self._cancelled:
+                data = body.read(min(self.READ_SIZE, end - offset))
+                if not data:
+                    raise IOError(f"S3 응답이 예상보다 짧습니다: {self.key} @ {offset}")
+                os.pwrite(self._fd, data, offset)
+                offset += len(data)
+                with self._cond:
+                    self._filled[index] = offset - start
+                    if sum(self._filled) == self.size:
+                        self.finished_at = time.time()
+                    self._cond.notify_all()
+        except BaseException as e:
+            with self._cond:
+                self._error = self._error or e
+                self._cond.notify_all()
+            raise
+
+    def available(self, pos: int) -> int:
+        # pos 부터 연속으로 읽을 수 있는 바이트 수 (청크 경계까지만)
+        index = pos // self.chunk_size
+        start, _ = self._chunk_range(index)
+        return max(0, start + self._filled[index] - pos)
+
+    def wait_for(self, pos: int) -> int:
+        # pos 위치의 바이트가 도착할 때까지 블록하고, 읽을 수 있는 길이를 반환
+        if pos >= self.size:
+            return 0
+        with self._cond:
+            while True:
+                if self._error is not None:
+                    raise self._error
+                if self._cancelled:
+                    raise IOError(f"다운로드가 취소되었습니다: {self.key}")
+                n = self.available(pos)
+                if n > 0:
+                    return n
+                self._cond.wait()
+
+    def read_at(self, pos: int, n: int) -> bytes:
+        n = min(n, self.wait_for(pos))
+        return os.pread(self._fd, n, pos) if n > 0 else b""
+
+    def open_stream(self) -> "RangedDownloadStream":
+        return RangedDownloadStream(self)
+
+    def wait(self) -> Path:
+        for future in self._futures:
+            future.result()
+        return self.local_path
+
+    def close(self) -> None:
+        # 아직 받는 중인 청크가 있으면 중단시키고 파일 디스크립터를 닫는다
+        with self._cond:
+            self._cancelled = not all(f.done() for f in self._futures)
+            self._cond.notify_all()
+        for future in self._futures:
+            future.cancel()
+        for future in self._futures:
+            try:
+                future.result()
+            except BaseException:
+                pass
+        with self._cond:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class RangedDownloadStream(io.RawIOBase):
+    """
+    RangedDownload 가 받는 중인 파일을 읽는 seekable file-like 객체.
+    soundfile/librosa 에 경로 대신 넘기면 도착한 구간부터 디코딩한다.
+    """
+
+    def __init__(self, download: RangedDownload):
+        super().__init__()
+        self._download = download
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
 
+    def seekable(self) -> bool:
+        return True
 
-def upload_file_and_presign(
-    local_path: str | Path,
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._download.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        # libsndfile 은 짧은 read 를 EOF 로 취급하므로, 요청한 길이를 다 채울 때까지
+        # (또는 파일 끝까지) 도착을 기다린다
+        view = memoryview(buffer).cast("B")
+        total = 0
+        while total < len(view):
+            data = self._download.read_at(self._pos, len(view) - total)
+            if not data:
+                break
+            view[total:total + len(data)] = data
+            total += len(data)
+            self._pos += len(data)
+        return total
+
+    def wait_complete(self) -> Path:
+        # 파이프라인에서 원본 파일 전체가 필요한 단계 전에 호출
+        return self._download.wait()
+
+
+def get_upload_executor() -> ThreadPoolExecutor:
+    global _upload_executor, _upload_executor_pid
+
+    with _upload_executor_lock:
+        if _upload_executor is None or _upload_executor_pid != os.getpid():
+            _upload_executor = ThreadPoolExecutor(
+                max_workers=settings.S3_UPLOAD_WORKERS,
+                thread_name_prefix="s3-upload",
+            )
+            _upload_executor_pid = os.getpid()
+        return _upload_executor
+
+
+class ResultUploader:
+    """
+    결과물 여러 개를 공용 스레드풀에서 동시에 S3 에 업로드.
+
+        uploader = ResultUploader()
+        uploader.submit(midi_path, midi_key)
+        uploader.submit(pdf_path, pdf_key, content_type="application/pdf")
+        reports = uploader.wait()
+
+    wait() 는 파일별 { key, filename, contentType, bytes, seconds } 목록을 반환하고,
+    하나라도 실패하면 나머지를 기다린 뒤 첫 번째 예외를 다시 던진다.
+    """
+
+    def __init__(self, s3=None, bucket: str | None = None):
+        self.s3 = s3 or get_s3_client()
+        self.bucket = bucket or settings.AWS_S3_BUCKET_NAME
+        self._futures: list[Future] = []
+        self._started_at = time.perf_counter()
+
+    def submit(
+        self,
+        local_path: str | Path,
+        key: str,
+        content_type: str | None = None,
+    ) -> Future:
+        future = get_upload_executor().submit(
+            self._upload_one, Path(local_path), key, content_type
+        )
+        self._futures.append(future)
+        return future
+
+    def _upload_one(self, local_path: Path, key: str, content_type: str | None) -> dict:
+        extra_args = {"ContentType": content_type} if content_type else None
+        size = local_path.stat().st_size
+
+        started = time.perf_counter()
+        self.s3.upload_file(
+            str(local_path),
+            self.bucket,
+            key,
+            ExtraArgs=extra_args,
+            Config=TRANSFER_CONFIG,
+        )
+        elapsed = time.perf_counter() - started
+
+        logger.info(
+            "[S3 UPLOAD] key=%s bytes=%d seconds=%.3f", key, size, elapsed
+        )
+        return {
+            "key": key,
+            "filename": local_path.name,
+            "contentType": content_type,
+            "bytes": size,
+            "seconds": round(elapsed, 3),
+        }
+
+    def wait(self) -> list[dict]:
+        reports: list[dict] = []
+        error: BaseException | None = None
+
+        for future in self._futures:
+            try:
+                reports.append(future.result())
+            except BaseException as e:
+                error = error or e
+
+        if error is not None:
+            raise error
+
+        logger.info(
+            "[S3 UPLOAD] %d files, %d bytes in %.3fs",
+            len(reports),
+            sum(r["bytes"] for r in reports),
+            time.perf_counter() - self._started_at,
+        )
+        return reports
+
+
+def create_presigned_get_url(
     key: str,
     expires_in: int = 600,
-) -> dict[str, str]:
+    disposition: str | None = None,
+) -> str:
+    # S3 객체에 대한 다운로드용 presigned URL 생성.
+    # 같은 (key, expires_in, disposition) 으로 발급한 URL 이 PRESIGNED_URL_MIN_TTL 초 이상
+    # 남아 있으면 다시 서명하지 않고 캐시된 URL 을 그대로 반환.
+
+    cache_key = (key, expires_in, disposition)
+    now = time.time()
 
-    # 로컬 파일을 S3에 업로드하고, 곧바로 presigned GET URL까지 생성해서 { key, url, filename } 형태로 반환.
+    with _presign_cache_lock:
+        cached = _presign_cache.get(cache_key)
+        if cached is not None and cached[1] - now >= settings.PRESIGNED_URL_MIN_TTL:
+            _presign_cache.move_to_end(cache_key)
+            return cached[0]
 
-    local_path = Path(local_path)
+    params = {"Bucket": settings.AWS_S3_BUCKET_NAME, "Key": key}
+    if disposition:
+        params["ResponseContentDisposition"] = disposition
+
+    s3 = get_s3_client()
+    url = s3.generate_presigned_url(
+        ClientMethod="get_object",
+        Params=params,
+        ExpiresIn=expires_in,
+    )
 
-    # 1) 업로드
-    upload_file_to_s3(local_path, key)
+    with _presign_cache_lock:
+        _presign_cache[cache_key] = (url, now + expires_in)
+        _presign_cache.move_to_end(cache_key)
+        while len(_presign_cache) > settings.PRESIGNED_URL_CACHE_SIZE:
+            _presign_cache.popitem(last=False)
 
-    # 2) presigned URL 생성
-    url = create_presigned_get_url(key, expires_in=expires_in)
+    return url
 
-    return {
-        "key": key,
-        "url": url,
-        "filename": local_path.name,
-    }
@@ -1,22 +1,19 @@
 from __future__ import annotations
 
 import json
-import uuid
-from pathlib import Path
 
 import logging
-from threading import Thread
 
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 
-from .utils_s3 import (
-    download_from_s3_to_temp_path,
-    upload_file_and_presign,
-)
-from drum.pipeline import run_drum_pipeline
-from jobs.models import DrumJob
+from drum.audio.encoding import normalize_audio_format
+from jobs.admission import AdmissionRejected
+from jobs.events import TERMINAL_STATUSES
+from jobs.results import build_job_payload
+from jobs.submission import InputNotFound, submit_drum_job, wait_for_drum_job
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +21,13 @@ logger = logging.getLogger(__name__)
 @csrf_exempt  # 개발 단계용
 @require_POST
 def process_drum(request):
+    """
+    드럼 악보 생성 작업 제출
+    - HTTP 요청 안에서 파이프라인을 돌리지 않고 job 으로 큐에 넣은 뒤 202 + jobId 반환
+      (진행 상황은 /api/jobs/drums/<jobId>, /api/jobs/drums/<jobId>/events)
+    - wait(초, 최대 DRUM_PROCESS_MAX_WAIT_SECONDS): 짧은 곡이라 그 안에 끝날 것으로 예상되면
+      완료까지 기다렸다가 결과를 바로 반환 (200)
+    """
     # 1. guest_id 쿠키 확인
     guest_id = request.COOKIES.get("guest_id")
     if not guest_id:
@@ -45,6 +49,8 @@ def process_drum(request):
     genre = body.get("genre")
     tempo = body.get("tempo")
     level = body.get("level")
+    audio_format = body.get("audioFormat") or settings.DRUM_AUDIO_FORMAT
+    wait = body.get("wait") or 0
 
     if not input_key or not isinstance(input_key, str):
         return JsonResponse(
@@ -66,6 +72,22 @@ def process_drum(request):
             status=400,
         )
 
+    try:
+        audio_format = normalize_audio_format(audio_format)
+    except ValueError:
+        return JsonResponse(
+            {"ok": False, "error": "INVALID_AUDIO_FORMAT"},
+            status=400,
+        )
+
+    try:
+        wait = min(max(float(wait), 0.0), settings.DRUM_PROCESS_MAX_WAIT_SECONDS)
+    except (TypeError, ValueError):
+        return JsonResponse(
+            {"ok": False, "error": "INVALID_WAIT"},
+            status=400,
+        )
+
     # 3. inputKey가 내 guest 영역인지 확인
     expected_prefix = f"uploads/{guest_id}/"
     if not input_key.startswith(expected_prefix):
@@ -74,109 +96,52 @@ def process_drum(request):
             status=403,
         )
 
-    # 4. S3 → 임시 파일(Path) 다운로드
-    try:
-        local_audio_path: Path = download_from_s3_to_temp_path(input_key)
-    except Exception as e:
-        return JsonResponse(
-            {"ok": False, "error": "S3_DOWNLOAD_FAILED", "detail": str(e)},
-            status=500,
-        )
-
-    # 5. 파이프라인 실행
+    # 4. job 제출 (같은 음원 + 옵션의 job 이 있으면 그 job 재사용)
     try:
-        # run_drum_pipeline 이 dict[str, Path | str] 을 리턴한다고 가정
-        outputs = run_drum_pipeline(
-            audio_path=local_audio_path,
+        job, created, eta_seconds = submit_drum_job(
+            guest_id=guest_id,
+            remote_addr=request.META.get("REMOTE_ADDR"),
+            input_key=input_key,
             genre=genre,
             tempo=tempo,
             level=level,
-            output_dir=None,
+            audio_format=audio_format,
         )
-    except Exception as e:
+    except InputNotFound:
         return JsonResponse(
-            {"ok": False, "error": "PIPELINE_FAILED", "detail": str(e)},
-            status=500,
+            {"ok": False, "error": "INPUT_NOT_FOUND"},
+            status=400,
         )
+    except AdmissionRejected as e:
+        response = JsonResponse(
+            {"ok": False, "error": e.code, "retryAfter": e.retry_after},
+            status=e.status_code,
+        )
+        response["Retry-After"] = str(e.retry_after)
+        return response
+
+    # 5. 요청한 시간 안에 끝날 것으로 예상될 때만 기다림 (긴 곡이 웹 워커를 붙잡지 않도록)
+    if wait and job.status not in TERMINAL_STATUSES and eta_seconds is not None and eta_seconds <= wait:
+        job = wait_for_drum_job(job.id, timeout=wait)
 
-    # 6. 결과 파일들을 S3에 업로드 + presigned URL 생성
-    job_id = uuid.uuid4().hex
-    base_prefix = f"results/{guest_id}/{job_id}/"
-
-    result_map: dict[str, dict] = {}
-
-    for kind, local_path in outputs.items():
-        local_path = Path(local_path)
-        key = f"{base_prefix}{local_path.name}"
-
-        try:
-            info = upload_file_and_presign(local_path, key, expires_in=600)
-        except Exception as e:
-            return JsonResponse(
-                {"ok": False, "error": "S3_UPLOAD_FAILED", "detail": str(e)},
-                status=500,
-            )
-
-        # contentType 추론
-        suffix = local_path.suffix.lower()
-        if suffix in [".mid", ".midi"]:
-            content_type = "audio/midi"
-        elif suffix in [".mp3", ".wav"]:
-            content_type = "audio/mpeg"
-        elif suffix == ".pdf":
-            content_type = "application/pdf"
-        else:
-            content_type = "application/octet-stream"
-
-        result_map[kind] = {
-            **info,  # key, url, filename
-            "contentType": content_type,
-        }
+    if job.status == "DONE":
+        return JsonResponse(build_job_payload(job), status=200)
+
+    if job.status == "ERROR":
+        return JsonResponse(
+            {"ok": False, "error": "PIPELINE_FAILED", "jobId": str(job.id), "detail": job.error_message},
+            status=500,
+        )
 
     return JsonResponse(
         {
             "ok": True,
-            "jobId": job_id,
-            "results": result_map,
+            "jobId": str(job.id),
+            "status": job.status,
+            "deduplicated": not created,
+            "etaSeconds": eta_seconds,
+            "statusUrl": f"/api/jobs/drums/{job.id}",
+            "eventsUrl": f"/api/jobs/drums/{job.id}/events",
         },
-        status=200,
+        status=202,
     )
-
-
-def _run_drum_job_in_background(job_id: str):
-
-    # 오래 걸리는 드럼 파이프라인을 백그라운드에서 실행하는 함수. (별도 Thread 에서 실행)
-
-    from django.db import connection  # 쓰고 끝에 close 해주기 위해
-
-    try:
-        job = DrumJob.objects.get(id=job_id)
-        job.status = "RUNNING"
-        job.save(update_fields=["status", "updated_at"])
-
-        # 실제 드럼 파이프라인 호출
-        result = run_drum_pipeline(
-            input_key=job.input_key,
-            genre=job.genre,
-            tempo=job.tempo,
-            level=job.level,
-        )
-        # result 안에 pdf/audio S3 key 를 반환
-        job.pdf_key = result.get("pdf_key")
-        job.audio_key = result.get("audio_key")
-        job.status = "DONE"
-        job.error_message = ""
-        job.save(update_fields=["pdf_key", "audio_key", "status", "error_message", "updated_at"])
-
-    except Exception as e:
-        logger.exception("Drum job %s failed", job_id)
-        try:
-            job = DrumJob.objects.get(id=job_id)
-            job.status = "ERROR"
-            job.error_message = str(e)
-            job.save(update_fields=["status", "error_message", "updated_at"])
-        except Exception:
-            logger.exception("Failed to save error status for job %s", job_id)
-    finally:
-        # Thread 안에서 DB 커넥션 정리
-        connection.close()
@@ -5,17 +5,9 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-import boto3
 from pathlib import Path
 
-
-def get_s3_client():
-    return boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME,
-    )
+from .utils_s3 import get_s3_client
 
 
 ALLOWED_CONTENT_TYPES = {
@@ -115,3 +107,307 @@ def upload_presign(request):
             "expiresIn": expires_in,
         }
     )
+
+
+# ---------------------------------------------------------------------
+# Multipart 업로드
+#   큰 파일을 파트 단위로 나눠 프론트가 병렬 업로드 / 실패한 파트만 재시도
+#
+#   1) POST uploads/multipart/create    → uploadId, key, partSize, partCount
+#   2) POST uploads/multipart/presign   → 파트 번호별 presigned PUT URL (여러 개 한 번에)
+#   3) POST uploads/multipart/parts     → 이미 올라간 파트 목록 (이어 올리기용)
+#   4) POST uploads/multipart/complete  → 파트 ETag 목록으로 업로드 완료
+#   5) POST uploads/multipart/abort     → 업로드 취소
+# ---------------------------------------------------------------------
+
+# S3 multipart 제약: 파트 수는 최대 10000 (파트 최소 크기 5MB 는 settings 에서 보장)
+MAX_PART_COUNT = 10000
+
+
+def _parse_guest_request(request):
+    # guest_id 쿠키 확인 + JSON 파싱. 실패하면 (None, None, 에러 응답) 반환
+    guest_id = request.COOKIES.get("guest_id")
+    if not guest_id:
+        return None, None, JsonResponse(
+            {"ok": False, "error": "GUEST_NOT_INITIALIZED"},
+            status=400,
+        )
+
+    try:
+        body = json.loads(request.body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return None, None, JsonResponse(
+            {"ok": False, "error": "INVALID_JSON"},
+            status=400,
+        )
+
+    if not isinstance(body, dict):
+        return None, None, JsonResponse(
+            {"ok": False, "error": "INVALID_JSON"},
+            status=400,
+        )
+
+    return guest_id, body, None
+
+
+def _parse_multipart_target(guest_id: str, body: dict):
+    # key / uploadId 확인. key 는 반드시 내 guest 영역이어야 함
+    key = body.get("key")
+    upload_id = body.get("uploadId")
+
+    if not key or not isinstance(key, str) or not upload_id or not isinstance(upload_id, str):
+        return None, None, JsonResponse(
+            {"ok": False, "error": "KEY_AND_UPLOAD_ID_REQUIRED"},
+            status=400,
+        )
+
+    if not key.startswith(f"uploads/{guest_id}/"):
+        return None, None, JsonResponse(
+            {"ok": False, "error": "FORBIDDEN_INPUT_KEY"},
+            status=403,
+        )
+
+    return key, upload_id, None
+
+
+def _part_count(size: int) -> int:
+    return -(-size // settings.MULTIPART_UPLOAD_PART_SIZE)
+
+
+@csrf_exempt
+@require_POST
+def multipart_create(request):
+    guest_id, body, error = _parse_guest_request(request)
+    if error:
+        return error
+
+    filename = body.get("filename") or "upload.bin"
+    content_type = body.get("contentType")
+
+    try:
+        size = int(body.get("size"))
+    except (TypeError, ValueError):
+        size = -1
+
+    if size <= 0 or size > settings.MAX_UPLOAD_SIZE:
+        return JsonResponse(
+            {"ok": False, "error": "INVALID_SIZE"},
+            status=400,
+        )
+
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        return JsonResponse(
+            {"ok": False, "error": "INVALID_CONTENT_TYPE"},
+            status=400,
+        )
+
+    ext = Path(filename).suffix.lower()
+    if ext not in ALLOWED_EXTS:
+        return JsonResponse(
+            {"ok": False, "error": "UNSUPPORTED_EXTENSION"},
+            status=400,
+        )
+
+    # 단일 PUT 과 같은 키 규칙: uploads/{guest_id}/{UUID}{ext}
+    key = f"uploads/{guest_id}/{uuid.uuid4().hex}{ext}"
+
+    try:
+        resp = get_s3_client().create_multipart_upload(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Key=key,
+            ContentType=content_type,
+        )
+    except Exception:
+        return JsonResponse(
+            {"ok": False, "error": "MULTIPART_CREATE_FAILED"},
+            status=500,
+        )
+
+    return JsonResponse(
+        {
+            "ok": True,
+            "key": key,
+            "uploadId": resp["UploadId"],
+            "partSize": settings.MULTIPART_UPLOAD_PART_SIZE,
+            "partCount": _part_count(size),
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+def multipart_presign(request):
+    guest_id, body, error = _parse_guest_request(request)
+    if error:
+        return error
+
+    key, upload_id, error = _parse_multipart_target(guest_id, body)
+    if error:
+        return error
+
+    part_numbers = body.get("partNumbers")
+    try:
+        part_numbers = sorted({int(n) for n in part_numbers})
+    except (TypeError, ValueError):
+        part_numbers = []
+
+    max_parts = _part_count(settings.MAX_UPLOAD_SIZE)
+    if not part_numbers or part_numbers[0] < 1 or part_numbers[-1] > max_parts:
+        return JsonResponse(
+            {"ok": False, "error": "INVALID_PART_NUMBERS"},
+            status=400,
+        )
+
+    s3 = get_s3_client()
+    bucket = settings.AWS_S3_BUCKET_NAME
+    expires_in = settings.MULTIPART_UPLOAD_URL_EXPIRES_IN
+
+    # presigned URL 생성은 로컬 서명 연산뿐이라 한 요청에서 여러 개를 만들어도 저렴
+    try:
+        urls = {
+            str(n): s3.generate_presigned_url(
+                ClientMethod="upload_part",
+                Params={
+                    "Bucket": bucket,
+                    "Key": key,
+                    "UploadId": upload_id,
+                    "PartNumber": n,
+                },
+                ExpiresIn=expires_in,
+            )
+            for n in part_numbers
+        }
+    except Exception:
+        return JsonResponse(
+            {"ok": False, "error": "PRESIGN_FAILED"},
+            status=500,
+        )
+
+    return JsonResponse(
+        {
+            "ok": True,
+            "key": key,
+            "uploadId": upload_id,
+            "urls": urls,
+            "expiresIn": expires_in,
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+def multipart_parts(request):
+    guest_id, body, error = _parse_guest_request(request)
+    if error:
+        return error
+
+    key, upload_id, error = _parse_multipart_target(guest_id, body)
+    if error:
+        return error
+
+    s3 = get_s3_client()
+    parts = []
+
+    try:
+        paginator = s3.get_paginator("list_parts")
+        for page in paginator.paginate(
+            Bucket=settings.AWS_S3_BUCKET_NAME, Key=key, UploadId=upload_id
+        ):
+            for part in page.get("Parts", []):
+                parts.append(
+                    {
+                        "partNumber": part["PartNumber"],
+                        "etag": part["ETag"],
+                        "size": part["Size"],
+                    }
+                )
+    except Exception:
+        return JsonResponse(
+            {"ok": False, "error": "MULTIPART_LIST_FAILED"},
+            status=500,
+        )
+
+    return JsonResponse({"ok": True, "key": key, "uploadId": upload_id, "parts": parts})
+
+
+@csrf_exempt
+@require_POST
+def multipart_complete(request):
+    guest_id, body, error = _parse_guest_request(request)
+    if error:
+        return error
+
+    key, upload_id, error = _parse_multipart_target(guest_id, body)
+    if error:
+        return error
+
+    try:
+        parts = sorted(
+            (
+                {"PartNumber": int(p["partNumber"]), "ETag": str(p["etag"])}
+                for p in body.get("parts")
+            ),
+            key=lambda p: p["PartNumber"],
+        )
+    except (TypeError, ValueError, KeyError):
+        parts = []
+
+    if not parts or len(parts) > MAX_PART_COUNT:
+        return JsonResponse(
+            {"ok": False, "error": "INVALID_PARTS"},
+            status=400,
+        )
+
+    s3 = get_s3_client()
+    try:
+        s3.complete_multipart_upload(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        # 파트 크기는 클라이언트가 정하므로, 합친 객체 크기를 다시 확인
+        size = s3.head_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key)["ContentLength"]
+    except Exception:
+        return JsonResponse(
+            {"ok": False, "error": "MULTIPART_COMPLETE_FAILED"},
+            status=500,
+        )
+
+    if size > settings.MAX_UPLOAD_SIZE:
+        try:
+            s3.delete_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=key)
+        except Exception:
+            pass
+        return JsonResponse(
+            {"ok": False, "error": "FILE_TOO_LARGE"},
+            status=413,
+        )
+
+    return JsonResponse({"ok": True, "key": key})
+
+
+@csrf_exempt
+@require_POST
+def multipart_abort(request):
+    guest_id, body, error = _parse_guest_request(request)
+    if error:
+        return error
+
+    key, upload_id, error = _parse_multipart_target(guest_id, body)
+    if error:
+        return error
+
+    try:
+        get_s3_client().abort_multipart_upload(
+            Bucket=settings.AWS_S3_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+        )
+    except Exception:
+        return JsonResponse(
+            {"ok": False, "error": "MULTIPART_ABORT_FAILED"},
+            status=500,
+        )
+
+    return JsonResponse({"ok": True, "key": key})
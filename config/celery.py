@@ -1,9 +1,17 @@
+import json
+import logging
 import os
+import time
+from pathlib import Path
+
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 
 # Django settings 모듈 지정
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
+logger = logging.getLogger(__name__)
+
 # Celery 앱 인스턴스 생성
 celery = Celery("config")
 
@@ -12,3 +20,87 @@ celery.config_from_object("django.conf:settings", namespace="CELERY")
 
 # INSTALLED_APPS에 있는 모든 tasks.py 자동 검색
 celery.autodiscover_tasks()
+
+
+@worker_init.connect
+def preload_drum_pipeline(**kwargs):
+    # 드럼 파이프라인 모듈(torch / demucs / librosa)은 웹 프로세스에서는 import 하지 않고,
+    # 워커는 prefork 부모에서 한 번만 import 해서 자식 프로세스들이 fork 로 공유하게 한다
+    from django.conf import settings
+
+    # numba 는 import 시점에 캐시 경로를 읽으므로 파이프라인 import 전에 지정
+    os.environ.setdefault("NUMBA_CACHE_DIR", str(settings.DRUM_NUMBA_CACHE_DIR))
+    _clear_stale_ready_flags(settings.DRUM_WORKER_READY_DIR)
+
+    # 이전 실행에서 죽은 프로세스가 남긴 job 작업 공간 정리
+    from api.scratch import get_scratch_space
+
+    removed = get_scratch_space().collect_orphans()
+    logger.info("[Worker] scratch orphans removed: %d", removed)
+
+    # 이전 실행에서 강제 종료된 렌더러가 남긴 Xvfb / X lock 파일 정리
+    from drum.watchdog import cleanup_orphaned_xvfb
+
+    removed = cleanup_orphaned_xvfb()
+    logger.info("[Worker] orphan Xvfb removed: %d", removed)
+
+    from drum.pipeline import preload_stage_modules
+
+    seconds = preload_stage_modules()
+    logger.info("[Worker] drum pipeline modules imported: %s", seconds)
+
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    # 자식 프로세스는 이 함수가 끝나야 task 를 받기 시작한다 (CELERY_WORKER_PROC_ALIVE_TIMEOUT 안에 끝나야 함)
+    from django.conf import settings
+
+    if not settings.DRUM_WORKER_WARMUP:
+        return
+
+    from drum.warmup import warm_up_pipeline
+
+    stages = _warmup_stages(settings.DRUM_WORKER_WARMUP_STAGES)
+    report = warm_up_pipeline(stages)
+    logger.info("[Worker] warm-up pid=%s stages=%s %s", os.getpid(), stages, report)
+
+    ready_dir = Path(settings.DRUM_WORKER_READY_DIR)
+    ready_dir.mkdir(parents=True, exist_ok=True)
+    (ready_dir / f"{os.getpid()}.json").write_text(
+        json.dumps({"pid": os.getpid(), "readyAt": time.time(), **report})
+    )
+
+
+@worker_process_shutdown.connect
+def clear_worker_ready_flag(**kwargs):
+    from django.conf import settings
+
+    (Path(settings.DRUM_WORKER_READY_DIR) / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+
+def _warmup_stages(configured: str) -> tuple:
+    # 설정이 없으면 구독 중인 큐로 결정 (가벼운 워커가 Demucs 모델을 올리지 않도록)
+    if configured:
+        return tuple(s.strip() for s in configured.split(",") if s.strip())
+
+    queues = set(celery.amqp.queues.consume_from)
+    stages = []
+    if not queues or "drum_light" in queues:
+        stages.append("score")
+    if not queues or any(q.startswith("drum_heavy") for q in queues):
+        stages.append("mix")
+    return tuple(stages) or ("score", "mix")
+
+
+def _clear_stale_ready_flags(ready_dir) -> None:
+    # 이전 실행에서 남은(이미 죽은 프로세스의) readiness 파일 정리
+    ready_dir = Path(ready_dir)
+    if not ready_dir.exists():
+        return
+    for flag in ready_dir.glob("*.json"):
+        try:
+            os.kill(int(flag.stem), 0)
+        except (ValueError, ProcessLookupError):
+            flag.unlink(missing_ok=True)
+        except PermissionError:
+            pass
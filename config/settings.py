@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 
 load_dotenv()
 
@@ -39,6 +40,81 @@ AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME")
 
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))   # 20MB
 
+# multipart 업로드 파트 크기 (S3 최소 5MB) / 파트 URL 유효시간
+MULTIPART_UPLOAD_PART_SIZE = max(
+    int(os.getenv("MULTIPART_UPLOAD_PART_SIZE", 8 * 1024 * 1024)), 5 * 1024 * 1024
+)
+MULTIPART_UPLOAD_URL_EXPIRES_IN = int(os.getenv("MULTIPART_UPLOAD_URL_EXPIRES_IN", 3600))
+
+# 입력/결과물 저장소 백엔드 ("s3" 또는 AWS 없이 돌리기 위한 "local")
+DRUM_STORAGE_BACKEND = os.getenv("DRUM_STORAGE_BACKEND", "s3")
+DRUM_LOCAL_STORAGE_ROOT = Path(os.getenv("DRUM_LOCAL_STORAGE_ROOT", BASE_DIR / "local_storage"))
+
+# 워커 로컬 입력 오디오 캐시 (key + ETag 기준 LRU, 0 이면 사용 안 함)
+DRUM_INPUT_CACHE_DIR = Path(
+    os.getenv("DRUM_INPUT_CACHE_DIR", Path(tempfile.gettempdir()) / "drum_input_cache")
+)
+DRUM_INPUT_CACHE_MAX_BYTES = int(os.getenv("DRUM_INPUT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+# job 작업 공간 (api/scratch.py)
+#   - job 마다 DRUM_SCRATCH_DIR 아래 작업 디렉터리, 사용량이 DRUM_SCRATCH_JOB_MAX_BYTES 를 넘으면 실패
+#   - 작은 중간 산출물은 RAM(tmpfs) 디렉터리에 (전체 DRUM_SCRATCH_RAM_MAX_BYTES 까지), 큰 것은 디스크에
+#   - 새 작업 공간을 잡은 뒤 디스크 여유가 DRUM_SCRATCH_MIN_FREE_BYTES 보다 적어질 것 같으면 거절 (워커는 잠시 뒤 재시도)
+#   - 죽은 프로세스가 남긴 작업 공간은 워커 시작 시와 DRUM_SCRATCH_GC_INTERVAL 초마다 정리
+DRUM_SCRATCH_DIR = Path(
+    os.getenv("DRUM_SCRATCH_DIR", Path(tempfile.gettempdir()) / "drum_scratch")
+)
+DRUM_SCRATCH_RAM_DIR = os.getenv(
+    "DRUM_SCRATCH_RAM_DIR", "/dev/shm/drum_scratch" if os.path.isdir("/dev/shm") else ""
+)
+DRUM_SCRATCH_RAM_MAX_BYTES = int(os.getenv("DRUM_SCRATCH_RAM_MAX_BYTES", 512 * 1024 ** 2))
+DRUM_SCRATCH_JOB_MAX_BYTES = int(os.getenv("DRUM_SCRATCH_JOB_MAX_BYTES", 2 * 1024 ** 3))
+DRUM_SCRATCH_MIN_FREE_BYTES = int(os.getenv("DRUM_SCRATCH_MIN_FREE_BYTES", 2 * 1024 ** 3))
+DRUM_SCRATCH_GC_INTERVAL = int(os.getenv("DRUM_SCRATCH_GC_INTERVAL", 10 * 60))
+DRUM_SCRATCH_RETRY_SECONDS = int(os.getenv("DRUM_SCRATCH_RETRY_SECONDS", 60))
+DRUM_SCRATCH_MAX_RETRIES = int(os.getenv("DRUM_SCRATCH_MAX_RETRIES", 10))
+
+# 결과물 S3 업로드 (동시 업로드 스레드 수, multipart 설정)
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", 8))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024))
+S3_TRANSFER_MAX_CONCURRENCY = int(os.getenv("S3_TRANSFER_MAX_CONCURRENCY", 4))
+
+# 입력 오디오 병렬 Range 다운로드
+S3_DOWNLOAD_WORKERS = int(os.getenv("S3_DOWNLOAD_WORKERS", 4))
+S3_DOWNLOAD_CHUNKSIZE = int(os.getenv("S3_DOWNLOAD_CHUNKSIZE", 4 * 1024 * 1024))
+
+# 공용 S3 클라이언트 (커넥션 풀 / 타임아웃 / 재시도)
+S3_MAX_POOL_CONNECTIONS = int(
+    os.getenv("S3_MAX_POOL_CONNECTIONS", S3_UPLOAD_WORKERS * S3_TRANSFER_MAX_CONCURRENCY)
+)
+S3_CONNECT_TIMEOUT = int(os.getenv("S3_CONNECT_TIMEOUT", 5))
+S3_READ_TIMEOUT = int(os.getenv("S3_READ_TIMEOUT", 60))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", 5))
+
+# presigned 다운로드 URL 캐시 (남은 유효시간이 MIN_TTL 미만이면 새로 서명)
+PRESIGNED_URL_EXPIRES_IN = int(os.getenv("PRESIGNED_URL_EXPIRES_IN", 600))
+PRESIGNED_URL_MIN_TTL = int(os.getenv("PRESIGNED_URL_MIN_TTL", 120))
+PRESIGNED_URL_CACHE_SIZE = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", 4096))
+
+# 가이드/믹스 오디오 기본 출력 포맷 (wav / flac / mp3 / opus)
+# 요청에 audioFormat 이 없을 때와 DrumJob.audio_format 의 기본값 모두 이 값을 쓴다
+DRUM_AUDIO_FORMAT = os.getenv("DRUM_AUDIO_FORMAT", "mp3")
+
+# 같은 입력 + 옵션의 job 재사용: 이 시간 동안 갱신이 없는 PENDING/RUNNING job 은 죽은 것으로 보고 새로 실행
+DRUM_JOB_STALE_SECONDS = int(os.getenv("DRUM_JOB_STALE_SECONDS", 3 * 60 * 60))
+
+# POST /api/drums/process 의 wait 최대값(초). 예상 완료 시간이 wait 이하일 때만 기다린다
+DRUM_PROCESS_MAX_WAIT_SECONDS = int(os.getenv("DRUM_PROCESS_MAX_WAIT_SECONDS", 30))
+
+# 미리보기 (앞 N 마디만 분석한 MIDI / PDF, Demucs 없음)
+DRUM_PREVIEW_BARS = int(os.getenv("DRUM_PREVIEW_BARS", 8))
+DRUM_PREVIEW_MAX_BARS = int(os.getenv("DRUM_PREVIEW_MAX_BARS", 32))
+
+# guest 의 job 목록 페이지 크기 (GET /api/jobs/drums)
+DRUM_JOB_LIST_PAGE_SIZE = int(os.getenv("DRUM_JOB_LIST_PAGE_SIZE", 20))
+DRUM_JOB_LIST_MAX_PAGE_SIZE = int(os.getenv("DRUM_JOB_LIST_MAX_PAGE_SIZE", 100))
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -87,12 +163,45 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres 면 PostgreSQL (psycopg3 커넥션 풀), 아니면 로컬 개발용 SQLite
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("POSTGRES_DB", "drum"),
+            'USER': os.getenv("POSTGRES_USER", "drum"),
+            'PASSWORD': os.getenv("POSTGRES_PASSWORD", ""),
+            'HOST': os.getenv("POSTGRES_HOST", "localhost"),
+            'PORT': os.getenv("POSTGRES_PORT", "5432"),
+            # 요청 / 태스크마다 새로 접속하지 않고 프로세스별 풀에서 커넥션 재사용
+            # (pool 을 쓰면 CONN_MAX_AGE 는 0 이어야 함)
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+                    'max_size': int(os.getenv("DB_POOL_MAX_SIZE", 4)),
+                    'timeout': int(os.getenv("DB_POOL_TIMEOUT", 10)),
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # 웹 + 워커 여러 프로세스가 동시에 써도 "database is locked" 가 나지 않도록
+            # WAL + 쓰기 트랜잭션은 시작부터 write lock (IMMEDIATE)
+            'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': int(os.getenv("DB_SQLITE_TIMEOUT", 20)),
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -152,3 +261,99 @@ CSRF_TRUSTED_ORIGINS = [
 # Celery 설정 (Redis 브로커/백엔드 사용)
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/0"
 CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/1"
+
+# 단계별 task 큐 라우팅
+#   drum_heavy_short / drum_heavy_long: Demucs 분리 (GPU/CPU 많이 사용, 동시성 낮게)
+#       음원 길이에 따라 enqueue 시 큐를 고름 → 짧은 곡이 긴 곡 뒤에서 기다리지 않도록 워커를 따로 둔다
+#   drum_light: 분석 / 렌더링 / 업로드 (동시성 높게)
+#   celery -A config worker -Q drum_heavy_short -c 1
+#   celery -A config worker -Q drum_heavy_long -c 1
+#   celery -A config worker -Q drum_light -c 4
+CELERY_TASK_ROUTES = {
+    "jobs.tasks.run_drum_job": {"queue": "drum_heavy_long"},
+    "jobs.tasks.separate_drum_job": {"queue": "drum_heavy_long"},
+    "jobs.tasks.prepare_drum_job": {"queue": "drum_light"},
+    "jobs.tasks.finish_drum_job": {"queue": "drum_light"},
+    "jobs.tasks.preview_drum_job": {"queue": "drum_light"},
+    "jobs.tasks.dispatch_drum_jobs": {"queue": "drum_light"},
+    "jobs.tasks.sweep_drum_jobs": {"queue": "drum_light"},
+}
+# 오래 걸리는 task 라서 미리 여러 개를 가져가 다른 워커를 놀게 하지 않도록 함
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+# 실행 중 워커 프로세스가 죽으면 메시지를 큐로 되돌려 다른 워커가 checkpoint 부터 이어서 실행
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+
+# 단계 task 자동 재시도 (끝난 단계는 checkpoint 로 건너뜀)
+#   - 실패하면 지수 backoff(최대 DRUM_JOB_RETRY_BACKOFF_MAX 초)로 DRUM_JOB_MAX_RETRIES 번까지 재시도
+#   - 워커가 죽어서 다시 받은 것까지 합쳐 단계 task 가 DRUM_JOB_MAX_ATTEMPTS 번 넘게 실행되면 실패 처리
+DRUM_JOB_MAX_RETRIES = int(os.getenv("DRUM_JOB_MAX_RETRIES", 3))
+DRUM_JOB_RETRY_BACKOFF_MAX = int(os.getenv("DRUM_JOB_RETRY_BACKOFF_MAX", 300))
+DRUM_JOB_MAX_ATTEMPTS = int(os.getenv("DRUM_JOB_MAX_ATTEMPTS", 10))
+
+# 외부 렌더러 제한 시간 (drum/watchdog.py)
+#   - MuseScore(xvfb-run) / FluidSynth 가 제한 시간 안에 끝나지 않으면 프로세스 그룹째 SIGTERM,
+#     DRUM_SUBPROCESS_KILL_GRACE_SECONDS 뒤에도 남아 있으면 SIGKILL. 같은 입력이면 다시 멈추므로 재시도하지 않음
+DRUM_MUSESCORE_TIMEOUT_SECONDS = int(os.getenv("DRUM_MUSESCORE_TIMEOUT_SECONDS", 120))
+DRUM_FLUIDSYNTH_TIMEOUT_SECONDS = int(os.getenv("DRUM_FLUIDSYNTH_TIMEOUT_SECONDS", 120))
+DRUM_SUBPROCESS_KILL_GRACE_SECONDS = int(os.getenv("DRUM_SUBPROCESS_KILL_GRACE_SECONDS", 5))
+
+# 자식 프로세스 warm-up(worker_process_init)이 끝날 때까지 기다리는 시간
+CELERY_WORKER_PROC_ALIVE_TIMEOUT = int(os.getenv("CELERY_WORKER_PROC_ALIVE_TIMEOUT", 300))
+
+# 워커 warm-up (drum/warmup.py)
+#   - DRUM_WORKER_WARMUP_STAGES: "score,mix" 처럼 지정. 비우면 워커가 구독하는 큐로 결정
+#       (drum_light → score, drum_heavy_* → mix)
+#   - numba JIT 결과는 DRUM_NUMBA_CACHE_DIR 에 저장해 재시작 후에도 재사용
+#   - warm-up 이 끝난 자식 프로세스는 DRUM_WORKER_READY_DIR/{pid}.json 을 남긴다 (readiness probe 용)
+DRUM_WORKER_WARMUP = os.getenv("DRUM_WORKER_WARMUP", "1") == "1"
+DRUM_WORKER_WARMUP_STAGES = os.getenv("DRUM_WORKER_WARMUP_STAGES", "")
+DRUM_NUMBA_CACHE_DIR = Path(
+    os.getenv("NUMBA_CACHE_DIR", Path(tempfile.gettempdir()) / "drum_numba_cache")
+)
+DRUM_WORKER_READY_DIR = Path(
+    os.getenv("DRUM_WORKER_READY_DIR", Path(tempfile.gettempdir()) / "drum_worker_ready")
+)
+
+# Job 진행 상황 push (Redis pub/sub → SSE)
+JOB_EVENTS_REDIS_URL = os.getenv("JOB_EVENTS_REDIS_URL", "redis://127.0.0.1:6379/2")
+JOB_EVENTS_HEARTBEAT_SECONDS = int(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", 15))
+
+# Job 스케줄러 (guest 별 공정 분배 / 제출 속도 제한)
+#   - 음원 길이가 DRUM_SHORT_JOB_MAX_SECONDS 이하면 short, 아니면(길이를 모르면 포함) long lane
+#   - lane 별로 Celery 큐에는 최대 DRUM_SCHED_MAX_DISPATCHED[lane] 개만 넣고, 나머지는 Redis 의
+#     guest 별 대기열에서 라운드로빈으로 하나씩 꺼낸다 (해당 큐 워커의 동시 처리 수와 비슷하게 설정)
+#   - guest 한 명이 동시에 실행할 수 있는 job 은 DRUM_SCHED_GUEST_CONCURRENCY 개
+DRUM_SCHEDULER_REDIS_URL = os.getenv("DRUM_SCHEDULER_REDIS_URL", JOB_EVENTS_REDIS_URL)
+DRUM_SHORT_JOB_MAX_SECONDS = int(os.getenv("DRUM_SHORT_JOB_MAX_SECONDS", 180))
+DRUM_SCHED_MAX_DISPATCHED = {
+    "short": int(os.getenv("DRUM_SCHED_MAX_DISPATCHED_SHORT", 2)),
+    "long": int(os.getenv("DRUM_SCHED_MAX_DISPATCHED_LONG", 2)),
+    # 미리보기(drum_light)는 전체 job 과 따로 센다
+    "preview": int(os.getenv("DRUM_SCHED_MAX_DISPATCHED_PREVIEW", 2)),
+}
+DRUM_SCHED_GUEST_CONCURRENCY = int(os.getenv("DRUM_SCHED_GUEST_CONCURRENCY", 1))
+DRUM_JOB_RATE_LIMIT = int(os.getenv("DRUM_JOB_RATE_LIMIT", 10))
+DRUM_JOB_RATE_WINDOW_SECONDS = int(os.getenv("DRUM_JOB_RATE_WINDOW_SECONDS", 600))
+#   - DRUM_SCHED_SWEEP_INTERVAL 초마다 DRUM_SCHED_SWEEP_MIN_AGE 초 넘게 PENDING 인데 Redis 대기열 /
+#     실행 목록에 없는 job 을 다시 대기열에 넣는다 (celery -A config beat 필요)
+DRUM_SCHED_SWEEP_INTERVAL = int(os.getenv("DRUM_SCHED_SWEEP_INTERVAL", 60))
+DRUM_SCHED_SWEEP_MIN_AGE = int(os.getenv("DRUM_SCHED_SWEEP_MIN_AGE", 120))
+CELERY_BEAT_SCHEDULE = {
+    "sweep-drum-jobs": {
+        "task": "jobs.tasks.sweep_drum_jobs",
+        "schedule": DRUM_SCHED_SWEEP_INTERVAL,
+    },
+}
+
+# Admission control / ETA
+#   - 단계별 처리 속도(오디오 1초당 처리 초)는 최근 완료 job 의 stage_timings / duration 중앙값
+#   - 대기 중 작업을 다 처리하는 데 DRUM_ADMISSION_MAX_WAIT_SECONDS 이상 걸리면 503 으로 거절
+#   - guest 하나가 대기시켜 둘 수 있는 job 은 DRUM_ADMISSION_GUEST_MAX_PENDING 개 (초과 시 429)
+DRUM_ETA_SAMPLE_SIZE = int(os.getenv("DRUM_ETA_SAMPLE_SIZE", 200))
+DRUM_ETA_STATS_TTL = int(os.getenv("DRUM_ETA_STATS_TTL", 60))
+# lane 별 대기 적체(진행 중 job 들의 예상 처리 시간 합) 캐시 시간 (초)
+DRUM_ETA_BACKLOG_TTL = int(os.getenv("DRUM_ETA_BACKLOG_TTL", 5))
+DRUM_ETA_DEFAULT_AUDIO_SECONDS = int(os.getenv("DRUM_ETA_DEFAULT_AUDIO_SECONDS", 240))
+DRUM_ADMISSION_MAX_WAIT_SECONDS = int(os.getenv("DRUM_ADMISSION_MAX_WAIT_SECONDS", 30 * 60))
+DRUM_ADMISSION_GUEST_MAX_PENDING = int(os.getenv("DRUM_ADMISSION_GUEST_MAX_PENDING", 5))
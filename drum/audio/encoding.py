@@ -0,0 +1,122 @@
+import logging
+from pathlib import Path
+from typing import Union, Optional
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+
+# 출력 오디오 포맷별 (확장자, Content-Type)
+AUDIO_FORMATS = {
+    "wav": (".wav", "audio/wav"),
+    "flac": (".flac", "audio/flac"),
+    "mp3": (".mp3", "audio/mpeg"),
+    "opus": (".opus", "audio/ogg"),
+}
+
+MP3_BITRATE_KBPS = 192
+
+# libsndfile 의 Opus 인코더가 받는 sample rate
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def normalize_audio_format(audio_format: Optional[str]) -> str:
+    # "MP3", ".flac" 같은 입력을 AUDIO_FORMATS 의 key 로 정규화
+    fmt = (audio_format or "wav").lower().lstrip(".")
+    if fmt not in AUDIO_FORMATS:
+        raise ValueError(f"지원하지 않는 오디오 포맷입니다: {audio_format}")
+    return fmt
+
+
+def audio_extension(audio_format: Optional[str]) -> str:
+    return AUDIO_FORMATS[normalize_audio_format(audio_format)][0]
+
+
+def audio_content_type(audio_format: Optional[str]) -> str:
+    return AUDIO_FORMATS[normalize_audio_format(audio_format)][1]
+
+
+def audio_duration(path: Union[str, Path]) -> Optional[float]:
+    # 헤더만 읽어서 길이(초) 계산. 읽을 수 없는 포맷이면 None
+    try:
+        return float(sf.info(str(path)).duration)
+    except Exception:
+        return None
+
+
+def write_audio(
+    path: Union[str, Path],
+    samples: np.ndarray,
+    sr: int,
+    audio_format: Optional[str] = "wav",
+) -> Path:
+    """
+    (samples, ch) float 배열을 지정한 포맷으로 저장.
+    wav / flac / opus 는 libsndfile, mp3 는 lameenc 로 인코딩한다.
+    """
+    fmt = normalize_audio_format(audio_format)
+    path = Path(path)
+
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    samples = np.clip(samples, -1.0, 1.0).astype(np.float32, copy=False)
+
+    if fmt == "wav":
+        sf.write(str(path), samples, sr, format="WAV", subtype="PCM_16")
+    elif fmt == "flac":
+        sf.write(str(path), samples, sr, format="FLAC", subtype="PCM_16")
+    elif fmt == "opus":
+        if sr not in OPUS_SAMPLE_RATES:
+            from scipy.signal import resample_poly
+
+            samples = resample_poly(samples, 48000, sr, axis=0).astype(np.float32)
+            sr = 48000
+        sf.write(str(path), samples, sr, format="OGG", subtype="OPUS")
+    elif fmt == "mp3":
+        _write_mp3(path, samples, sr)
+
+    return path
+
+
+def _write_mp3(path: Path, samples: np.ndarray, sr: int) -> None:
+    import lameenc
+
+    channels = min(samples.shape[1], 2)
+    pcm = (samples[:, :channels] * 32767.0).astype("<i2")
+
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(MP3_BITRATE_KBPS)
+    encoder.set_in_sample_rate(sr)
+    encoder.set_channels(channels)
+    encoder.set_quality(2)
+
+    data = encoder.encode(pcm.tobytes()) + encoder.flush()
+    path.write_bytes(data)
+
+
+def encode_audio_file(
+    src_path: Union[str, Path],
+    audio_format: Optional[str],
+    output_path: Optional[Union[str, Path]] = None,
+) -> Path:
+    """
+    이미 렌더링된 오디오 파일(wav 등)을 지정 포맷으로 다시 인코딩.
+    포맷이 같으면 원본 경로를 그대로 반환한다.
+    """
+    fmt = normalize_audio_format(audio_format)
+    src_path = Path(src_path)
+    ext = AUDIO_FORMATS[fmt][0]
+
+    if src_path.suffix.lower() == ext and output_path is None:
+        return src_path
+
+    if output_path is None:
+        output_path = src_path.with_suffix(ext)
+
+    samples, sr = sf.read(str(src_path), dtype="float32", always_2d=True)
+    write_audio(output_path, samples, sr, fmt)
+
+    logger.info(f"오디오 인코딩 완료 ({fmt}): {Path(output_path).name}")
+    return Path(output_path)
@@ -0,0 +1,121 @@
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 업로드된 음원 앞부분(헤더)만 읽어서 길이(초)를 추정.
+# 전체를 받지 않고 ranged read 몇 번으로 끝나도록 wav / mp3 헤더를 직접 파싱한다.
+#   read(start, length) -> bytes : 저장소의 일부 구간 읽기
+
+ReadRange = Callable[[int, int], bytes]
+
+WAV_HEAD_BYTES = 64 * 1024
+MP3_SCAN_BYTES = 16 * 1024
+
+# MPEG Layer III 비트레이트(kbps) / 샘플레이트 표
+MP3_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def probe_duration(read: ReadRange, size: int) -> Optional[float]:
+    """
+    wav / mp3 의 길이(초). 알 수 없는 포맷이거나 헤더가 깨졌으면 None.
+    """
+    try:
+        magic = read(0, 12)
+        if magic[:4] in (b"RIFF", b"RF64") and magic[8:12] == b"WAVE":
+            return _wav_duration(read, size)
+        return _mp3_duration(read, size, magic)
+    except Exception as e:
+        logger.warning("[PROBE] duration probe failed: %s", e)
+        return None
+
+
+def _wav_duration(read: ReadRange, size: int) -> Optional[float]:
+    head = read(0, WAV_HEAD_BYTES)
+    pos = 12
+    byte_rate = None
+
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        chunk_size = int.from_bytes(head[pos + 4:pos + 8], "little")
+
+        if chunk_id == b"fmt ":
+            # audio_format(2) channels(2) sample_rate(4) byte_rate(4) ...
+            byte_rate = int.from_bytes(head[pos + 16:pos + 20], "little")
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            data_start = pos + 8
+            # 스트리밍으로 쓴 wav 는 크기가 0 / 0xFFFFFFFF 로 남아 있을 수 있음 → 파일 끝까지로 계산
+            if chunk_size in (0, 0xFFFFFFFF) or data_start + chunk_size > size:
+                chunk_size = size - data_start
+            return chunk_size / byte_rate
+
+        pos += 8 + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def _mp3_duration(read: ReadRange, size: int, magic: bytes) -> Optional[float]:
+    # ID3v2 태그(앨범 아트 등)는 건너뛰고 첫 프레임부터 본다
+    audio_start = 0
+    if magic[:3] == b"ID3":
+        tag_size = 0
+        for b in magic[6:10]:
+            tag_size = (tag_size << 7) | (b & 0x7F)
+        audio_start = 10 + tag_size + (10 if magic[5] & 0x10 else 0)
+
+    buf = read(audio_start, MP3_SCAN_BYTES)
+
+    for i in range(len(buf) - 4):
+        if buf[i] != 0xFF or buf[i + 1] & 0xE0 != 0xE0:
+            continue
+        frame = _parse_mp3_frame_header(buf[i:i + 4])
+        if frame is None:
+            continue
+
+        version, bitrate_kbps, sample_rate, mono = frame
+        samples_per_frame = 1152 if version == 3 else 576
+
+        # VBR 파일은 Xing/Info 또는 VBRI 헤더에 전체 프레임 수가 있음
+        side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+        xing = i + 4 + side_info
+        if buf[xing:xing + 4] in (b"Xing", b"Info"):
+            flags = int.from_bytes(buf[xing + 4:xing + 8], "big")
+            if flags & 0x1:
+                frames = int.from_bytes(buf[xing + 8:xing + 12], "big")
+                return frames * samples_per_frame / sample_rate
+        vbri = i + 4 + 32
+        if buf[vbri:vbri + 4] == b"VBRI":
+            frames = int.from_bytes(buf[vbri + 14:vbri + 18], "big")
+            return frames * samples_per_frame / sample_rate
+
+        # CBR: 오디오 바이트 수 / 비트레이트
+        return (size - audio_start - i) * 8 / (bitrate_kbps * 1000)
+
+    return None
+
+
+def _parse_mp3_frame_header(header: bytes):
+    # (version, bitrate_kbps, sample_rate, mono) 또는 유효한 Layer III 헤더가 아니면 None
+    version = (header[1] >> 3) & 0x3
+    layer = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x3
+
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrates = MP3_BITRATES["mpeg1" if version == 3 else "mpeg2"]
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    mono = (header[3] >> 6) == 0x3
+    return version, bitrates[bitrate_index], sample_rate, mono
@@ -1,12 +1,16 @@
 import logging
+import threading
 import numpy as np
-import soundfile as sf
 from pathlib import Path
 import librosa
+import soundfile as sf
 import torch
 from demucs import pretrained
 from demucs.apply import apply_model
 
+from drum.audio.encoding import audio_extension, write_audio
+from drum.profiling import span
+
 
 def separate_merge_drum(
     audio_path: Path,
@@ -14,15 +18,47 @@ def separate_merge_drum(
     output_dir=None,
     audio_format: str = "wav",
 ):
+    non_drum_tensor, sr = separate_non_drum(audio_path)
+
+    mix_audio_path = mix_audio_tracks(
+        non_drum_tensor,
+        drum_audio_path,
+        output_dir=output_dir,
+        audio_format=audio_format,
+        sr=sr,
+    )
+    return mix_audio_path
+
+
+DEMUCS_MODEL_NAME = "htdemucs"
+
+_model = None
+_model_device = None
+_model_lock = threading.Lock()
+
+
+def get_demucs_model(device: str):
+    # Demucs 모델은 프로세스당 한 번만 로드 (job 마다 가중치를 다시 읽지 않도록)
+    global _model, _model_device
+
+    with _model_lock:
+        if _model is None or _model_device != device:
+            model = pretrained.get_model(DEMUCS_MODEL_NAME)
+            model.eval()
+            model.to(device)
+            _model, _model_device = model, device
+        return _model
+
+
+def separate_non_drum(audio_path: Path):
+    # Demucs 로 원곡에서 드럼을 제거한 나머지 트랙 (ch, samples) Tensor 와 sample rate 반환
     logger = logging.getLogger(__name__)
     logger.info("=== 음원 병합 중... ===")
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
 
-    # Demucs 모델 로드
-    model = pretrained.get_model("htdemucs")
-    model.eval()
-    model.to(device)
+    # Demucs 모델 로드 (캐시)
+    model = get_demucs_model(device)
 
     # 원곡 로드 & trim
     y, sr = librosa.load(audio_path, res_type="kaiser_best", sr=None, mono=False)
@@ -37,7 +73,8 @@ def separate_merge_drum(
     wav_tensor = wav_tensor.to(device)
 
     # 모델 적용 (드럼 제거)
-    with torch.no_grad():
+    with span("demucs") as record, torch.no_grad():
+        record["bytes"] = wav_tensor.element_size() * wav_tensor.nelement()
         sources = apply_model(
             model, wav_tensor[None], device=device, split=True, overlap=0.25
         )[0]
@@ -49,14 +86,19 @@ def separate_merge_drum(
         if name != "drums":
             non_drum_tensor += sources[i]
 
-    mix_audio_path = mix_audio_tracks(
-        non_drum_tensor,
-        drum_audio_path,
-        output_dir=output_dir,
-        audio_format=audio_format,
-        sr=sr,
-    )
-    return mix_audio_path
+    return non_drum_tensor, sr
+
+
+def save_non_drum(non_drum_tensor: torch.Tensor, sr: int, path: Path) -> Path:
+    # 분리 결과를 checkpoint 로 보관 (32-bit float wav: 믹스 때 정규화하므로 클리핑 없이 그대로 저장)
+    sf.write(str(path), non_drum_tensor.cpu().numpy().T, sr, format="WAV", subtype="FLOAT")
+    return Path(path)
+
+
+def load_non_drum(path: Path):
+    # save_non_drum 으로 저장한 파일 → separate_non_drum 과 같은 (ch, samples) Tensor, sample rate
+    data, sr = sf.read(str(path), dtype="float32", always_2d=True)
+    return torch.from_numpy(np.ascontiguousarray(data.T)), sr
 
 
 def mix_audio_tracks(
@@ -123,9 +165,9 @@ def mix_audio_tracks(
     stem = drum_audio_path.stem
     if stem.endswith("(guide)"):
         stem = stem[: -len("(guide)")]
-    mix_path = output_dir / f"{stem}(mix).{audio_format}"
+    mix_path = output_dir / f"{stem}(mix){audio_extension(audio_format)}"
 
-    sf.write(str(mix_path), out_mix, sr)
+    write_audio(mix_path, out_mix, sr, audio_format)
     logger.info(f"{mix_path.name} 파일이 생성되었습니다.")
 
     return mix_path
@@ -0,0 +1,440 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from drum.pipeline import _stage_module, run_drum_pipeline
+from drum.midi.midi_writer import write_midi
+
+logger = logging.getLogger(__name__)
+
+
+# 드럼 파이프라인 벤치마크.
+#
+#   python -m drum.benchmark run --corpus quick --repeat 3 --out bench.json
+#   python -m drum.benchmark compare base.json bench.json --threshold 0.1
+#
+#   run:     합성 음원(코퍼스)을 만들어 run_drum_pipeline 전체와 단계별 단독 실행을 측정
+#            (단계마다 wall / CPU 시간, 최대 RSS) → JSON
+#   compare: 두 결과(예: 커밋 전/후)를 비교해 threshold 보다 느려진 항목을 출력, 있으면 종료 코드 1
+#
+#   MuseScore(MUSESCORE_PATH) / FluidSynth / Demucs 모델이 없는 환경이면 해당 단계는 error 로 기록하고 계속 진행
+
+BENCHMARK_VERSION = 1
+
+# 단계 단독 실행 순서 (앞 단계 결과를 다음 단계 입력으로 사용)
+ISOLATED_STAGES = ("analysis", "midi", "pdf", "guide", "separation", "mix")
+
+# 합성 음원: (이름, 길이(초), 템포, 채널 수, 샘플레이트, 스타일)
+#   click: 메트로놈 클릭 + 화음, loop: 킥 / 스네어 / 하이햇 드럼 루프 + 화음
+CORPUS = {
+    "quick": [
+        ("click_90bpm_30s_mono_44k", 30, 90, 1, 44100, "click"),
+        ("loop_120bpm_30s_stereo_44k", 30, 120, 2, 44100, "loop"),
+    ],
+    "full": [
+        ("click_90bpm_30s_mono_44k", 30, 90, 1, 44100, "click"),
+        ("loop_120bpm_30s_stereo_44k", 30, 120, 2, 44100, "loop"),
+        ("loop_120bpm_180s_stereo_48k", 180, 120, 2, 48000, "loop"),
+        ("loop_150bpm_180s_mono_48k", 180, 150, 1, 48000, "loop"),
+        ("loop_100bpm_600s_stereo_44k", 600, 100, 2, 44100, "loop"),
+    ],
+}
+
+# 비교 시 이보다 작은 차이는 측정 잡음으로 보고 무시
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA = 16 * 1024 * 1024
+
+
+# ---------------------------------------------------------------------
+# 합성 음원
+# ---------------------------------------------------------------------
+
+
+def write_synthetic_song(path, seconds: float, tempo: int, channels: int, sr: int, style: str = "loop") -> Path:
+    # 박자에 맞춘 타악기 + 4마디마다 바뀌는 화음(사인파). 같은 인자면 항상 같은 파일
+    rng = np.random.default_rng(tempo * 1000 + int(seconds))
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    beat = 60.0 / tempo
+
+    # 화음: I - V - vi - IV
+    chords = [(110.0, 138.6, 164.8), (123.5, 155.6, 185.0), (98.0, 123.5, 146.8), (87.3, 110.0, 130.8)]
+    bar = int(sr * beat * 4)
+    y = np.zeros(n, dtype=np.float32)
+    for i, start in enumerate(range(0, n, bar * 4)):
+        end = min(n, start + bar * 4)
+        for freq in chords[i % len(chords)]:
+            y[start:end] += (0.05 * np.sin(2 * np.pi * freq * t[start:end])).astype(np.float32)
+
+    def add(hit: np.ndarray, at: float) -> None:
+        start = int(at * sr)
+        end = min(n, start + len(hit))
+        if start < n:
+            y[start:end] += hit[: end - start]
+
+    decay = np.arange(int(0.25 * sr)) / sr
+    kick = (0.8 * np.sin(2 * np.pi * (50 + 100 * np.exp(-decay * 30)) * decay) * np.exp(-decay * 12)).astype(np.float32)
+    snare = (0.4 * rng.standard_normal(len(decay)) * np.exp(-decay * 20)).astype(np.float32)
+    hat = (0.15 * rng.standard_normal(int(0.05 * sr)) * np.exp(-np.arange(int(0.05 * sr)) / sr * 80)).astype(np.float32)
+    click = (0.5 * np.sin(2 * np.pi * 1500 * decay[: int(0.02 * sr)])).astype(np.float32)
+
+    beats = int(seconds / beat)
+    for b in range(beats):
+        at = b * beat
+        if style == "click":
+            add(click * (1.5 if b % 4 == 0 else 1.0), at)
+            continue
+        add(kick if b % 2 == 0 else snare, at)
+        add(hat, at)
+        add(hat, at + beat / 2)
+
+    y /= max(1.0, float(np.max(np.abs(y))))
+    data = y if channels == 1 else np.stack([y] * channels, axis=1)
+
+    path = Path(path)
+    sf.write(str(path), data, sr, subtype="PCM_16")
+    return path
+
+
+def build_corpus(corpus_dir, name: str = "quick") -> list[dict]:
+    # 코퍼스 음원을 corpus_dir 에 만들고(이미 있으면 재사용) 목록 반환
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+
+    songs = []
+    for song_name, seconds, tempo, channels, sr, style in CORPUS[name]:
+        path = corpus_dir / f"{song_name}.wav"
+        if not path.exists():
+            write_synthetic_song(path, seconds, tempo, channels, sr, style)
+        songs.append({
+            "name": song_name,
+            "path": str(path),
+            "seconds": seconds,
+            "tempo": tempo,
+            "channels": channels,
+            "sr": sr,
+            "style": style,
+        })
+    return songs
+
+
+# ---------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------
+
+
+def _current_rss() -> int | None:
+    # 현재 RSS(바이트). /proc 가 없는 OS 에서는 None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _max_rss(who: int) -> int:
+    # getrusage 의 ru_maxrss 는 Linux 는 KB, macOS 는 바이트
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _cpu_seconds() -> float:
+    # 이 프로세스(모든 스레드) + 끝난 자식 프로세스(MuseScore / FluidSynth)의 user + sys
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class StageMeter:
+    """
+    블록 하나의 wall / CPU 시간과 그동안의 최대 RSS.
+    RSS 는 백그라운드 스레드가 interval 초마다 읽고, /proc 가 없으면 프로세스 최대 RSS(ru_maxrss)로 대신한다.
+
+        meter = StageMeter()
+        with meter.measure("analysis") as record:
+            ...
+        meter.records["analysis"]  → {"wall", "cpu", "peakRssBytes", "childMaxRssBytes"}
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.records: dict = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        record = {}
+        peak = [_current_rss() or 0]
+        stop = threading.Event()
+
+        def sample() -> None:
+            while not stop.wait(self.interval):
+                rss = _current_rss()
+                if rss is not None and rss > peak[0]:
+                    peak[0] = rss
+
+        sampler = threading.Thread(target=sample, name="bench-rss", daemon=True)
+        children_max_before = _max_rss(resource.RUSAGE_CHILDREN)
+        cpu_started = _cpu_seconds()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["wall"] = round(time.perf_counter() - started, 4)
+            record["cpu"] = round(_cpu_seconds() - cpu_started, 4)
+            stop.set()
+            sampler.join()
+            record["peakRssBytes"] = max(peak[0], _current_rss() or 0) or _max_rss(resource.RUSAGE_SELF)
+            # 자식 프로세스 최대 RSS 는 누적 최댓값이라 이 블록에서 커졌을 때만 의미가 있음
+            children_max = _max_rss(resource.RUSAGE_CHILDREN)
+            record["childMaxRssBytes"] = children_max if children_max > children_max_before else None
+            self.records[name] = record
+
+
+def _median_records(runs: list[dict]) -> dict:
+    # 반복 측정 결과를 합침: 시간은 중앙값, RSS 는 최댓값, 에러는 마지막 것
+    merged = {}
+    for name in dict.fromkeys(name for run in runs for name in run):
+        records = [run[name] for run in runs if name in run]
+        merged[name] = {
+            "wall": round(statistics.median(r["wall"] for r in records), 4),
+            "cpu": round(statistics.median(r["cpu"] for r in records), 4),
+            "peakRssBytes": max(r["peakRssBytes"] for r in records),
+            "childMaxRssBytes": max((r["childMaxRssBytes"] or 0 for r in records), default=0) or None,
+            "runs": len(records),
+        }
+        errors = [r["error"] for r in records if "error" in r]
+        if errors:
+            merged[name]["error"] = errors[-1]
+    return merged
+
+
+# ---------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------
+
+
+def bench_pipeline(song: dict, work_dir: Path, genre: str = "Rock", level: str = "Normal") -> dict:
+    # run_drum_pipeline 전체 1회. 단계별 기록은 pipeline 의 stage 훅으로
+    meter = StageMeter()
+    try:
+        with meter.measure("total"):
+            run_drum_pipeline(
+                song["path"], genre, song["tempo"], level,
+                output_dir=work_dir, stage=meter.measure,
+            )
+    except Exception as e:
+        logger.warning(f"[BENCH] pipeline 실패 {song['name']}: {e}")
+    return meter.records
+
+
+def bench_stages(song: dict, work_dir: Path, stages=ISOLATED_STAGES, genre: str = "Rock", level: str = "Normal") -> dict:
+    # 단계를 하나씩 따로 실행. 앞 단계가 실패하면 그 결과가 필요한 단계는 skipped
+    drum_generation = _stage_module("drum.midi.drum_generation")
+    midi_converter = _stage_module("drum.midi.midi_converter")
+    separation_mix = _stage_module("drum.audio.separation_mix")
+
+    audio_path = Path(song["path"])
+    midi_path = work_dir / f"{audio_path.stem}.mid"
+    state = {}
+
+    def analysis():
+        state["track"] = drum_generation.generate_drum_midi_from_audio(audio_path, genre, song["tempo"], level)
+
+    def midi():
+        write_midi(state["track"], midi_path)
+        state["midi"] = midi_path
+
+    def pdf():
+        midi_converter.render_pdf(state["midi"], work_dir)
+
+    def guide():
+        state["guide"] = midi_converter.render_guide_audio(state["midi"], work_dir)
+
+    def separation():
+        state["non_drum"] = separation_mix.separate_non_drum(audio_path)
+
+    def mix():
+        non_drum, sr = state["non_drum"]
+        separation_mix.mix_audio_tracks(non_drum, Path(state["guide"]), output_dir=work_dir, sr=sr)
+
+    steps = {"analysis": analysis, "midi": midi, "pdf": pdf, "guide": guide, "separation": separation, "mix": mix}
+    meter = StageMeter()
+    for name in stages:
+        try:
+            with meter.measure(name):
+                steps[name]()
+        except KeyError as e:
+            meter.records[name] = {"skipped": f"needs {e.args[0]}"}
+        except Exception as e:
+            logger.warning(f"[BENCH] {name} 단계 실패 {song['name']}: {e}")
+    return meter.records
+
+
+def run_benchmark(
+        corpus: str = "quick",
+        corpus_dir=None,
+        repeat: int = 1,
+        modes=("pipeline", "stages"),
+        stages=ISOLATED_STAGES,
+) -> dict:
+    """
+    코퍼스의 곡마다 modes 를 repeat 번 실행한 결과.
+    반환값: {"version", "createdAt", "commit", "host", "corpus", "songs": [{..., "pipeline": {단계: 기록}, "stages": {...}}]}
+    """
+    corpus_dir = Path(corpus_dir or Path(tempfile.gettempdir()) / "drum_bench_corpus")
+    songs = build_corpus(corpus_dir, corpus)
+
+    # 단계 모듈 import 비용은 결과에 섞이지 않도록 미리
+    from drum.pipeline import preload_stage_modules
+    import_seconds = preload_stage_modules()
+
+    for song in songs:
+        for mode in modes:
+            runs, skipped = [], {}
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory(prefix="drum_bench_") as tmp:
+                    if mode == "pipeline":
+                        records = bench_pipeline(song, Path(tmp))
+                    else:
+                        records = bench_stages(song, Path(tmp), stages)
+                runs.append({name: r for name, r in records.items() if "skipped" not in r})
+                skipped = {name: r for name, r in records.items() if "skipped" in r}
+            song[mode] = {**_median_records(runs), **skipped}
+            logger.info(f"[BENCH] {song['name']} {mode}: {song[mode]}")
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpuCount": os.cpu_count(),
+        },
+        "corpus": corpus,
+        "repeat": repeat,
+        "importSeconds": import_seconds,
+        "songs": songs,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ---------------------------------------------------------------------
+# 비교
+# ---------------------------------------------------------------------
+
+
+def compare_results(base: dict, head: dict, threshold: float = 0.1) -> list[dict]:
+    """
+    base → head 로 바뀐 측정값 목록. 곡 / 모드 / 단계가 둘 다 있는 항목만 비교한다.
+    regression: wall / cpu / peakRssBytes 가 (1 + threshold) 배를 넘고 최소 차이보다 크게 늘어남
+    """
+    base_songs = {song["name"]: song for song in base["songs"]}
+    rows = []
+
+    for song in head["songs"]:
+        base_song = base_songs.get(song["name"])
+        if base_song is None:
+            continue
+        for mode in ("pipeline", "stages"):
+            for name, record in song.get(mode, {}).items():
+                base_record = base_song.get(mode, {}).get(name)
+                if base_record is None or "error" in record or "error" in base_record:
+                    continue
+                if "skipped" in record or "skipped" in base_record:
+                    continue
+                for metric, min_delta in (("wall", MIN_SECONDS_DELTA), ("cpu", MIN_SECONDS_DELTA), ("peakRssBytes", MIN_RSS_DELTA)):
+                    before, after = base_record[metric], record[metric]
+                    ratio = after / before if before else None
+                    rows.append({
+                        "song": song["name"],
+                        "mode": mode,
+                        "stage": name,
+                        "metric": metric,
+                        "base": before,
+                        "head": after,
+                        "ratio": round(ratio, 3) if ratio is not None else None,
+                        "regression": ratio is not None and ratio > 1 + threshold and after - before > min_delta,
+                    })
+    return rows
+
+
+def _format_row(row: dict) -> str:
+    mark = "REGRESSION" if row["regression"] else ""
+    ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+    return (
+        f"{row['song']:<32} {row['mode']:<8} {row['stage']:<10} {row['metric']:<12} "
+        f"{row['base']:>14} {row['head']:>14} {ratio:>7} {mark}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m drum.benchmark", description="드럼 파이프라인 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="코퍼스를 실행해 JSON 으로 저장")
+    run.add_argument("--corpus", choices=sorted(CORPUS), default="quick")
+    run.add_argument("--corpus-dir", default=None, help="합성 음원 저장 위치 (재사용)")
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--mode", choices=("pipeline", "stages", "all"), default="all")
+    run.add_argument("--stages", default=",".join(ISOLATED_STAGES), help="단독 실행할 단계 (쉼표 구분)")
+    run.add_argument("--out", default="bench.json")
+
+    compare = sub.add_parser("compare", help="두 결과를 비교해 느려진 항목 출력")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument("--threshold", type=float, default=0.1, help="허용 비율 (0.1 = 10%%)")
+    compare.add_argument("--all", action="store_true", help="regression 이 아닌 항목도 출력")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "run":
+        modes = ("pipeline", "stages") if args.mode == "all" else (args.mode,)
+        stages = tuple(s.strip() for s in args.stages.split(",") if s.strip())
+        result = run_benchmark(args.corpus, args.corpus_dir, args.repeat, modes, stages)
+        Path(args.out).write_text(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"saved {args.out}")
+        return 0
+
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+    rows = compare_results(base, head, args.threshold)
+    regressions = [row for row in rows if row["regression"]]
+
+    print(f"base={base.get('commit')} head={head.get('commit')} threshold={args.threshold:.0%}")
+    for row in rows if args.all else regressions:
+        print(_format_row(row))
+    print(f"{len(regressions)} regression(s) / {len(rows)} metric(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
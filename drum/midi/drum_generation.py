@@ -6,11 +6,12 @@ from drum.patterns.constants import DRUM_CHANNEL
 import logging
 
 
-def generate_drum_midi_from_audio(audio_path: Path, genre: str, tempo: int, level:str) -> MidiTrack:
+def generate_drum_midi_from_audio(audio_path: Path, genre: str, tempo: int, level:str, max_bars: int = None) -> MidiTrack:
     # 오디오 파일을 분석해서 프레이즈별로 드럼 리듬을 MIDI 트랙에 기록
+    # max_bars: 앞의 몇 마디만 만들 때 (미리보기)
 
     # 1. 오디오 분석
-    result = detect_phrase_transitions(audio_path, tempo)
+    result = detect_phrase_transitions(audio_path, tempo, max_bars=max_bars)
     tempo = result["tempo"]
     num_bars = result["num_bars"]
     transition_bars = result["transition_bars"]
@@ -5,16 +5,40 @@ from pathlib import Path
 import logging
 from typing import Union, Optional
 
-from midi2audio import FluidSynth
+from drum.audio.encoding import encode_audio_file
+from drum.profiling import span
+from drum.watchdog import SubprocessTimeout, cleanup_orphaned_xvfb, run_supervised
 
 logger = logging.getLogger(__name__)
 
+GUIDE_SAMPLE_RATE = 44100
+
 
 def convert_midi(
     midi_path: Union[str, Path],
     output_dir: Optional[Union[str, Path]] = None,
     audio_format: str = "wav",
 ):
+    # MIDI → PDF 악보 + (guide) 드럼 오디오
+    pdf_path = render_pdf(midi_path, output_dir)
+    audio_path = render_guide_audio(midi_path, output_dir, audio_format)
+    return pdf_path, audio_path
+
+
+def _prepare_output_dir(midi_path: Path, output_dir: Optional[Union[str, Path]]) -> Path:
+    if output_dir is None:
+        output_dir = midi_path.parent
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+
+def render_pdf(
+    midi_path: Union[str, Path],
+    output_dir: Optional[Union[str, Path]] = None,
+    timeout: Optional[float] = None,
+) -> Path:
     midi_path = Path(midi_path)
 
     # 0) MuseScore 실행 파일 경로
@@ -28,14 +52,9 @@ def convert_midi(
         logger.warning(f"[주의] MuseScore 경로가 존재하지 않을 수 있음: {musescore_path}")
 
     # 1) 출력 디렉토리 설정
-    if output_dir is None:
-        output_dir = midi_path.parent
-
-    output_dir = Path(output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir = _prepare_output_dir(midi_path, output_dir)
 
     pdf_path = output_dir / f"{midi_path.stem}.pdf"
-    audio_path = output_dir / f"{midi_path.stem}(guide).{audio_format}"
 
     # 2) OS 별 MuseScore 실행 방식 적용
     is_linux = platform.system() == "Linux"
@@ -52,10 +71,17 @@ def convert_midi(
     ]
 
 
-    # PDF 변환 수행
+    # PDF 변환 수행 (timeout 초 안에 끝나지 않으면 xvfb-run / Xvfb / MuseScore 모두 종료)
     logger.info("=== MIDI → PDF 변환 중... ===")
     try:
-        subprocess.run(pdf_command, check=True, capture_output=True, text=True)
+        with span("musescore") as record:
+            record["bytes"] = midi_path.stat().st_size
+            run_supervised(pdf_command, tool="musescore", timeout=timeout)
+    except SubprocessTimeout:
+        if is_linux:
+            # 강제 종료된 Xvfb 가 남긴 lock 파일이 다음 xvfb-run 을 막지 않도록 정리
+            cleanup_orphaned_xvfb()
+        raise
     except subprocess.CalledProcessError as e:
         logger.error(f"PDF 변환 실패: {e.stderr or e}")
         raise RuntimeError(f"PDF 변환 실패: {e.stderr or e}")
@@ -65,6 +91,20 @@ def convert_midi(
 
     logger.info(f"PDF 생성 완료: {pdf_path}")
 
+    return pdf_path
+
+
+def render_guide_audio(
+    midi_path: Union[str, Path],
+    output_dir: Optional[Union[str, Path]] = None,
+    audio_format: str = "wav",
+    timeout: Optional[float] = None,
+) -> Path:
+    midi_path = Path(midi_path)
+    output_dir = _prepare_output_dir(midi_path, output_dir)
+
+    # FluidSynth 는 wav 로 렌더링하고, 다른 포맷은 이후에 인코딩
+    audio_path = output_dir / f"{midi_path.stem}(guide).wav"
 
     # 기존에 오디오 변환을 MuseScore를 사용하였으나, FluidSynth를 사용하도록 변경
     logger.info("=== MIDI → 오디오 변환 중... (FluidSynth) ===")
@@ -88,15 +128,26 @@ def convert_midi(
 
     logger.info(f"사용할 사운드폰트: {soundfont}")
 
-    # FluidSynth 객체 생성
-    fs = FluidSynth(soundfont)
-
-    # 변환 수행
-    fs.midi_to_audio(str(midi_path), str(audio_path))
+    # 변환 수행 (midi2audio 와 같은 명령, 제한 시간 감시)
+    fluidsynth_command = [
+        "fluidsynth", "-ni", soundfont, str(midi_path),
+        "-F", str(audio_path),
+        "-r", str(GUIDE_SAMPLE_RATE),
+    ]
+    try:
+        with span("fluidsynth") as record:
+            record["bytes"] = midi_path.stat().st_size
+            run_supervised(fluidsynth_command, tool="fluidsynth", timeout=timeout)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"오디오 변환 실패: {e.stderr or e}")
+        raise RuntimeError(f"오디오 변환 실패: {e.stderr or e}")
 
     if not audio_path.exists():
         raise FileNotFoundError(f"(guide) 오디오 파일이 생성되지 않았습니다: {audio_path}")
 
     logger.info(f"오디오 생성 완료: {audio_path}")
 
-    return pdf_path, audio_path
+    if audio_format != "wav":
+        audio_path = encode_audio_file(audio_path, audio_format)
+
+    return audio_path
@@ -1,60 +1,266 @@
-from typing import Union, Optional
+from typing import Union, Optional, Callable, ContextManager
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import importlib
 import logging
+import sys
+import time
 
+from drum.audio.encoding import encode_audio_file, normalize_audio_format
 from drum.midi.midi_writer import create_midi_path, write_midi
-from drum.midi.drum_generation import generate_drum_midi_from_audio
-from drum.midi.midi_converter import convert_midi
-from drum.audio.separation_mix import separate_merge_drum
+from drum.profiling import span
 
 logger = logging.getLogger(__name__)
 
 
+# 무거운 라이브러리를 끌어오는 단계 모듈들.
+# 웹 프로세스(presign / 상태 조회)가 import 비용(수 초, 수백 MB)을 치르지 않도록
+# 모듈 import 시점이 아니라 단계를 처음 실행할 때 import 한다.
+STAGE_MODULES = (
+    "drum.midi.drum_generation",  # librosa (numba)
+    "drum.midi.midi_converter",   # MuseScore / FluidSynth (subprocess)
+    "drum.audio.separation_mix",  # torch / demucs / librosa
+)
+
+# 단계 모듈별 import 소요시간(초)
+IMPORT_SECONDS: dict = {}
+
+
+def _stage_module(name: str):
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_SECONDS[name] = round(time.perf_counter() - started, 3)
+        logger.info(f"[DRUM PIPELINE] import {name}: {IMPORT_SECONDS[name]:.2f}s")
+    return module
+
+
+def preload_stage_modules() -> dict:
+    """
+    단계 모듈을 미리 import (Celery 워커 시작 시 사용).
+    반환값: 모듈별 import 소요시간(초)
+    """
+    for name in STAGE_MODULES:
+        _stage_module(name)
+    return dict(IMPORT_SECONDS)
+
+
+# 파이프라인 단계 이름 (순서대로). 다운로드/업로드는 파이프라인 밖(jobs.tasks)에서 수행
+PIPELINE_STAGES = ("analysis", "midi", "pdf", "guide", "separation", "mix")
+
+
+def _no_stage(name: str) -> ContextManager:
+    return nullcontext()
+
+
 def run_drum_pipeline(
         audio_path: Union[str, Path],
         genre: str,
         tempo: int,
         level: str,
         output_dir: Optional[Union[str, Path]] = None,
+        audio_format: str = "wav",
+        audio_stream=None,
+        stage: Optional[Callable[[str], ContextManager]] = None,
 ):
     """
     S3에서 다운로드된 audio 파일을 받아
     드럼 MIDI, PDF, 믹스 오디오를 생성하는 파이프라인.
 
+    audio_format: 가이드/믹스 오디오의 출력 포맷 (wav / flac / mp3 / opus)
+    audio_stream: 아직 다운로드 중인 audio_path 를 읽는 file-like 객체 (선택).
+        주어지면 분석 단계가 다운로드 완료를 기다리지 않고 스트림에서 바로 디코딩하고,
+        원본 파일 전체가 필요한 음원 분리 전에 audio_stream.wait_complete() 를 호출한다.
+    stage: 단계 이름을 받아 context manager 를 돌려주는 함수 (선택).
+        PIPELINE_STAGES 의 각 단계를 `with stage(name):` 로 감싸 진행률/소요시간 기록에 사용.
+
     반환값: dict 형태로 결과 파일들의 로컬 경로를 제공.
     """
 
     audio_path = Path(audio_path)
+    audio_format = normalize_audio_format(audio_format)
+
+    # 1~4. 분석 → MIDI → PDF → 가이드 오디오(wav)
+    score = run_score_stages(
+        audio_path, genre, tempo, level,
+        output_dir=output_dir, audio_stream=audio_stream, stage=stage,
+    )
+
+    # 5. 원곡 + 드럼 오디오 병합
+    #    (스트림으로 받는 중이면 원본 파일이 모두 도착할 때까지 대기)
+    if audio_stream is not None:
+        audio_stream.wait_complete()
+
+    #    가이드 오디오 인코딩은 백그라운드 스레드에서 Demucs 분리와 겹쳐서 수행
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="drum-encode") as encoder:
+        guide_future = encoder.submit(encode_audio_file, score["drum_audio"], audio_format)
+
+        mix_audio_path = run_mix_stages(
+            audio_path, score["drum_audio"], audio_format=audio_format, stage=stage
+        )
+
+        drum_audio_path = guide_future.result()
+        logger.info(f"[DRUM PIPELINE] 가이드 오디오 인코딩: {drum_audio_path}")
+
+    return {
+        "midi": str(score["midi"]),
+        "pdf": str(score["pdf"]),
+        "drum_audio": str(drum_audio_path),
+        "mix_audio": str(mix_audio_path),
+    }
+
+
+def _no_checkpoint(name: str, path: Path) -> None:
+    pass
+
+
+def run_score_stages(
+        audio_path: Union[str, Path],
+        genre: str,
+        tempo: int,
+        level: str,
+        output_dir: Optional[Union[str, Path]] = None,
+        audio_stream=None,
+        stage: Optional[Callable[[str], ContextManager]] = None,
+        completed: Optional[dict] = None,
+        on_complete: Optional[Callable[[str, Path], None]] = None,
+) -> dict:
+    """
+    가벼운 단계들: 분석 → MIDI → PDF → 가이드 오디오(wav) 렌더링.
+    반환값: { "midi", "pdf", "drum_audio" } 로컬 경로 (drum_audio 는 wav)
+
+    completed: 이전 시도에서 끝난 단계의 산출물 { "midi": 로컬 경로, "pdf": ..., "drum_audio": ... } (선택).
+        있는 단계는 다시 실행하지 않는다. midi 가 있으면 audio_path 는 None 이어도 된다.
+    on_complete: 단계가 끝날 때마다 (단계 이름, 산출물 경로) 로 호출 (checkpoint 저장용)
+    """
+
+    stage = stage or _no_stage
+    on_complete = on_complete or _no_checkpoint
+    completed = completed or {}
 
     if output_dir:
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
     else:
-        output_dir = audio_path.parent
+        output_dir = Path(audio_path).parent
 
-    # 1. MIDI 파일 경로 생성
-    midi_path = create_midi_path(audio_path, output_dir)
+    drum_generation = _stage_module("drum.midi.drum_generation")
+    midi_converter = _stage_module("drum.midi.midi_converter")
 
-    # 2. 드럼 MIDI 생성
-    drum_track = generate_drum_midi_from_audio(audio_path, genre, tempo, level)
+    midi_path = completed.get("midi")
+    if midi_path is None:
+        # 1. MIDI 파일 경로 생성
+        audio_path = Path(audio_path)
+        midi_path = create_midi_path(audio_path, output_dir)
 
-    # 3. MIDI 저장
-    write_midi(drum_track, midi_path)
-    logger.info(f"[DRUM PIPELINE] MIDI 생성: {midi_path}")
+        # 2. 드럼 MIDI 생성
+        with stage("analysis"):
+            drum_track = drum_generation.generate_drum_midi_from_audio(
+                audio_stream if audio_stream is not None else audio_path, genre, tempo, level
+            )
+
+        # 3. MIDI 저장
+        with stage("midi"), span("midi_write") as record:
+            write_midi(drum_track, midi_path)
+            record["bytes"] = Path(midi_path).stat().st_size
+        logger.info(f"[DRUM PIPELINE] MIDI 생성: {midi_path}")
+        on_complete("midi", midi_path)
 
     # 4. PDF / 드럼 오디오 변환
-    pdf_path, drum_audio_path = convert_midi(midi_path)
-    logger.info(f"[DRUM PIPELINE] PDF 생성: {pdf_path}")
-    logger.info(f"[DRUM PIPELINE] 드럼 오디오 생성: {drum_audio_path}")
+    pdf_path = completed.get("pdf")
+    if pdf_path is None:
+        with stage("pdf"):
+            pdf_path = midi_converter.render_pdf(midi_path)
+        logger.info(f"[DRUM PIPELINE] PDF 생성: {pdf_path}")
+        on_complete("pdf", pdf_path)
 
-    # 5. 원곡 + 드럼 오디오 병합
-    mix_audio_path = separate_merge_drum(audio_path, drum_audio_path)
-    logger.info(f"[DRUM PIPELINE] 믹스 오디오 생성: {mix_audio_path}")
+    drum_audio_path = completed.get("drum_audio")
+    if drum_audio_path is None:
+        with stage("guide"):
+            drum_audio_path = midi_converter.render_guide_audio(midi_path)
+        logger.info(f"[DRUM PIPELINE] 드럼 오디오 생성: {drum_audio_path}")
+        on_complete("guide", drum_audio_path)
 
+    return {"midi": midi_path, "pdf": pdf_path, "drum_audio": drum_audio_path}
 
-    return {
-        "midi": str(midi_path),
-        "pdf": str(pdf_path),
-        "drum_audio": str(drum_audio_path),
-        "mix_audio": str(mix_audio_path),
-    }
+
+def run_preview_stages(
+        audio_path: Union[str, Path],
+        genre: str,
+        tempo: int,
+        level: str,
+        bars: int,
+        output_dir: Optional[Union[str, Path]] = None,
+        audio_stream=None,
+) -> dict:
+    """
+    미리보기: 앞의 bars 마디만 분석 → MIDI → PDF.
+    가이드 오디오 렌더링과 Demucs 분리는 하지 않고, 스트림이면 앞부분만 도착하면 바로 시작한다.
+    반환값: { "midi", "pdf" } 로컬 경로
+    """
+
+    audio_path = Path(audio_path)
+    output_dir = Path(output_dir) if output_dir else audio_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    drum_generation = _stage_module("drum.midi.drum_generation")
+    midi_converter = _stage_module("drum.midi.midi_converter")
+
+    drum_track = drum_generation.generate_drum_midi_from_audio(
+        audio_stream if audio_stream is not None else audio_path, genre, tempo, level, max_bars=bars
+    )
+
+    midi_path = output_dir / "preview.mid"
+    write_midi(drum_track, midi_path)
+    pdf_path = midi_converter.render_pdf(midi_path)
+    logger.info(f"[DRUM PIPELINE] 미리보기 ({bars}마디) 생성: {pdf_path}")
+
+    return {"midi": midi_path, "pdf": pdf_path}
+
+
+def run_mix_stages(
+        audio_path: Union[str, Path],
+        drum_audio_path: Union[str, Path],
+        output_dir: Optional[Union[str, Path]] = None,
+        audio_format: str = "wav",
+        stage: Optional[Callable[[str], ContextManager]] = None,
+        non_drum_path: Optional[Union[str, Path]] = None,
+        on_complete: Optional[Callable[[str, Path], None]] = None,
+) -> Path:
+    """
+    무거운 단계들: Demucs 로 원곡의 드럼 제거 → 가이드 드럼과 믹스.
+    반환값: audio_format 으로 저장된 믹스 오디오 경로
+
+    non_drum_path: 이전 시도에서 저장해 둔 분리 결과 (선택). 있으면 Demucs 를 다시 돌리지 않는다.
+    on_complete: 주어지면 분리 결과를 output_dir 에 저장하고 ("separation", 경로) 로 호출 (checkpoint 저장용)
+    """
+
+    stage = stage or _no_stage
+    separation_mix = _stage_module("drum.audio.separation_mix")
+
+    if non_drum_path is not None:
+        non_drum_tensor, sr = separation_mix.load_non_drum(Path(non_drum_path))
+    else:
+        with stage("separation"):
+            non_drum_tensor, sr = separation_mix.separate_non_drum(Path(audio_path))
+        if on_complete is not None:
+            stem_dir = Path(output_dir) if output_dir else Path(drum_audio_path).parent
+            on_complete(
+                "separation",
+                separation_mix.save_non_drum(non_drum_tensor, sr, stem_dir / "non_drum.wav"),
+            )
+
+    with stage("mix"), span("mix") as record:
+        mix_audio_path = separation_mix.mix_audio_tracks(
+            non_drum_tensor,
+            Path(drum_audio_path),
+            output_dir=output_dir,
+            audio_format=audio_format,
+            sr=sr,
+        )
+        record["bytes"] = non_drum_tensor.element_size() * non_drum_tensor.nelement()
+    logger.info(f"[DRUM PIPELINE] 믹스 오디오 생성: {mix_audio_path}")
+
+    return mix_audio_path
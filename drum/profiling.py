@@ -0,0 +1,85 @@
+import logging
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 파이프라인 내부 구간(span) 계측.
+#
+#   with span("decode") as record:
+#       y, sr = librosa.load(...)
+#       record["bytes"] = y.nbytes
+#
+#   span 마다 소요시간 / CPU 시간(자식 프로세스 포함) / 최대 RSS 증가분 / 처리한 바이트 수를 재서
+#   [SPAN] 로그(extra={"span": ...})로 남기고, collect_spans() 안이면 그 목록에도 추가한다.
+#   span 하나에 getrusage 네 번 + perf_counter 두 번이라 운영 환경에서 항상 켜 둬도 되는 비용이다.
+
+_spans: ContextVar[Optional[list]] = ContextVar("drum_spans", default=None)
+
+
+@contextmanager
+def collect_spans(spans: Optional[list] = None):
+    # 블록 안에서 끝난 span 기록(dict)을 spans 에 모은다. 같은 스레드(context) 의 span 만 모인다
+    spans = [] if spans is None else spans
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def _usage() -> tuple[float, float, int, int]:
+    # (이 프로세스 CPU 초, 끝난 자식 프로세스 CPU 초, 최대 RSS, 자식 최대 RSS)
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss 는 Linux 는 KB, macOS 는 바이트
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (
+        own.ru_utime + own.ru_stime,
+        children.ru_utime + children.ru_stime,
+        own.ru_maxrss * unit,
+        children.ru_maxrss * unit,
+    )
+
+
+@contextmanager
+def span(name: str):
+    record = {"name": name}
+    cpu_before, child_cpu_before, rss_before, child_rss_before = _usage()
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["ok"] = False
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        cpu_after, child_cpu_after, rss_after, child_rss_after = _usage()
+
+        record["seconds"] = round(seconds, 4)
+        record["cpu"] = round((cpu_after - cpu_before) + (child_cpu_after - child_cpu_before), 4)
+        # 프로세스 최대 RSS 가 이 구간에서 늘어난 양 (이전 최댓값 아래에서 쓴 메모리는 0)
+        record["peakRssDelta"] = rss_after - rss_before
+        if child_rss_after > child_rss_before:
+            # MuseScore / FluidSynth 처럼 자식 프로세스가 지금까지보다 메모리를 더 쓴 경우
+            record["childPeakRss"] = child_rss_after
+        record.setdefault("bytes", None)
+
+        spans = _spans.get()
+        if spans is not None:
+            spans.append(record)
+
+        logger.info(
+            "[SPAN] name=%s seconds=%.3f cpu=%.3f peak_rss_delta=%d bytes=%s",
+            name,
+            record["seconds"],
+            record["cpu"],
+            record["peakRssDelta"],
+            record["bytes"],
+            extra={"span": record},
+        )
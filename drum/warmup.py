@@ -0,0 +1,79 @@
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from drum.pipeline import run_mix_stages, run_score_stages
+
+logger = logging.getLogger(__name__)
+
+
+# 워커 프로세스 warm-up: 짧은 합성 음원을 파이프라인 단계에 한 번 통과시켜
+# numba JIT 컴파일(librosa), torch 초기화 / Demucs 모델 로드, 사운드폰트·MuseScore 첫 실행 비용을
+# 첫 job 이 아니라 워커 시작 시에 치르게 한다.
+#   score: 분석 → MIDI → PDF → 가이드 오디오 (drum_light)
+#   mix:   Demucs 분리 → 믹스 (drum_heavy_*)
+
+WARMUP_STAGES = ("score", "mix")
+
+WARMUP_CLIP_SECONDS = 8.0
+WARMUP_SAMPLE_RATE = 44100
+WARMUP_TEMPO = 120
+
+
+def write_warmup_clip(path, seconds: float = WARMUP_CLIP_SECONDS, sr: int = WARMUP_SAMPLE_RATE) -> Path:
+    # 베이스 톤 + 박자마다 노이즈 버스트(킥/스네어 대용) → 분석 단계가 실제 음원처럼 onset 을 찾음
+    rng = np.random.default_rng(0)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    y = 0.1 * np.sin(2 * np.pi * 110 * t)
+
+    beat = int(sr * 60 / WARMUP_TEMPO)
+    burst = np.exp(-np.arange(2048) / 300.0) * rng.standard_normal(2048) * 0.5
+    for start in range(0, n, beat):
+        end = min(n, start + len(burst))
+        y[start:end] += burst[: end - start]
+
+    path = Path(path)
+    sf.write(str(path), np.stack([y, y], axis=1).astype(np.float32), sr)
+    return path
+
+
+def warm_up_pipeline(stages=WARMUP_STAGES) -> dict:
+    """
+    합성 음원으로 stages 를 한 번씩 실행.
+    반환값: {"seconds": 전체, "stages": {단계: 초}, "errors": {단계: 메시지}}
+    warm-up 실패는 워커를 멈추지 않도록 예외 대신 errors 로 돌려준다.
+    """
+    started = time.perf_counter()
+    report = {"stages": {}, "errors": {}}
+
+    with tempfile.TemporaryDirectory(prefix="drum_warmup_") as tmp:
+        tmp_dir = Path(tmp)
+        clip = write_warmup_clip(tmp_dir / "warmup.wav")
+        guide = clip
+
+        if "score" in stages:
+            stage_started = time.perf_counter()
+            try:
+                score = run_score_stages(clip, "Rock", WARMUP_TEMPO, "Normal", output_dir=tmp_dir)
+                guide = score["drum_audio"]
+            except Exception as e:
+                logger.warning(f"[WARMUP] score 단계 실패: {e}")
+                report["errors"]["score"] = str(e)
+            report["stages"]["score"] = round(time.perf_counter() - stage_started, 3)
+
+        if "mix" in stages:
+            stage_started = time.perf_counter()
+            try:
+                run_mix_stages(clip, guide, output_dir=tmp_dir)
+            except Exception as e:
+                logger.warning(f"[WARMUP] mix 단계 실패: {e}")
+                report["errors"]["mix"] = str(e)
+            report["stages"]["mix"] = round(time.perf_counter() - stage_started, 3)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,201 @@
+import logging
+import os
+import signal
+import subprocess
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+
+# 외부 렌더러(xvfb-run + MuseScore / FluidSynth) 실행 감시.
+#   - 단계별 제한 시간 안에 끝나지 않으면 프로세스 그룹 전체를 종료 (xvfb-run 이 띄운 Xvfb 포함)
+#   - 멈춘 횟수는 도구별로 HANG_COUNTS 에 누적 ([WATCHDOG] 로그에도 함께 남김)
+#   - 워커가 죽으면서 남긴 Xvfb / lock 파일은 cleanup_orphaned_xvfb() 로 정리
+
+# 도구별 제한 시간 / SIGTERM 후 SIGKILL 까지 기다리는 시간은 config/settings.py 에서 읽는다.
+# Django 없이 파이프라인만 실행할 때(drum.benchmark 등)는 아래 기본값
+TIMEOUT_SETTINGS = {
+    "musescore": "DRUM_MUSESCORE_TIMEOUT_SECONDS",
+    "fluidsynth": "DRUM_FLUIDSYNTH_TIMEOUT_SECONDS",
+}
+DEFAULT_TIMEOUT_SECONDS = 120.0
+DEFAULT_KILL_GRACE_SECONDS = 5.0
+
+# 도구별 제한 시간 초과 횟수 (프로세스 단위)
+HANG_COUNTS: Counter = Counter()
+
+
+class SubprocessTimeout(RuntimeError):
+    # 외부 프로세스가 제한 시간 안에 끝나지 않아 강제 종료함
+    code = "SUBPROCESS_TIMEOUT"
+
+    def __init__(self, tool: str, timeout: float, command: Sequence[str]):
+        super().__init__(f"{tool} timed out after {timeout:g}s")
+        self.tool = tool
+        self.timeout = timeout
+        self.command = list(command)
+
+    def to_dict(self) -> dict:
+        return {
+            "code": self.code,
+            "tool": self.tool,
+            "timeoutSeconds": self.timeout,
+            "command": Path(self.command[0]).name if self.command else None,
+        }
+
+
+def _setting(name: str, default: float) -> float:
+    try:
+        return float(getattr(settings, name, default))
+    except ImproperlyConfigured:
+        return default
+
+
+def tool_timeout(tool: str) -> float:
+    # 도구별 제한 시간 (초)
+    return _setting(TIMEOUT_SETTINGS.get(tool, ""), DEFAULT_TIMEOUT_SECONDS)
+
+
+def run_supervised(
+        command: Sequence[str],
+        tool: str,
+        timeout: Optional[float] = None,
+        kill_grace: Optional[float] = None,
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(command, check=True, capture_output=True, text=True) 와 같지만
+    자식을 새 세션(프로세스 그룹)으로 띄우고, timeout 초가 지나면 그룹 전체를 종료한 뒤 SubprocessTimeout.
+    timeout / kill_grace 를 주지 않으면 설정값(tool_timeout / DRUM_SUBPROCESS_KILL_GRACE_SECONDS).
+    종료 코드가 0 이 아니면 subprocess.CalledProcessError.
+    """
+    if timeout is None:
+        timeout = tool_timeout(tool)
+    if kill_grace is None:
+        kill_grace = _setting("DRUM_SUBPROCESS_KILL_GRACE_SECONDS", DEFAULT_KILL_GRACE_SECONDS)
+
+    proc = subprocess.Popen(
+        list(command),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_process_group(proc, kill_grace)
+        HANG_COUNTS[tool] += 1
+        logger.error(
+            "[WATCHDOG] hang tool=%s pid=%d timeout=%gs hangs=%d",
+            tool,
+            proc.pid,
+            timeout,
+            HANG_COUNTS[tool],
+        )
+        raise SubprocessTimeout(tool, timeout, command) from None
+    except BaseException:
+        # task 취소(SoftTimeLimitExceeded 등)로 빠져나가도 자식을 남기지 않음
+        _kill_process_group(proc, 0)
+        raise
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, list(command), stdout, stderr)
+    return subprocess.CompletedProcess(list(command), proc.returncode, stdout, stderr)
+
+
+def _kill_process_group(proc: subprocess.Popen, grace: float) -> None:
+    # SIGTERM → grace 초 대기 → 그룹에 남은 프로세스가 있으면 SIGKILL
+    if not hasattr(os, "killpg"):
+        proc.kill()
+        proc.communicate()
+        return
+
+    _signal_group(proc.pid, signal.SIGTERM)
+    try:
+        proc.communicate(timeout=grace)
+    except subprocess.TimeoutExpired:
+        pass
+    # 그룹 리더(xvfb-run)가 끝났어도 Xvfb 같은 자식이 남아 있을 수 있음
+    _signal_group(proc.pid, signal.SIGKILL)
+    proc.communicate()
+
+
+def _signal_group(pgid: int, sig: int) -> None:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+X_LOCK_DIR = Path("/tmp")
+X_SOCKET_DIR = Path("/tmp/.X11-unix")
+
+
+def cleanup_orphaned_xvfb() -> int:
+    """
+    xvfb-run 이 죽으면서 남긴 Xvfb(부모가 init 으로 바뀐 것)를 종료하고,
+    주인 프로세스가 없는 /tmp/.X{n}-lock 과 소켓을 삭제. 정리한 개수 반환 (Linux 전용).
+    """
+    proc_dir = Path("/proc")
+    if not proc_dir.is_dir():
+        return 0
+
+    removed = 0
+    uid = os.getuid()
+
+    for entry in proc_dir.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            if entry.stat().st_uid != uid:
+                continue
+            # /proc/{pid}/stat: pid (comm) state ppid ...
+            stat = (entry / "stat").read_text()
+            comm = stat[stat.index("(") + 1:stat.rindex(")")]
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+            cmdline = (entry / "cmdline").read_bytes().decode(errors="replace")
+        except (OSError, ValueError):
+            continue
+
+        # xvfb-run 은 Xvfb 에 xvfb-run.XXXXXX 임시 디렉터리의 auth 파일을 넘긴다
+        if comm != "Xvfb" or ppid != 1 or "xvfb-run." not in cmdline:
+            continue
+        try:
+            os.kill(int(entry.name), signal.SIGKILL)
+        except OSError:
+            continue
+        removed += 1
+        logger.info("[WATCHDOG] killed orphan Xvfb pid=%s", entry.name)
+
+    for lock in X_LOCK_DIR.glob(".X*-lock"):
+        try:
+            if lock.stat().st_uid != uid:
+                continue
+            pid = int(lock.read_text().strip())
+        except (OSError, ValueError):
+            continue
+        if _pid_alive(pid):
+            continue
+        display = lock.name[2:-len("-lock")]
+        lock.unlink(missing_ok=True)
+        (X_SOCKET_DIR / f"X{display}").unlink(missing_ok=True)
+        removed += 1
+        logger.info("[WATCHDOG] removed stale X lock display=:%s", display)
+
+    return removed
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
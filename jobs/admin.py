@@ -0,0 +1,55 @@
+from django.contrib import admin
+
+from .models import DrumJob
+from .progress import STAGE_ORDER
+
+
+# 단계별 소요시간 집계에 사용할 최근 완료 job 수
+STAGE_STATS_SAMPLE_SIZE = 500
+
+
+def stage_duration_stats(jobs) -> list[dict]:
+    # stage_timings 의 seconds 를 단계별로 모아 count / 평균 / p50 / p95 / 최대 계산
+    samples: dict[str, list[float]] = {stage: [] for stage in STAGE_ORDER}
+    for timings in jobs:
+        for stage, timing in (timings or {}).items():
+            seconds = timing.get("seconds")
+            if stage in samples and seconds is not None:
+                samples[stage].append(float(seconds))
+
+    stats = []
+    for stage in STAGE_ORDER:
+        values = sorted(samples[stage])
+        if not values:
+            continue
+        n = len(values)
+        stats.append({
+            "stage": stage,
+            "count": n,
+            "avg": round(sum(values) / n, 2),
+            "p50": round(values[(n - 1) // 2], 2),
+            "p95": round(values[min(n - 1, int(n * 0.95))], 2),
+            "max": round(values[-1], 2),
+        })
+    return stats
+
+
+@admin.register(DrumJob)
+class DrumJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "guest_id", "status", "stage", "progress", "duration", "audio_format", "created_at")
+    list_filter = ("status", "stage", "audio_format")
+    search_fields = ("id", "guest_id", "input_key")
+    readonly_fields = ("created_at", "updated_at")
+    change_list_template = "admin/jobs/drumjob/change_list.html"
+
+    def changelist_view(self, request, extra_context=None):
+        # 최근 완료 job 들의 단계별 소요시간 → 실제 병목 단계 확인용
+        timings = (
+            DrumJob.objects.filter(status="DONE")
+            .order_by("-created_at")
+            .values_list("stage_timings", flat=True)[:STAGE_STATS_SAMPLE_SIZE]
+        )
+        extra_context = extra_context or {}
+        extra_context["stage_stats"] = stage_duration_stats(timings)
+        extra_context["stage_stats_sample_size"] = STAGE_STATS_SAMPLE_SIZE
+        return super().changelist_view(request, extra_context=extra_context)
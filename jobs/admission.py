@@ -0,0 +1,190 @@
+import bisect
+import logging
+import math
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from .dedupe import IN_FLIGHT_STATUSES
+from .models import DrumJob
+from .progress import STAGE_ORDER
+from .scheduler import job_size
+
+logger = logging.getLogger(__name__)
+
+# 이력이 없을 때 쓰는 단계별 처리 속도 (오디오 1초당 처리 초, CPU 워커 기준 대략치)
+DEFAULT_STAGE_RATES = {
+    "download": 0.01,
+    "analysis": 0.1,
+    "midi": 0.01,
+    "pdf": 0.05,
+    "guide": 0.05,
+    "separation": 1.0,
+    "mix": 0.05,
+    "upload": 0.02,
+}
+
+# 단계별 처리 속도를 이력에서 계산하려면 필요한 최소 표본 수
+MIN_RATE_SAMPLES = 5
+
+_rates = None
+_rates_at = 0.0
+_rates_lock = threading.Lock()
+
+# lane(size) 별 대기 적체 스냅샷: (만든 시각, 진행 중 job 의 created_at 오름차순, 그 순서의 예상 처리 시간 누적합)
+_backlogs: dict[str, tuple[float, list, list]] = {}
+_backlogs_lock = threading.Lock()
+
+
+class AdmissionRejected(Exception):
+    # 지금은 job 을 받을 수 없음 (status_code: 429 = 제출 속도 / guest 한도, 503 = 전체 적체)
+    # code: 에러 코드 형식으로 응답하는 API(api/views_drums.py)용
+
+    def __init__(self, status_code: int, message: str, retry_after: int, code: str = ""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+        self.code = code
+
+
+def stage_rates() -> dict[str, float]:
+    """
+    단계별 처리 속도 (오디오 1초당 처리 초).
+    최근 완료 job 의 stage_timings[stage].seconds / duration 중앙값, 프로세스별로 DRUM_ETA_STATS_TTL 초 캐시.
+    """
+    global _rates, _rates_at
+
+    with _rates_lock:
+        if _rates is not None and time.monotonic() - _rates_at < settings.DRUM_ETA_STATS_TTL:
+            return _rates
+
+        rows = (
+            DrumJob.objects.filter(status="DONE", duration__gt=0)
+            .order_by("-created_at")
+            .values_list("duration", "stage_timings")[: settings.DRUM_ETA_SAMPLE_SIZE]
+        )
+        samples: dict[str, list[float]] = {stage: [] for stage in STAGE_ORDER}
+        for duration, timings in rows:
+            for stage, timing in (timings or {}).items():
+                seconds = timing.get("seconds")
+                if stage in samples and seconds is not None:
+                    samples[stage].append(float(seconds) / duration)
+
+        _rates = {
+            stage: (
+                statistics.median(samples[stage])
+                if len(samples[stage]) >= MIN_RATE_SAMPLES
+                else DEFAULT_STAGE_RATES[stage]
+            )
+            for stage in STAGE_ORDER
+        }
+        _rates_at = time.monotonic()
+        return _rates
+
+
+def predict_remaining_seconds(duration, stage_timings=None, rates=None) -> float:
+    # 아직 끝나지 않은 단계들의 예상 처리 시간 합 (진행 중인 단계는 이미 지난 시간만큼 뺌)
+    rates = rates or stage_rates()
+    duration = duration or settings.DRUM_ETA_DEFAULT_AUDIO_SECONDS
+    stage_timings = stage_timings or {}
+
+    remaining = 0.0
+    for stage in STAGE_ORDER:
+        timing = stage_timings.get(stage, {})
+        if "endedAt" in timing:
+            continue
+        expected = rates[stage] * duration
+        if "startedAt" in timing:
+            elapsed = (datetime.now() - datetime.fromisoformat(timing["startedAt"])).total_seconds()
+            expected = max(0.0, expected - elapsed)
+        remaining += expected
+    return remaining
+
+
+def _lane_backlog(size: str) -> tuple[list, list]:
+    """
+    size lane 의 진행 중/대기 중인 job 들을 created_at 순으로 본 (created_at 목록, 예상 처리 시간 누적합).
+    진행 중 job 전체를 읽는 비용이 폴링 / 제출마다 들지 않도록 프로세스별로 DRUM_ETA_BACKLOG_TTL 초 캐시.
+    """
+    with _backlogs_lock:
+        cached = _backlogs.get(size)
+        if cached is not None and time.monotonic() - cached[0] < settings.DRUM_ETA_BACKLOG_TTL:
+            return cached[1], cached[2]
+
+        rates = stage_rates()
+        short = Q(duration__lte=settings.DRUM_SHORT_JOB_MAX_SECONDS)
+        jobs = DrumJob.objects.filter(status__in=IN_FLIGHT_STATUSES)
+        jobs = jobs.filter(short) if size == "short" else jobs.exclude(short)
+
+        created, totals = [], [0.0]
+        for created_at, duration, timings in (
+            jobs.order_by("created_at").values_list("created_at", "duration", "stage_timings")
+        ):
+            created.append(created_at)
+            totals.append(totals[-1] + predict_remaining_seconds(duration, timings, rates))
+
+        _backlogs[size] = (time.monotonic(), created, totals)
+        return created, totals
+
+
+def backlog_seconds(size: str, created_before=None) -> float:
+    # size lane 의 진행 중/대기 중인 job 들을 모두 처리하는 데 필요한 예상 시간 합 (created_before 이전 job 만)
+    created, totals = _lane_backlog(size)
+    count = len(created) if created_before is None else bisect.bisect_left(created, created_before)
+    return totals[count]
+
+
+def _slots(size: str) -> int:
+    # size lane 에서 동시에 처리되는 job 수 (스케줄러가 Celery 로 넘기는 최대 개수)
+    return max(1, settings.DRUM_SCHED_MAX_DISPATCHED[size])
+
+
+def _round_eta(seconds: float) -> int:
+    # 폴링마다 값이 흔들리지 않도록 5초 단위로 올림
+    return int(math.ceil(seconds / 5) * 5)
+
+
+def admit_drum_job(guest_id, duration=None) -> int:
+    """
+    새 job 을 받을 수 있는지 판단하고 예상 완료까지 걸리는 시간(초)을 반환.
+    받을 수 없으면 AdmissionRejected.
+    """
+    if guest_id:
+        pending = DrumJob.objects.filter(guest_id=guest_id, status__in=IN_FLIGHT_STATUSES).count()
+        if pending >= settings.DRUM_ADMISSION_GUEST_MAX_PENDING:
+            raise AdmissionRejected(
+                429,
+                "too many pending drum jobs for this guest",
+                retry_after=_round_eta(predict_remaining_seconds(duration)),
+                code="TOO_MANY_PENDING_JOBS",
+            )
+
+    size = job_size(duration)
+    wait = backlog_seconds(size) / _slots(size)
+    if wait > settings.DRUM_ADMISSION_MAX_WAIT_SECONDS:
+        logger.warning("[Admission] shed load: %s lane predicted wait %.0fs", size, wait)
+        raise AdmissionRejected(
+            503,
+            "drum job queue is full, retry later",
+            retry_after=_round_eta(wait - settings.DRUM_ADMISSION_MAX_WAIT_SECONDS),
+            code="SERVER_BUSY",
+        )
+
+    return _round_eta(wait + predict_remaining_seconds(duration))
+
+
+def job_eta_seconds(job: DrumJob) -> int | None:
+    # 예상 남은 시간(초). 끝난 job 이면 None
+    if job.status not in IN_FLIGHT_STATUSES:
+        return None
+
+    remaining = predict_remaining_seconds(job.duration, job.stage_timings)
+    if job.status == "PENDING":
+        size = job_size(job.duration)
+        remaining += backlog_seconds(size, created_before=job.created_at) / _slots(size)
+    return _round_eta(remaining)
@@ -0,0 +1,151 @@
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connection
+
+from .models import DrumJob
+from drum.profiling import span
+
+logger = logging.getLogger(__name__)
+
+
+class StageCheckpoints:
+    """
+    단계별 산출물 checkpoint.
+
+    - 단계가 끝나면 산출물 업로드를 시작하고(계산과 겹쳐서 진행), 다 올라가면 그 key 를 DrumJob.checkpoints[단계] 에 기록
+        { "midi": {"midi": "results/.../drums.mid"}, "separation": {"non_drum": "work/.../non_drum.wav"}, ... }
+    - 재시도(autoretry / 워커가 죽어서 다시 받은 task)는 기록된 단계를 건너뛰고
+      저장된 산출물을 받아 다음 단계부터 이어서 실행한다
+    - 결과물(results/)은 그 자리에 바로 올리고, 중간 산출물(work/)만 job 이 끝나면 clear() 로 삭제
+    """
+
+    def __init__(self, job: DrumJob, storage):
+        self.job = job
+        self.storage = storage
+        self._uploader = None
+        # 단계별 업로드가 끝나고 기록까지 마치면 set
+        self._recorded: list[threading.Event] = []
+        self._errors: list[BaseException] = []
+        self._lock = threading.Lock()
+        self._thread = threading.get_ident()
+
+    def has(self, stage: str) -> bool:
+        return stage in self.job.checkpoints
+
+    def keys(self, stage: str) -> dict:
+        return self.job.checkpoints.get(stage, {})
+
+    def save(self, stage: str, **keys: str) -> None:
+        # 업로드 완료 콜백(업로드 스레드)에서도 불리므로 job.checkpoints 수정 / 저장은 lock 안에서
+        with self._lock:
+            self.job.checkpoints[stage] = keys
+            self.job.save(update_fields=["checkpoints"])
+        logger.info("[DrumJob] checkpoint job_id=%s stage=%s", self.job.id, stage)
+
+    def upload(self, stage: str, files: dict) -> None:
+        """
+        files: { 이름: (로컬 경로, key, content_type) } 의 업로드를 시작하고 바로 반환 → 다음 단계 계산과 겹쳐서 진행.
+        단계의 파일이 모두 올라가면 완료 콜백에서 단계 완료로 기록한다. 기다리는 것은 wait() / uploading() 에서 한 번에.
+        """
+        if self._uploader is None:
+            self._uploader = self.storage.uploader()
+        keys = {name: key for name, (_, key, _) in files.items()}
+        recorded = threading.Event()
+        self._recorded.append(recorded)
+
+        futures = [
+            self._uploader.submit(local_path, key, content_type=content_type)
+            for local_path, key, content_type in files.values()
+        ]
+        remaining = [len(futures)]
+
+        def on_done(_future) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                # 실패한 파일이 있으면 기록하지 않는다 (예외는 wait() 에서)
+                failed = next((future.exception() for future in futures if future.exception()), None)
+                if failed is not None:
+                    self._errors.append(failed)
+                else:
+                    self.save(stage, **keys)
+            except Exception as e:
+                self._errors.append(e)
+            finally:
+                if threading.get_ident() != self._thread:
+                    # 업로드 스레드가 연 DB 커넥션은 여기서 닫는다
+                    connection.close()
+                recorded.set()
+
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def wait(self, raise_errors: bool = True) -> list[dict]:
+        # 시작한 업로드와 그 checkpoint 기록을 모두 기다린다. 실패가 있으면(raise_errors) 첫 번째 예외
+        uploader, self._uploader = self._uploader, None
+        if uploader is None:
+            return []
+
+        reports = []
+        error = None
+        with span("upload") as record:
+            try:
+                reports = uploader.wait()
+            except Exception as e:
+                error = e
+            for recorded in self._recorded:
+                recorded.wait()
+            record["bytes"] = sum(report["bytes"] for report in reports)
+
+        for report in reports:
+            logger.info(
+                "[DrumJob] Uploaded key=%s bytes=%d seconds=%.3f",
+                report["key"],
+                report["bytes"],
+                report["seconds"],
+            )
+
+        self._recorded = []
+        error = error or (self._errors[0] if self._errors else None)
+        self._errors = []
+        if error is not None and raise_errors:
+            raise error
+        return reports
+
+    @contextmanager
+    def uploading(self):
+        # 블록 안에서 시작한 업로드를 블록이 끝날 때 모두 기다린다.
+        # 실패로 끝나도 이미 올라간 단계는 기록해서 재시도가 이어서 실행하게 하고, 작업 공간을 지우기 전에 업로드를 마친다
+        try:
+            yield self
+        except BaseException:
+            self.wait(raise_errors=False)
+            raise
+        self.wait()
+
+    def fetch(self, stage: str, name: str, local_path: Path) -> Path:
+        # 저장된 산출물을 로컬로 받는다
+        download = self.storage.start_download(self.keys(stage)[name], local_path)
+        try:
+            return Path(download.wait())
+        finally:
+            download.close()
+
+    def clear(self) -> None:
+        # 중간 산출물(work/) 삭제 + 기록 초기화 (결과물은 남긴다)
+        for keys in self.job.checkpoints.values():
+            for key in keys.values():
+                if not key.startswith("work/"):
+                    continue
+                try:
+                    self.storage.delete(key)
+                except Exception as e:
+                    logger.warning("[DrumJob] checkpoint cleanup failed key=%s: %s", key, e)
+
+        self.job.checkpoints = {}
+        self.job.save(update_fields=["checkpoints"])
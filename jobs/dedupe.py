@@ -0,0 +1,128 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import DrumJob
+from .scheduler import release_drum_job
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ("PENDING", "RUNNING")
+
+
+class IdempotencyConflict(Exception):
+    # 같은 Idempotency-Key 로 다른 입력 / 옵션의 job 을 요청함
+    pass
+
+
+def job_options(genre, tempo, level, audio_format) -> dict:
+    # 파이프라인이 실제로 쓰는 값으로 정규화 (tasks.py 의 기본값과 같게)
+    try:
+        tempo = int(tempo or 0)
+    except (TypeError, ValueError):
+        tempo = 0
+    return {
+        "genre": genre or "Rock",
+        "tempo": tempo or 120,
+        "level": level or "Normal",
+        "audio_format": audio_format,
+    }
+
+
+def make_dedupe_key(content_hash: str, genre, tempo, level, audio_format) -> str:
+    options = job_options(genre, tempo, level, audio_format)
+    raw = "\0".join(
+        [content_hash, options["genre"], str(options["tempo"]), options["level"], options["audio_format"]]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def find_reusable_job(dedupe_key: str) -> DrumJob | None:
+    """
+    같은 dedupe_key 의 job 중 재사용할 수 있는 것 (DONE 또는 진행 중).
+    오래 갱신되지 않은 진행 중 job 은 ERROR 로 정리하고 재사용하지 않는다.
+    """
+    job = (
+        DrumJob.objects.filter(dedupe_key=dedupe_key, status__in=[*IN_FLIGHT_STATUSES, "DONE"])
+        .order_by("-created_at")
+        .first()
+    )
+    if job is None or job.status == "DONE":
+        return job
+
+    stale_before = timezone.now() - timedelta(seconds=settings.DRUM_JOB_STALE_SECONDS)
+    if job.updated_at >= stale_before:
+        return job
+
+    logger.warning("[DrumJob] stale job_id=%s status=%s → ERROR", job.id, job.status)
+    if job.transition("ERROR", [job.status], error_message="stale job"):
+        # 스케줄러의 실행 자리(RUNNING)도 돌려줌
+        release_drum_job(job.id)
+    return None
+
+
+def find_duplicate_job(guest_id, dedupe_key: str, idempotency_key: str | None = None) -> DrumJob | None:
+    # 1) 같은 guest 의 같은 Idempotency-Key → 그 job
+    #    guest 쿠키가 없는 요청끼리는 key 를 공유하게 되므로 Idempotency-Key 를 쓰지 않는다
+    if idempotency_key and guest_id:
+        job = DrumJob.objects.filter(guest_id=guest_id, idempotency_key=idempotency_key).first()
+        if job is not None:
+            if job.dedupe_key != dedupe_key:
+                raise IdempotencyConflict(idempotency_key)
+            return job
+
+    # 2) 같은 입력 내용 + 옵션으로 진행 중이거나 끝난 job → 그 job
+    return find_reusable_job(dedupe_key)
+
+
+def get_or_create_drum_job(
+    *,
+    guest_id,
+    input_key: str,
+    content_hash: str,
+    genre,
+    tempo,
+    level,
+    audio_format: str,
+    idempotency_key: str | None = None,
+    duration: float | None = None,
+    preview_bars: int | None = None,
+) -> tuple[DrumJob, bool]:
+    """
+    중복 제출이면 기존 job 을(find_duplicate_job), 아니면 새 PENDING job 을 만들어
+    (job, created) 로 반환. 동시 요청끼리는 DB unique 제약으로 하나만 생성된다.
+    같은 Idempotency-Key 로 다른 입력 / 옵션을 보내면 IdempotencyConflict.
+    """
+    dedupe_key = make_dedupe_key(content_hash, genre, tempo, level, audio_format)
+    if not guest_id:
+        idempotency_key = None
+    job = find_duplicate_job(guest_id, dedupe_key, idempotency_key)
+    if job is not None:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = DrumJob.objects.create(
+                guest_id=guest_id,
+                input_key=input_key,
+                genre=genre,
+                tempo=tempo or 0,
+                level=level or "Normal",
+                audio_format=audio_format,
+                duration=duration,
+                preview_bars=preview_bars,
+                status="PENDING",
+                idempotency_key=idempotency_key or None,
+                dedupe_key=dedupe_key,
+            )
+        return job, True
+    except IntegrityError:
+        # 동시에 들어온 같은 요청이 먼저 만든 job
+        job = find_duplicate_job(guest_id, dedupe_key, idempotency_key)
+        if job is None:
+            raise
+        return job, False
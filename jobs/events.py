@@ -0,0 +1,54 @@
+import json
+import logging
+import os
+import threading
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+# Job 진행 상황 push 용 Redis pub/sub
+#   - 워커(단계별 drum task)가 상태/단계 전환 때 publish
+#   - ASGI SSE 엔드포인트가 job 채널을 subscribe 해서 클라이언트로 전달
+
+TERMINAL_STATUSES = {"DONE", "ERROR"}
+
+_redis = None
+_redis_pid = None
+_redis_lock = threading.Lock()
+
+
+def job_channel(job_id) -> str:
+    return f"drumjob:{job_id}"
+
+
+def encode_event(payload: dict) -> str:
+    return json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _get_redis():
+    global _redis, _redis_pid
+
+    with _redis_lock:
+        if _redis is None or _redis_pid != os.getpid():
+            _redis = redis.Redis.from_url(settings.JOB_EVENTS_REDIS_URL)
+            _redis_pid = os.getpid()
+        return _redis
+
+
+def publish_job_event(job_id, payload: dict) -> None:
+    # push 는 부가 기능이므로 Redis 장애가 job 실행을 실패시키지 않도록 함
+    try:
+        _get_redis().publish(job_channel(job_id), encode_event(payload))
+    except Exception as e:
+        logger.warning("[JobEvents] publish failed job_id=%s: %s", job_id, e)
+
+
+def subscribe_job_events(job_id):
+    # 동기 코드에서 job 채널을 구독 (api/views_drums.py 의 bounded wait 용)
+    pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(job_channel(job_id))
+    return pubsub
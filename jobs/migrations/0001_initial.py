@@ -0,0 +1,40 @@
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="DrumJob",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("guest_id", models.CharField(blank=True, max_length=64, null=True)),
+                ("input_key", models.CharField(max_length=255)),
+                ("genre", models.CharField(blank=True, max_length=64, null=True)),
+                ("tempo", models.IntegerField(blank=True, null=True)),
+                ("level", models.CharField(blank=True, max_length=16, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("PENDING", "Pending"), ("RUNNING", "Running"), ("DONE", "Done"), ("ERROR", "Error")],
+                        default="PENDING",
+                        max_length=10,
+                    ),
+                ),
+                ("pdf_key", models.CharField(blank=True, max_length=255, null=True)),
+                ("audio_key", models.CharField(blank=True, max_length=255, null=True)),
+                ("error_message", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
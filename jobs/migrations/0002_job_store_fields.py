@@ -0,0 +1,110 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:58
+
+import jobs.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drumjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        # 이전 job 의 결과물은 모두 wav 로 만들어졌으므로 기존 행은 wav 로 채운다
+        migrations.AddField(
+            model_name='drumjob',
+            name='audio_format',
+            field=models.CharField(default='wav', max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='drumjob',
+            name='audio_format',
+            field=models.CharField(default=jobs.models.default_audio_format, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='checkpoints',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='dedupe_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='error_detail',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='owner_task_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='preview_bars',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='preview_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='spans',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='stage',
+            field=models.CharField(blank=True, choices=[('download', 'Download'), ('analysis', 'Analysis'), ('midi', 'MIDI'), ('pdf', 'PDF'), ('guide', 'Guide audio'), ('separation', 'Separation'), ('mix', 'Mix'), ('upload', 'Upload')], max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='drumjob',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='drumjob',
+            index=models.Index(fields=['guest_id', '-created_at', '-id'], name='drumjob_guest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='drumjob',
+            index=models.Index(fields=['guest_id', 'status'], name='drumjob_guest_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='drumjob',
+            index=models.Index(fields=['status', '-created_at'], name='drumjob_status_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='drumjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('guest_id__isnull', False), ('idempotency_key__isnull', False)), fields=('guest_id', 'idempotency_key'), name='drumjob_unique_idempotency_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='drumjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'RUNNING'])), fields=('dedupe_key',), name='drumjob_unique_inflight_dedupe_key'),
+        ),
+    ]
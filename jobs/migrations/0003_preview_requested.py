@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+def mark_requested_previews(apps, schema_editor):
+    # 이전에는 preview_bars 를 세울 때 미리보기를 바로 넣었으므로 기존 행은 그대로 요청된 것으로 본다
+    DrumJob = apps.get_model('jobs', 'DrumJob')
+    DrumJob.objects.filter(preview_bars__isnull=False).update(preview_requested=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_store_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drumjob',
+            name='preview_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_requested_previews, migrations.RunPython.noop),
+    ]
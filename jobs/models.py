@@ -1,5 +1,12 @@
 import uuid
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+def default_audio_format() -> str:
+    # 요청에 audioFormat 이 없을 때와 같은 기본값 (settings.DRUM_AUDIO_FORMAT)
+    return settings.DRUM_AUDIO_FORMAT
 
 
 class DrumJob(models.Model):
@@ -10,6 +17,18 @@ class DrumJob(models.Model):
         ("ERROR", "Error"),
     ]
 
+    # 진행 단계 (순서대로)
+    STAGE_CHOICES = [
+        ("download", "Download"),
+        ("analysis", "Analysis"),
+        ("midi", "MIDI"),
+        ("pdf", "PDF"),
+        ("guide", "Guide audio"),
+        ("separation", "Separation"),
+        ("mix", "Mix"),
+        ("upload", "Upload"),
+    ]
+
     # UUID 기반 PK
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -23,19 +42,127 @@ class DrumJob(models.Model):
     tempo = models.IntegerField(blank=True, null=True)
     level = models.CharField(max_length=16, blank=True, null=True)
 
+    # 입력 오디오 길이(초). 처리 시간 예측(ETA)에 사용
+    duration = models.FloatField(blank=True, null=True)
+
+    # 가이드/믹스 오디오 출력 포맷 (wav / flac / mp3 / opus)
+    audio_format = models.CharField(max_length=8, default=default_audio_format)
+
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
 
+    # 현재 단계 / 진행률(0~100, 추정치)
+    stage = models.CharField(max_length=16, choices=STAGE_CHOICES, blank=True, null=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+
+    # 단계별 시작/종료 시각과 소요시간
+    # { "analysis": {"startedAt": "...", "endedAt": "...", "seconds": 1.23}, ... }
+    stage_timings = models.JSONField(default=dict, blank=True)
+
+    # 파이프라인 내부 구간 계측 (drum/profiling.py, 실행마다 누적)
+    # [ {"name": "demucs", "seconds": 41.2, "cpu": 160.3, "peakRssDelta": 1073741824, "bytes": 42336000, "attempt": 2}, ... ]
+    spans = models.JSONField(default=list, blank=True)
+
+    # 끝난 단계의 산출물 저장소 key (재시도 시 그 다음 단계부터 이어서 실행, jobs/checkpoints.py)
+    # { "midi": {"midi": "results/..."}, "separation": {"non_drum": "work/..."}, ... }
+    checkpoints = models.JSONField(default=dict, blank=True)
+
+    # 단계 task 가 실행된 횟수 (재시도 / 워커가 죽어서 다시 받은 것 포함)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # 지금 job 을 맡고 있는 단계 task 의 Celery task id (DrumJob.claim)
+    owner_task_id = models.CharField(max_length=64, blank=True, null=True)
+
     # 결과물 S3 key
     pdf_key = models.CharField(max_length=255, blank=True, null=True)
     audio_key = models.CharField(max_length=255, blank=True, null=True)
 
     error_message = models.TextField(blank=True, null=True)
+    # 구조화된 실패 원인 (예: 렌더러 제한 시간 초과)
+    # { "code": "SUBPROCESS_TIMEOUT", "stage": "pdf", "tool": "musescore", "timeoutSeconds": 120, ... }
+    error_detail = models.JSONField(blank=True, null=True)
+
+    # 미리보기 (앞 N 마디 MIDI / PDF). preview_bars 가 null 이면 요청하지 않음
+    preview_bars = models.PositiveSmallIntegerField(blank=True, null=True)
+    preview_ready = models.BooleanField(default=False)
+    # 미리보기를 대기열에 넣었는지. 조건부 UPDATE 로 세워서 같은 job 에 미리보기가 한 번만 들어가게 한다
+    preview_requested = models.BooleanField(default=False)
+
+    # 클라이언트가 보낸 Idempotency-Key (guest 별로 유일)
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+
+    # sha256(입력 내용 해시 + genre/tempo/level/audio_format) → 같은 작업이면 기존 job 재사용
+    dedupe_key = models.CharField(max_length=64, blank=True, null=True, db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # guest 의 job 목록 (최신순 (created_at, id) keyset 페이지네이션)
+            models.Index(fields=["guest_id", "-created_at", "-id"], name="drumjob_guest_created_idx"),
+            # guest 의 진행 중 job 수 (admission)
+            models.Index(fields=["guest_id", "status"], name="drumjob_guest_status_idx"),
+            # 진행 중 job 적체 / 최근 완료 job 통계 (admission, ETA, admin)
+            models.Index(fields=["status", "-created_at"], name="drumjob_status_created_idx"),
+        ]
+        constraints = [
+            # Idempotency-Key 는 guest 쿠키가 있는 요청만 저장 (jobs/dedupe.py)
+            models.UniqueConstraint(
+                fields=["guest_id", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False, guest_id__isnull=False),
+                name="drumjob_unique_idempotency_key",
+            ),
+            # 같은 작업이 동시에 두 번 실행되지 않도록 (진행 중인 job 은 dedupe_key 당 하나)
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status__in=["PENDING", "RUNNING"]),
+                name="drumjob_unique_inflight_dedupe_key",
+            ),
+        ]
+
+    def transition(self, to_status: str, from_statuses, **fields) -> bool:
+        """
+        status 가 from_statuses 중 하나일 때만 to_status 로 바꾸는 조건부 UPDATE.
+            UPDATE ... SET status=to_status, <fields>, updated_at=now
+            WHERE id=... AND status IN (from_statuses)
+        다른 워커가 먼저 상태를 바꿨으면 아무것도 쓰지 않고 False.
+        바뀌었으면 이 인스턴스에도 반영하고 True.
+        """
+        fields["updated_at"] = timezone.now()
+        updated = DrumJob.objects.filter(pk=self.pk, status__in=from_statuses).update(
+            status=to_status, **fields
+        )
+        if not updated:
+            return False
+
+        self.status = to_status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return True
+
+    def claim(self, task_id: str, parent_task_id: str | None = None) -> bool:
+        """
+        단계 task 가 job 을 맡는 조건부 UPDATE.
+            UPDATE ... SET status='RUNNING', owner_task_id=task_id, updated_at=now
+            WHERE id=... AND (status='PENDING'
+                              OR (status='RUNNING' AND owner_task_id IN (task_id, parent_task_id)))
+        RUNNING 인 job 은 맡고 있던 task 자신(재시도 / 다시 전달된 메시지)이나
+        chain 의 바로 앞 단계(parent_task_id)를 이어받는 경우에만 맡을 수 있다.
+        """
+        owners = [task_id] if parent_task_id is None else [task_id, parent_task_id]
+        now = timezone.now()
+        updated = (
+            DrumJob.objects.filter(pk=self.pk)
+            .filter(models.Q(status="PENDING") | models.Q(status="RUNNING", owner_task_id__in=owners))
+            .update(status="RUNNING", owner_task_id=task_id, updated_at=now)
+        )
+        if not updated:
+            return False
+
+        self.status = "RUNNING"
+        self.owner_task_id = task_id
+        self.updated_at = now
+        return True
 
     def __str__(self):
         return f"DrumJob({self.id}) - {self.status}"
@@ -0,0 +1,85 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .models import DrumJob
+
+
+# 단계별 대략적인 비용 비중 (진행률 추정용, 합계 100)
+# Demucs 분리가 대부분을 차지한다
+STAGE_WEIGHTS = {
+    "download": 5,
+    "analysis": 10,
+    "midi": 2,
+    "pdf": 10,
+    "guide": 5,
+    "separation": 55,
+    "mix": 8,
+    "upload": 5,
+}
+
+STAGE_ORDER = [name for name, _ in DrumJob.STAGE_CHOICES]
+
+
+def _progress_before(stage: str) -> int:
+    return sum(STAGE_WEIGHTS[s] for s in STAGE_ORDER[: STAGE_ORDER.index(stage)])
+
+
+class JobProgress:
+    """
+    DrumJob 의 현재 단계 / 진행률 / 단계별 시작·종료 시각을 기록.
+
+        progress = JobProgress(job, on_change=publish)
+        with progress.stage("analysis"):
+            ...
+
+    변경 시 stage / progress / stage_timings 만 저장하고 on_change(job) 를 호출한다.
+    """
+
+    def __init__(self, job: DrumJob, on_change=None):
+        self.job = job
+        self.on_change = on_change
+        self._started: dict[str, float] = {}
+
+    def start(self, stage: str, partial: bool = False) -> None:
+        # partial: 단계의 일부만 실행 (예: chain 중간의 업로드) → 시간만 기록하고 진행률은 올리지 않음
+        now = time.time()
+        self._started[stage] = now
+        self.job.stage = stage
+        if not partial:
+            self.job.progress = max(self.job.progress, _progress_before(stage))
+        # 같은 단계가 여러 task 에 나뉘어 실행되면 처음 시작 시각을 유지하고 시간은 누적
+        self.job.stage_timings.setdefault(stage, {}).setdefault("startedAt", _isoformat(now))
+        self._save()
+
+    def end(self, stage: str, ended_at: float | None = None, partial: bool = False) -> None:
+        # ended_at: 다른 스레드에서 끝난 단계(예: 분석과 겹치는 다운로드)의 실제 종료 시각
+        ended_at = ended_at or time.time()
+        started = self._started.pop(stage, None)
+        timing = self.job.stage_timings.setdefault(stage, {})
+        timing["endedAt"] = _isoformat(ended_at)
+        if started is not None:
+            timing["seconds"] = round(timing.get("seconds", 0.0) + max(0.0, ended_at - started), 3)
+
+        if not partial:
+            self.job.progress = max(
+                self.job.progress, _progress_before(stage) + STAGE_WEIGHTS[stage]
+            )
+        self._save()
+
+    @contextmanager
+    def stage(self, stage: str, partial: bool = False):
+        self.start(stage, partial=partial)
+        yield
+        self.end(stage, partial=partial)
+
+    def _save(self) -> None:
+        self.job.save(update_fields=["stage", "progress", "stage_timings", "updated_at"])
+        if self.on_change is not None:
+            self.on_change(self.job)
+
+
+
+def _isoformat(ts: float) -> str:
+    # USE_TZ=False 이므로 DB 의 다른 시각들과 같은 naive 로컬 시각으로 기록
+    return datetime.fromtimestamp(ts).isoformat()
@@ -0,0 +1,146 @@
+from django.conf import settings
+
+from .admission import job_eta_seconds
+from .models import DrumJob
+from api.storage import get_storage
+from drum.audio.encoding import audio_content_type, audio_extension
+
+
+def build_job_payload(job: DrumJob) -> dict:
+    """
+    Job 상태 응답 본문 (get_drum_job / 진행 상황 push 공용)
+    - DONE 이면 결과물 4개 (midi / pdf / guide / mix)에 대한 presigned URL 포함
+    """
+    audio_type = audio_content_type(job.audio_format)
+    urls = result_urls(job, get_storage()) if job.status == "DONE" else {}
+
+    return {
+        "ok": True,
+        "jobId": str(job.id),
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "etaSeconds": job_eta_seconds(job),  # 예상 남은 시간(초), 끝났으면 null
+        "duration": job.duration,
+        "stageTimings": job.stage_timings,
+        "preview": build_preview_payload(job),
+        "pdfKey": urls.get("pdf"),
+        "audioKey": urls.get("mix"),   # mix 오디오
+        "midiKey": urls.get("midi"),
+        "guideKey": urls.get("guide"),
+        "audioFormat": job.audio_format,
+        "audioContentType": audio_type,
+        "guideContentType": audio_type,
+        "midiContentType": "audio/midi",
+        "pdfContentType": "application/pdf",
+        "errorMessage": job.error_message,
+        "errorDetail": job.error_detail,
+        "createdAt": job.created_at,
+        "updatedAt": job.updated_at,
+    }
+
+
+def build_preview_payload(job: DrumJob) -> dict | None:
+    # 미리보기 (앞 N 마디 MIDI / PDF). 요청하지 않았으면 None, 아직 없으면 URL 이 null
+    if job.preview_bars is None:
+        return None
+
+    pdf_url = midi_url = None
+    if job.preview_ready:
+        storage = get_storage()
+        keys = preview_keys(job)
+        expires_in = settings.PRESIGNED_URL_EXPIRES_IN
+        pdf_url = storage.url(
+            keys["pdf"],
+            expires_in=expires_in,
+            disposition='attachment; filename="easheet_preview.pdf"',
+        )
+        midi_url = storage.url(
+            keys["midi"],
+            expires_in=expires_in,
+            disposition='attachment; filename="easheet_preview.mid"',
+        )
+
+    return {
+        "bars": job.preview_bars,
+        "ready": job.preview_ready,
+        "pdfKey": pdf_url,
+        "midiKey": midi_url,
+    }
+
+
+def preview_keys(job: DrumJob) -> dict:
+    base_prefix = f"results/{job.id}"
+    return {
+        "midi": f"{base_prefix}/preview.mid",
+        "pdf": f"{base_prefix}/preview.pdf",
+    }
+
+
+def build_job_list_payload(jobs: list[DrumJob]) -> list[dict]:
+    """
+    Job 목록 응답 (list_drum_jobs)
+    - 한 페이지의 job 들 중 DONE 인 것만 결과물 URL 을 한 번에 발급
+    - 행마다 DB 조회가 필요한 etaSeconds 는 목록에서 빼고 상세 조회(get_drum_job)에서만 계산
+    """
+    storage = get_storage() if any(job.status == "DONE" for job in jobs) else None
+
+    items = []
+    for job in jobs:
+        urls = result_urls(job, storage) if job.status == "DONE" else {}
+        items.append({
+            "jobId": str(job.id),
+            "status": job.status,
+            "stage": job.stage,
+            "progress": job.progress,
+            "genre": job.genre,
+            "tempo": job.tempo,
+            "level": job.level,
+            "duration": job.duration,
+            "audioFormat": job.audio_format,
+            "pdfKey": urls.get("pdf"),
+            "audioKey": urls.get("mix"),
+            "midiKey": urls.get("midi"),
+            "guideKey": urls.get("guide"),
+            "errorMessage": job.error_message,
+            "createdAt": job.created_at,
+            "updatedAt": job.updated_at,
+        })
+    return items
+
+
+def result_urls(job: DrumJob, storage) -> dict:
+    # DONE job 의 결과물 4개 (midi / pdf / guide / mix) 다운로드 URL
+    audio_ext = audio_extension(job.audio_format)
+    base_prefix = f"results/{job.id}"
+
+    # 우리가 업로드한 실제 key 규칙
+    midi_key = f"{base_prefix}/drums.mid"
+    pdf_key = job.pdf_key or f"{base_prefix}/output.pdf"
+    guide_key = f"{base_prefix}/guide{audio_ext}"
+    mix_key = job.audio_key or f"{base_prefix}/mix{audio_ext}"
+
+    expires_in = settings.PRESIGNED_URL_EXPIRES_IN
+
+    return {
+        "pdf": storage.url(
+            pdf_key,
+            expires_in=expires_in,
+            disposition='attachment; filename="easheet_score.pdf"',
+        ),
+        "mix": storage.url(
+            mix_key,
+            expires_in=expires_in,
+            disposition=f'attachment; filename="easheet_mix{audio_ext}"',
+        ),
+        "midi": storage.url(
+            midi_key,
+            expires_in=expires_in,
+            disposition='attachment; filename="easheet_drums.mid"',
+        ),
+        "guide": storage.url(
+            guide_key,
+            expires_in=expires_in,
+            disposition=f'attachment; filename="easheet_guide{audio_ext}"',
+        ),
+    }
@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# guest 별 공정 스케줄러 (Redis)
+#
+#   start_drum_job ──schedule──▶ drumjob:sched:{size}:queue:{lane}  (guest 별 대기열)
+#                                drumjob:sched:{size}:lanes         (대기 job 이 있는 guest, score = 마지막으로 차례를 받은 시각)
+#                  ──dispatch──▶ Celery drum_heavy_{size} 큐 (동시에 최대 DRUM_SCHED_MAX_DISPATCHED[size] 개)
+#   job 종료(DONE/ERROR) ──release──▶ 빈 자리만큼 다시 dispatch
+#   sweep_drum_jobs (celery beat) ──▶ Redis 에서 사라진 PENDING job 을 다시 대기열로 + dispatch
+#   미리보기 ──schedule(size=preview)──▶ drumjob:sched:preview:... (전체 job 과 따로 자리를 세고 끝나면 release_drum_preview)
+#
+#   Celery 큐 자체는 FIFO 라서, 거기에 넣는 순간 공정성이 사라진다.
+#   그래서 워커가 바로 처리할 만큼만 넘기고 순서는 여기서 정한다.
+#   size(short / long)는 음원 길이로 나눈 lane 으로, 짧은 곡이 긴 곡 뒤에서 기다리지 않게 한다.
+
+KEY_PREFIX = "drumjob:sched"
+JOB_SIZES = ("short", "long")
+# 미리보기는 가볍고 빨리 끝나야 하므로 전체 job 과 자리 / guest 동시 실행 수를 따로 센다
+PREVIEW = "preview"
+SCHED_QUEUES = (*JOB_SIZES, PREVIEW)
+RUNNING_KEY = f"{KEY_PREFIX}:running"
+LOCK_KEY = f"{KEY_PREFIX}:lock"
+
+_redis = None
+_redis_pid = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis():
+    global _redis, _redis_pid
+
+    with _redis_lock:
+        if _redis is None or _redis_pid != os.getpid():
+            _redis = redis.Redis.from_url(settings.DRUM_SCHEDULER_REDIS_URL, decode_responses=True)
+            _redis_pid = os.getpid()
+        return _redis
+
+
+def _lanes_key(size: str) -> str:
+    return f"{KEY_PREFIX}:{size}:lanes"
+
+
+def _queue_key(size: str, lane: str) -> str:
+    return f"{KEY_PREFIX}:{size}:queue:{lane}"
+
+
+def job_size(duration) -> str:
+    # 길이를 모르면 long 으로 취급 (짧은 lane 을 막지 않도록)
+    if duration is not None and duration <= settings.DRUM_SHORT_JOB_MAX_SECONDS:
+        return "short"
+    return "long"
+
+
+def _running_id(job_id, size: str) -> str:
+    # 실행 목록(RUNNING_KEY)의 항목 이름. 같은 job 의 미리보기와 전체 job 이 함께 실행될 수 있어서 구분
+    return f"{PREVIEW}:{job_id}" if size == PREVIEW else str(job_id)
+
+
+def guest_lane(guest_id, remote_addr=None) -> str:
+    # 쿠키 없는 요청은 IP 단위로 묶는다
+    if guest_id:
+        return f"guest:{guest_id}"
+    return f"ip:{remote_addr or 'unknown'}"
+
+
+def check_rate_limit(lane: str) -> int | None:
+    """
+    lane 의 제출 횟수를 세고, 한도를 넘었으면 다시 시도할 수 있을 때까지 남은 초를 반환.
+    고정 윈도우 카운터 (DRUM_JOB_RATE_LIMIT 회 / DRUM_JOB_RATE_WINDOW_SECONDS 초).
+    Redis 장애 시에는 제한하지 않는다.
+    """
+    window = settings.DRUM_JOB_RATE_WINDOW_SECONDS
+    now = int(time.time())
+    key = f"{KEY_PREFIX}:rate:{lane}:{now // window}"
+
+    try:
+        pipe = _get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, window)
+        count, _ = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("[Scheduler] rate limit check failed lane=%s: %s", lane, e)
+        return None
+
+    if count > settings.DRUM_JOB_RATE_LIMIT:
+        return window - now % window
+    return None
+
+
+def schedule_drum_job(job_id, lane: str, size: str = "long") -> None:
+    # job 을 lane 대기열에 넣고 자리가 있으면 바로 dispatch.
+    # 대기열에 넣기 전에 Redis 가 실패했을 때만 곧바로 Celery 로 (넣은 뒤의 실패는 sweep 이 마저 처리)
+    queued = False
+    to_enqueue = []
+    try:
+        r = _get_redis()
+        with r.lock(LOCK_KEY, timeout=10, blocking_timeout=5):
+            r.rpush(_queue_key(size, lane), str(job_id))
+            queued = True
+            r.zadd(_lanes_key(size), {lane: 0}, nx=True)
+            to_enqueue = _dispatch_locked(r)
+    except redis.RedisError as e:
+        if not queued:
+            logger.warning("[Scheduler] schedule failed job_id=%s, enqueue directly: %s", job_id, e)
+            _enqueue([(str(job_id), size)])
+            return
+        logger.warning("[Scheduler] schedule incomplete job_id=%s, left to sweep: %s", job_id, e)
+
+    _enqueue(to_enqueue)
+
+
+def release_drum_job(job_id) -> None:
+    # job 이 끝나면(DONE/ERROR) 자리를 반납하고 다음 job 을 dispatch. 여러 번 불려도 한 번만 반납
+    _release(job_id, _running_id(job_id, "long"))
+
+
+def release_drum_preview(job_id) -> None:
+    # 미리보기가 끝나면(성공/실패/건너뜀) 미리보기 자리를 반납
+    _release(job_id, _running_id(job_id, PREVIEW))
+
+
+def _release(job_id, running_id: str) -> None:
+    try:
+        r = _get_redis()
+        if not r.hdel(RUNNING_KEY, running_id):
+            return
+    except redis.RedisError as e:
+        logger.warning("[Scheduler] release failed job_id=%s: %s", job_id, e)
+        return
+
+    # 자리는 이미 반납했으므로 dispatch 가 실패(lock 대기 초과 등)하면 task 로 미뤄서 다시 시도
+    try:
+        dispatch()
+    except redis.RedisError as e:
+        logger.warning("[Scheduler] dispatch after release failed job_id=%s, deferred: %s", job_id, e)
+        _defer_dispatch()
+
+
+def dispatch() -> None:
+    # lock 을 놓다가 실패해도(lock 만료) 이미 꺼내서 실행 목록에 올린 job 은 Celery 로 넘긴다
+    r = _get_redis()
+    to_enqueue = []
+    try:
+        with r.lock(LOCK_KEY, timeout=10, blocking_timeout=5):
+            to_enqueue = _dispatch_locked(r)
+    finally:
+        _enqueue(to_enqueue)
+
+
+def requeue_lost_jobs(jobs: list[tuple[str, str, str]]) -> list[str]:
+    """
+    (job_id, lane, size) 중 대기열에도 실행 목록에도 없는 job 을 다시 대기열에 넣고 dispatch.
+    다시 넣은 job_id 목록을 반환 (sweep_drum_jobs 가 DB 의 오래된 PENDING job 으로 호출).
+    대기 job 이 남아 있는데 순서(lanes)에서 빠진 lane 도 다시 넣는다.
+    """
+    r = _get_redis()
+    requeued = []
+    to_enqueue = []
+    try:
+        with r.lock(LOCK_KEY, timeout=10, blocking_timeout=5):
+            known = set(r.hkeys(RUNNING_KEY))
+            for size in SCHED_QUEUES:
+                prefix = _queue_key(size, "")
+                for key in r.scan_iter(match=f"{prefix}*"):
+                    job_ids = r.lrange(key, 0, -1)
+                    known.update(job_ids)
+                    if job_ids:
+                        r.zadd(_lanes_key(size), {key[len(prefix):]: 0}, nx=True)
+
+            for job_id, lane, size in jobs:
+                if str(job_id) in known:
+                    continue
+                logger.warning("[Scheduler] requeue lost job_id=%s lane=%s size=%s", job_id, lane, size)
+                r.rpush(_queue_key(size, lane), str(job_id))
+                r.zadd(_lanes_key(size), {lane: 0}, nx=True)
+                requeued.append(str(job_id))
+
+            to_enqueue = _dispatch_locked(r)
+    finally:
+        _enqueue(to_enqueue)
+    return requeued
+
+
+def _dispatch_locked(r) -> list[tuple[str, str]]:
+    """
+    size 별로 빈 자리만큼 job 을 하나씩 꺼내 (job_id, size) 목록으로 반환.
+    동시 실행 한도(전체 job 은 size 구분 없이 guest 당, 미리보기는 따로)에 걸리지 않은 lane 중
+    가장 오래 전에 차례를 받은 lane 부터 (처음 들어온 lane 은 0 점이라 맨 앞).
+    대기도 실행도 없는 lane 만 순서에서 빼서, 실행 중인 guest 가 다시 제출해도 뒤로 가게 한다.
+    """
+    running = _running_lanes(r)
+    per_lane = Counter((lane, size == PREVIEW) for lane, size in running.values())
+    per_size = Counter(size for _, size in running.values())
+
+    to_enqueue = []
+    for size in SCHED_QUEUES:
+        lanes_key = _lanes_key(size)
+        capacity = settings.DRUM_SCHED_MAX_DISPATCHED[size] - per_size[size]
+        preview = size == PREVIEW
+
+        waiting = []
+        for lane in r.zrange(lanes_key, 0, -1):
+            if r.llen(_queue_key(size, lane)) > 0:
+                waiting.append(lane)
+            elif per_lane[(lane, preview)] == 0:
+                r.zrem(lanes_key, lane)
+
+        while capacity > 0:
+            lane = next(
+                (lane for lane in waiting if per_lane[(lane, preview)] < settings.DRUM_SCHED_GUEST_CONCURRENCY),
+                None,
+            )
+            if lane is None:
+                break
+
+            job_id = r.lpop(_queue_key(size, lane))
+            if job_id is not None:
+                entry = {"lane": lane, "size": size, "at": time.time()}
+                r.hset(RUNNING_KEY, _running_id(job_id, size), json.dumps(entry))
+                per_lane[(lane, preview)] += 1
+                capacity -= 1
+                to_enqueue.append((job_id, size))
+
+            # 차례를 받은 lane 은 맨 뒤로
+            r.zadd(lanes_key, {lane: time.time()})
+            waiting.remove(lane)
+            if r.llen(_queue_key(size, lane)) > 0:
+                waiting.append(lane)
+
+    return to_enqueue
+
+
+def _running_lanes(r) -> dict[str, tuple[str, str]]:
+    # 실행 중인 job → (lane, size). release 가 누락된 오래된 항목은 정리
+    stale_before = time.time() - settings.DRUM_JOB_STALE_SECONDS
+    running = {}
+    for job_id, raw in r.hgetall(RUNNING_KEY).items():
+        entry = json.loads(raw)
+        if entry["at"] < stale_before:
+            logger.warning("[Scheduler] drop stale running job_id=%s lane=%s", job_id, entry["lane"])
+            r.hdel(RUNNING_KEY, job_id)
+            continue
+        running[job_id] = (entry["lane"], entry.get("size", "long"))
+    return running
+
+
+def _defer_dispatch() -> None:
+    from .tasks import dispatch_drum_jobs
+
+    try:
+        dispatch_drum_jobs.apply_async(countdown=1)
+    except Exception as e:
+        # broker 도 안 되면 다음 sweep 이 dispatch 한다
+        logger.warning("[Scheduler] deferred dispatch failed: %s", e)
+
+
+def _enqueue(jobs: list[tuple[str, str]]) -> None:
+    # tasks 가 release_drum_job 을 import 하므로 순환 import 를 피하려고 여기서 import
+    from .tasks import enqueue_drum_job, preview_drum_job
+
+    for job_id, size in jobs:
+        if size == PREVIEW:
+            preview_drum_job.delay(job_id)
+        else:
+            enqueue_drum_job(job_id, size=size)
@@ -0,0 +1,156 @@
+import logging
+import time
+
+from .admission import AdmissionRejected, admit_drum_job, job_eta_seconds
+from .dedupe import IN_FLIGHT_STATUSES, find_duplicate_job, get_or_create_drum_job, make_dedupe_key
+from .events import TERMINAL_STATUSES, subscribe_job_events
+from .models import DrumJob
+from .scheduler import PREVIEW, check_rate_limit, guest_lane, job_size, schedule_drum_job
+from api.storage import get_storage
+from drum.audio.probe import probe_duration
+
+logger = logging.getLogger(__name__)
+
+
+# 드럼 job 제출 (POST /api/jobs/drums/start, POST /api/drums/process 공용)
+#   중복 job 재사용 → 제출 속도 제한 → 헤더로 길이 추정 → admission → 생성 → guest 대기열
+
+
+class InputNotFound(Exception):
+    pass
+
+
+def submit_drum_job(
+    *,
+    guest_id,
+    remote_addr,
+    input_key: str,
+    genre,
+    tempo,
+    level,
+    audio_format: str,
+    idempotency_key: str | None = None,
+    preview_bars: int | None = None,
+) -> tuple[DrumJob, bool, int | None]:
+    """
+    (job, created, eta_seconds) 반환.
+    - 같은 Idempotency-Key 또는 같은 음원 + 옵션의 job 이 진행 중/완료면 그 job (created=False)
+    - preview_bars: 앞 N 마디 미리보기를 전체 job 과 별도로 (guest 별 미리보기 대기열로) 실행
+    - 제출 속도 / 대기 한도 초과면 AdmissionRejected, 입력 파일이 없으면 InputNotFound
+    """
+    # 업로드된 음원의 내용 해시 (S3 ETag)
+    storage = get_storage()
+    try:
+        content_hash = storage.content_hash(input_key)
+    except Exception as e:
+        raise InputNotFound(input_key) from e
+
+    # guest(쿠키 없으면 IP) 단위 대기열 / 제출 속도 제한
+    lane = guest_lane(guest_id, remote_addr)
+
+    # 같은 Idempotency-Key 재시도 / 같은 작업은 새 job 을 만들지 않으므로 제출 속도 제한에 세지 않는다
+    duplicate = find_duplicate_job(
+        guest_id,
+        make_dedupe_key(content_hash, genre, tempo, level, audio_format),
+        idempotency_key if guest_id else None,
+    )
+    if duplicate is not None:
+        _request_preview(duplicate, lane, preview_bars)
+        return duplicate, False, job_eta_seconds(duplicate)
+
+    retry_after = check_rate_limit(lane)
+    if retry_after is not None:
+        raise AdmissionRejected(429, "too many drum jobs, retry later", retry_after, code="RATE_LIMITED")
+
+    # 새 작업이면 헤더만 읽어 음원 길이를 추정하고(short / long lane), 대기열 상황을 보고 받을지 결정
+    duration = _probe_input_duration(storage, input_key)
+    eta_seconds = admit_drum_job(guest_id, duration)
+
+    job, created = get_or_create_drum_job(
+        guest_id=guest_id,
+        input_key=input_key,
+        content_hash=content_hash,
+        genre=genre,
+        tempo=tempo,
+        level=level,
+        audio_format=audio_format,
+        idempotency_key=idempotency_key,
+        duration=duration,
+        preview_bars=preview_bars,
+    )
+
+    # 미리보기와 전체 job 은 각각 guest 별 대기열에 넣고 차례가 되면 실행 (전체 job 은 Celery 단계별 task chain)
+    _request_preview(job, lane, preview_bars)
+    if created:
+        schedule_drum_job(job.id, lane, size=job_size(duration))
+    else:
+        eta_seconds = job_eta_seconds(job)
+
+    return job, created, eta_seconds
+
+
+def _request_preview(job: DrumJob, lane: str, preview_bars: int | None) -> None:
+    # 진행 중인 job 에 미리보기를 넣는다 (완료된 job 은 전체 결과가 있음).
+    # preview_requested 를 조건부 UPDATE 로 먼저 세운 요청만 넣으므로, 같은 job 에 요청이 동시에 여러 번 와도 한 번만
+    if not preview_bars or job.preview_requested or job.status not in IN_FLIGHT_STATUSES:
+        return
+    updated = DrumJob.objects.filter(
+        pk=job.pk, preview_requested=False, status__in=IN_FLIGHT_STATUSES
+    ).update(preview_requested=True, preview_bars=preview_bars)
+    if not updated:
+        return
+    job.preview_requested = True
+    job.preview_bars = preview_bars
+
+    try:
+        schedule_drum_job(job.id, lane, size=PREVIEW)
+    except Exception as e:
+        # 미리보기는 부가 기능이므로 브로커 장애가 job 제출을 실패시키지 않도록 하고, 다음 요청이 다시 넣을 수 있게 되돌린다
+        logger.warning("[DrumJob] preview enqueue failed job_id=%s: %s", job.id, e)
+        DrumJob.objects.filter(pk=job.pk).update(preview_requested=False)
+        job.preview_requested = False
+
+
+def _probe_input_duration(storage, input_key: str) -> float | None:
+    try:
+        size = storage.head(input_key)["size"]
+    except Exception:
+        return None
+    return probe_duration(lambda start, length: storage.read_range(input_key, start, length), size)
+
+
+def wait_for_drum_job(job_id, timeout: float, poll_seconds: float = 1.0) -> DrumJob:
+    """
+    job 이 DONE / ERROR 가 되거나 timeout 초가 지날 때까지 기다린 뒤 job 을 반환.
+    워커가 publish 하는 상태 전환 이벤트로 깨어나고, Redis 를 못 쓰면 poll_seconds 간격으로 DB 조회.
+    """
+    deadline = time.monotonic() + timeout
+
+    try:
+        pubsub = subscribe_job_events(job_id)
+    except Exception as e:
+        logger.warning("[DrumJob] event subscribe failed job_id=%s: %s", job_id, e)
+        pubsub = None
+
+    try:
+        while True:
+            # subscribe 한 뒤에 DB 를 읽어야 그 사이의 전환을 놓치지 않음
+            job = DrumJob.objects.get(pk=job_id)
+            remaining = deadline - time.monotonic()
+            if job.status in TERMINAL_STATUSES or remaining <= 0:
+                return job
+
+            if pubsub is None:
+                time.sleep(min(poll_seconds, remaining))
+                continue
+            try:
+                pubsub.get_message(timeout=remaining)
+            except Exception as e:
+                logger.warning("[DrumJob] event wait failed job_id=%s: %s", job_id, e)
+                pubsub = None
+    finally:
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
@@ -1,150 +1,594 @@
 import logging
-import tempfile
-import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
 from pathlib import Path
 
-import boto3
-from celery import shared_task
+import redis
+from celery import chain, shared_task
+from celery.exceptions import Ignore
 from django.conf import settings
-from botocore.config import Config
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.utils import timezone
 
+from .checkpoints import StageCheckpoints
+from .events import publish_job_event
 from .models import DrumJob
-from drum.pipeline import run_drum_pipeline
+from .progress import JobProgress
+from .results import build_job_payload, preview_keys
+from .scheduler import (
+    dispatch,
+    guest_lane,
+    job_size,
+    release_drum_job,
+    release_drum_preview,
+    requeue_lost_jobs,
+)
+from api.input_cache import get_input_cache
+from api.scratch import ScratchSpaceError, ScratchSpaceFull, Workspace, get_scratch_space
+from api.storage import get_storage
+from drum.audio.encoding import (
+    audio_content_type,
+    audio_duration,
+    audio_extension,
+    encode_audio_file,
+)
+from drum.pipeline import run_mix_stages, run_preview_stages, run_score_stages
+from drum.profiling import collect_spans
+from drum.watchdog import SubprocessTimeout
 
 logger = logging.getLogger(__name__)
 
 
-aws_region = getattr(settings, "AWS_S3_REGION_NAME", "ap-northeast-2")
-aws_config = Config(signature_version="s3v4")
+# 다시 실행해도 결과가 같은 에러(설정 오류 / 작업 공간 한도 초과 / 렌더러가 제한 시간 안에 못 끝냄)는 재시도하지 않는다
+NON_RETRYABLE_ERRORS = (ImproperlyConfigured, ScratchSpaceError, SubprocessTimeout)
 
-s3 = boto3.client("s3", region_name=aws_region, config=aws_config)
-BUCKET = settings.AWS_STORAGE_BUCKET_NAME
+# 파이프라인 task 공통 재시도 정책 (Celery autoretry + 지수 backoff)
+# 재시도는 StageCheckpoints 에 기록된 단계를 건너뛰고 이어서 실행한다
+RETRY_POLICY = {
+    "autoretry_for": (Exception,),
+    "dont_autoretry_for": NON_RETRYABLE_ERRORS,
+    "max_retries": settings.DRUM_JOB_MAX_RETRIES,
+    "retry_backoff": True,
+    "retry_backoff_max": settings.DRUM_JOB_RETRY_BACKOFF_MAX,
+    "retry_jitter": True,
+}
 
 
+def _publish(job: DrumJob) -> None:
+    # 상태/단계 전환을 구독 중인 클라이언트(SSE)로 push. DONE 이면 최종 URL 포함
+    try:
+        payload = build_job_payload(job)
+    except Exception as e:
+        logger.warning("[DrumJob] event payload failed job_id=%s: %s", job.id, e)
+        return
+    publish_job_event(job.id, payload)
+
 
 @shared_task
 def run_drum_job(job_id: str):
     """
-    Celery 비동기 작업.
-
-    1) S3에서 입력 wav 다운로드 (job.input_key)
-    2) run_drum_pipeline 실행 → midi / pdf / guide wav / mix wav 생성
-    3) 결과물 4개를 S3의 results/{job_id}/ 아래에 업로드
-    4) DrumJob에는 "S3 key" 만 저장, status="DONE"
+    예전 단일 task(워커 하나에서 끝까지 실행)로 큐에 남아 있는 메시지 호환용.
+    파이프라인은 단계별 task chain(enqueue_drum_job)으로 넘긴다.
     """
+    job = DrumJob.objects.filter(pk=job_id).first()
+    if job is None or job.status not in ACTIVE_STATUSES:
+        return
 
-    job = DrumJob.objects.get(pk=job_id)
+    logger.info("[DrumJob] legacy run_drum_job → chain job_id=%s", job_id)
+    enqueue_drum_job(job_id, size=job_size(job.duration))
 
-    job.status = "RUNNING"
-    job.save()
 
-    if not BUCKET:
-        msg = "AWS_STORAGE_BUCKET_NAME is not set in settings."
-        logger.error("[DrumJob] %s", msg)
-        job.status = "ERROR"
-        job.error_message = msg
-        job.save()
-        return
+# ---------------------------------------------------------------------
+# 단계별 task (Celery chain)
+#
+#   prepare_drum_job  [drum_light] 다운로드 → 분석 → MIDI → PDF → 가이드 오디오, 결과 업로드
+#   separate_drum_job [drum_heavy_short / drum_heavy_long] Demucs 분리 → 믹스, 믹스 업로드
+#   finish_drum_job   [drum_light] DONE 처리, 중간 산출물 정리
+#
+#   단계 사이에는 파일 대신 저장소 key(참조)만 넘긴다. 라우팅은 settings.CELERY_TASK_ROUTES
+#   각 단계 안의 세부 단계(midi / pdf / guide / separation / mix)는 끝날 때마다 checkpoint 로
+#   기록되고, 재시도(autoretry / 워커가 죽어 다시 받은 task)는 기록된 단계를 건너뛴다
+# ---------------------------------------------------------------------
 
-    tmp_dir: Path | None = None
 
-    try:
-        logger.info("[DrumJob] START job_id=%s, input_key=%s", job_id, job.input_key)
+def enqueue_drum_job(job_id, size: str = "long") -> None:
+    # 드럼 job 을 단계별 task chain 으로 큐에 넣는다. 분리 단계는 음원 길이(size)에 맞는 큐로
+    chain(
+        prepare_drum_job.si(str(job_id)),
+        separate_drum_job.s().set(queue=f"drum_heavy_{size}"),
+        finish_drum_job.s(),
+    ).apply_async()
+
+
+def _result_keys(job: DrumJob) -> dict:
+    base_prefix = f"results/{job.id}"
+    audio_ext = audio_extension(job.audio_format)
+    return {
+        "midi": f"{base_prefix}/drums.mid",
+        "pdf": f"{base_prefix}/output.pdf",
+        "guide": f"{base_prefix}/guide{audio_ext}",
+        "mix": f"{base_prefix}/mix{audio_ext}",
+    }
+
+
+def _work_key(job: DrumJob, name: str) -> str:
+    # 단계 사이에 넘기는 중간 산출물 key
+    return f"work/{job.id}/{name}"
+
 
-        # 1) 임시 디렉터리 생성
-        tmp_dir = Path(tempfile.mkdtemp(prefix=f"drumjob_{job_id}_"))
-        logger.info("[DrumJob] tmp_dir=%s", tmp_dir)
+# 상태 전환은 모두 조건부 UPDATE (DrumJob.transition) → 여러 워커가 동시에 써도 끝난 job 을 되돌리지 않음
+ACTIVE_STATUSES = ["PENDING", "RUNNING"]
 
-        # 2) S3에서 입력 오디오 다운로드
-        input_filename = Path(job.input_key).name or "input.wav"
-        local_input_path = tmp_dir / input_filename
 
+def _start(job: DrumJob, task) -> bool:
+    # PENDING → RUNNING, 또는 같은 task 의 재시도 / chain 의 앞 단계에서 이어받기 (DrumJob.claim).
+    # 이미 끝난(DONE/ERROR) job 이거나 다른 task 가 실행 중이면(중복 dispatch) False
+    if not job.claim(task.request.id, task.request.parent_id):
+        job.refresh_from_db(fields=["status", "owner_task_id"])
         logger.info(
-            "[DrumJob] Downloading from S3 bucket=%s key=%s -> %s",
-            BUCKET,
-            job.input_key,
-            local_input_path,
-        )
-        s3.download_file(BUCKET, job.input_key, str(local_input_path))
-
-        # 3) 파이프라인 실행 (로컬에서 MIDI/PDF/오디오 2개 생성)
-        result_paths = run_drum_pipeline(
-            audio_path=local_input_path,
-            genre=job.genre or "Rock",
-            tempo=job.tempo or 120,
-            level=job.level or "Normal",
-            output_dir=tmp_dir,
+            "[DrumJob] skip job_id=%s task_id=%s: already %s (owner=%s)",
+            job.id,
+            task.request.id,
+            job.status,
+            job.owner_task_id,
         )
+        if job.status not in ACTIVE_STATUSES:
+            release_drum_job(job.id)
+        return False
+    _publish(job)
+    return True
+
+
+def _count_attempt(job: DrumJob) -> bool:
+    # 단계 task 실행 횟수 기록. 워커가 계속 죽는 job(acks_late 로 매번 다시 전달됨)이
+    # 무한히 돌지 않도록 DRUM_JOB_MAX_ATTEMPTS 를 넘으면 실패 처리하고 False
+    DrumJob.objects.filter(pk=job.pk).update(attempts=F("attempts") + 1)
+    job.refresh_from_db(fields=["attempts"])
+    if job.attempts > settings.DRUM_JOB_MAX_ATTEMPTS:
+        _fail(job, RuntimeError(f"gave up after {job.attempts - 1} attempts"))
+        return False
+    return True
+
+
+def _fail(job: DrumJob, e: Exception) -> None:
+    logger.error("[DrumJob] ERROR job_id=%s: %s", job.id, e, exc_info=e)
+    job.transition("ERROR", ACTIVE_STATUSES, error_message=str(e), error_detail=_error_detail(job, e))
+    _publish(job)
+    release_drum_job(job.id)
 
-        logger.info("[DrumJob] PIPELINE RESULT paths=%s", result_paths)
-
-        midi_path = Path(result_paths["midi"])
-        pdf_path = Path(result_paths["pdf"])
-        guide_audio_path = Path(result_paths["drum_audio"])  # 가이드 드럼만
-        mix_audio_path = Path(result_paths["mix_audio"])     # 원곡+드럼 믹스
-
-        # 4) S3 key 정의 (총 4개)
-        base_prefix = f"results/{job.id}"
-        midi_key = f"{base_prefix}/drums.mid"
-        pdf_key = f"{base_prefix}/output.pdf"
-        guide_audio_key = f"{base_prefix}/guide.wav"
-        mix_audio_key = f"{base_prefix}/mix.wav"
-
-        # 5) 결과물 4개 모두 업로드
-        logger.info("[DrumJob] Uploading MIDI to S3 key=%s", midi_key)
-        s3.upload_file(str(midi_path), BUCKET, midi_key)
-
-        logger.info("[DrumJob] Uploading PDF to S3 key=%s", pdf_key)
-        s3.upload_file(
-            str(pdf_path),
-            BUCKET,
-            pdf_key,
-            ExtraArgs={"ContentType": "application/pdf"},
+    # 다시 이어서 실행할 일이 없으므로 중간 산출물 정리
+    _clear_checkpoints(job)
+
+
+def _clear_checkpoints(job: DrumJob, storage=None) -> None:
+    # best effort: 끝난 job 의 상태를 정리 실패 때문에 되돌리거나 재시도하지 않는다
+    try:
+        StageCheckpoints(job, storage or get_storage()).clear()
+    except Exception as e:
+        logger.warning("[DrumJob] checkpoint cleanup failed job_id=%s: %s", job.id, e)
+
+
+def _error_detail(job: DrumJob, e: Exception) -> dict | None:
+    # 원인을 구조화해서 남길 수 있는 에러(SubprocessTimeout 등)만 실패한 단계와 함께 기록
+    if not hasattr(e, "to_dict"):
+        return None
+    return {**e.to_dict(), "stage": job.stage}
+
+
+def _handle_failure(task, job: DrumJob, e: Exception) -> None:
+    # autoretry 가 다시 실행할 에러면 job 은 RUNNING 그대로 두고(대기열 자리도 유지), 아니면 실패 처리
+    if not isinstance(e, NON_RETRYABLE_ERRORS) and task.request.retries < task.max_retries:
+        logger.warning(
+            "[DrumJob] %s failed job_id=%s, retry %d/%d: %s",
+            task.name,
+            job.id,
+            task.request.retries + 1,
+            task.max_retries,
+            e,
         )
+        return
+    _fail(job, e)
+
 
-        logger.info("[DrumJob] Uploading GUIDE audio to S3 key=%s", guide_audio_key)
-        s3.upload_file(
-            str(guide_audio_path),
-            BUCKET,
-            guide_audio_key,
-            ExtraArgs={"ContentType": "audio/wav"},
+def _save_spans(job: DrumJob, spans: list) -> None:
+    # 이번 실행의 구간 계측(drum.profiling)을 job 에 누적. 재시도한 실행은 attempt 로 구분
+    if not spans:
+        return
+    for record in spans:
+        record["attempt"] = job.attempts
+    try:
+        job.spans = [*job.spans, *spans]
+        job.save(update_fields=["spans"])
+    except Exception as e:
+        logger.warning("[DrumJob] span save failed job_id=%s: %s", job.id, e)
+
+
+def _record_duration(job: DrumJob, local_input_path: Path) -> None:
+    # 제출 시 헤더로 길이를 알아내지 못한 job 은 받은 파일로 기록
+    if job.duration is None:
+        job.duration = audio_duration(local_input_path)
+        job.save(update_fields=["duration"])
+
+
+# 작업 공간 예약 크기 계산용: 16-bit 스테레오 44.1kHz wav 1초의 바이트 수
+WAV_BYTES_PER_SECOND = 44100 * 2 * 2
+
+
+def _audio_bytes(job: DrumJob) -> int:
+    # 음원 길이의 wav 한 개 크기 (길이를 모르면 평균적인 곡 길이로)
+    seconds = job.duration or settings.DRUM_ETA_DEFAULT_AUDIO_SECONDS
+    return int(seconds * WAV_BYTES_PER_SECOND)
+
+
+def _open_workspace(job: DrumJob, step: str, audio_copies: int) -> Workspace:
+    # 이 단계가 만들 파일들(입력 + 중간/결과 오디오 audio_copies 개 분량)만큼 디스크를 예약
+    return get_scratch_space().workspace(
+        f"drumjob_{job.id}_{step}", reserve_bytes=_audio_bytes(job) * audio_copies
+    )
+
+
+def _retry_when_scratch_full(task, job: DrumJob, e: ScratchSpaceFull):
+    # 디스크 여유가 생길 때까지 같은 task 를 다시 예약. 재시도 횟수를 넘기면 job 실패
+    if task.request.retries < settings.DRUM_SCRATCH_MAX_RETRIES:
+        logger.warning(
+            "[DrumJob] scratch space full job_id=%s, retry in %ds: %s",
+            job.id,
+            settings.DRUM_SCRATCH_RETRY_SECONDS,
+            e,
         )
+        raise task.retry(
+            exc=e,
+            countdown=settings.DRUM_SCRATCH_RETRY_SECONDS,
+            max_retries=settings.DRUM_SCRATCH_MAX_RETRIES,
+        )
+    _fail(job, e)
+    raise e
+
 
-        logger.info("[DrumJob] Uploading MIX audio to S3 key=%s", mix_audio_key)
-        s3.upload_file(
-            str(mix_audio_path),
-            BUCKET,
-            mix_audio_key,
-            ExtraArgs={"ContentType": "audio/wav"},
+def _log_uploads(reports: list[dict]) -> None:
+    for report in reports:
+        logger.info(
+            "[DrumJob] Uploaded key=%s bytes=%d seconds=%.3f",
+            report["key"],
+            report["bytes"],
+            report["seconds"],
         )
 
-        # 6) DB에는 "S3 key" 만 저장 (URL X)
-        #    프론트에서 실제 다운로드 URL은 presigned URL 로 따로 발급
-        job.pdf_key = pdf_key          # output.pdf
-        job.audio_key = mix_audio_key  # mix.wav
 
-        job.status = "DONE"
-        job.error_message = ""
+def _input_path(job: DrumJob, workspace: Workspace) -> Path:
+    return workspace.disk_dir / (Path(job.input_key).name or "input.wav")
+
 
+def _prepare(job: DrumJob, storage, workspace: Workspace, progress: JobProgress) -> dict:
+    """
+    가벼운 단계: 입력 다운로드 → 분석 → MIDI → PDF → 가이드 오디오.
+    MIDI / PDF / 가이드 결과물은 끝나는 대로 results/ 에 올리고(checkpoint),
+    믹스에 필요한 가이드 원본은 work/{job_id}/guide.flac 로 올려 key 만 다음 단계로 넘긴다.
+    """
+    checkpoints = StageCheckpoints(job, storage)
+    ctx = {"job_id": str(job.id), "guide_work_key": _work_key(job, "guide.flac")}
+    if checkpoints.has("guide"):
+        # 이전 시도에서 이 단계가 모두 끝남
+        return ctx
+
+    keys = _result_keys(job)
+    # MIDI / PDF / 가이드 오디오는 작으면 RAM(tmpfs) 에
+    output_dir = workspace.dir_for(_audio_bytes(job) * 2)
+
+    # 이전 시도에서 끝난 단계의 산출물은 다시 만들지 않고 받아서 사용
+    completed = {}
+    if checkpoints.has("midi"):
+        completed["midi"] = checkpoints.fetch("midi", "midi", output_dir / "drums.mid")
+    if checkpoints.has("pdf"):
+        completed["pdf"] = checkpoints.fetch("pdf", "pdf", output_dir / "output.pdf")
+
+    def on_complete(stage: str, path: Path) -> None:
+        # 업로드 단계의 마지막(믹스)은 _separate 에서 하므로 진행률은 그때 올린다
+        with progress.stage("upload", partial=True):
+            if stage != "guide":
+                content_type = "audio/midi" if stage == "midi" else "application/pdf"
+                checkpoints.upload(stage, {stage: (path, keys[stage], content_type)})
+                return
+
+            # 믹스용 가이드(무손실 flac)만 여기서 인코딩.
+            # 결과물 가이드(job 포맷)는 _separate 에서 Demucs 분리와 겹쳐서 인코딩한다
+            guide_work_path = encode_audio_file(path, "flac", output_path=output_dir / "guide_work.flac")
+            workspace.check_budget()
+            checkpoints.upload("guide", {
+                "guide_work": (guide_work_path, ctx["guide_work_key"], "audio/flac"),
+            })
+
+    # 분석(MIDI)이 끝났으면 입력 오디오는 필요 없음
+    download = None
+    local_input_path = None
+    if "midi" not in completed:
+        local_input_path = _input_path(job, workspace)
         logger.info(
-            "[DrumJob] DONE job_id=%s pdf_key=%s audio_key=%s",
-            job_id,
-            job.pdf_key,
-            job.audio_key,
+            "[DrumJob] Downloading from %s key=%s -> %s",
+            storage.name,
+            job.input_key,
+            local_input_path,
+        )
+        progress.start("download")
+        # 캐시 hit 이면 네트워크 없이 바로 사용하고, miss 면 Range GET 병렬 다운로드를
+        # 시작해 분석은 도착한 바이트부터 바로 디코딩
+        download = get_input_cache().fetch(job.input_key, local_input_path, storage)
+
+    # MIDI / PDF / 가이드 업로드는 다음 단계 계산과 겹쳐서 진행하고, 이 단계가 끝날 때 한 번에 기다린다
+    with checkpoints.uploading():
+        try:
+            with download.open_stream() if download is not None else nullcontext() as audio_stream:
+                run_score_stages(
+                    local_input_path,
+                    genre=job.genre or "Rock",
+                    tempo=job.tempo or 120,
+                    level=job.level or "Normal",
+                    output_dir=output_dir,
+                    audio_stream=audio_stream,
+                    stage=progress.stage,
+                    completed=completed,
+                    on_complete=on_complete,
+                )
+
+            if download is not None:
+                # 다운로드는 분석과 겹쳐 진행되므로 실제로 끝난 시각으로 기록
+                download.wait()
+                progress.end("download", ended_at=download.finished_at)
+                _record_duration(job, local_input_path)
+        finally:
+            # 실패로 끝났으면 진행 중인 입력 다운로드 중단
+            if download is not None:
+                download.close()
+
+    return ctx
+
+
+def _separate(job: DrumJob, storage, workspace: Workspace, progress: JobProgress, ctx: dict) -> dict:
+    """
+    무거운 단계: Demucs 로 원곡의 드럼 제거 → 가이드 드럼과 믹스 → 믹스 업로드.
+    결과물 가이드(job 포맷) 인코딩은 run_drum_pipeline 처럼 분리/믹스와 겹쳐서 진행한다.
+    분리 결과(드럼을 뺀 원곡)는 work/{job_id}/non_drum.wav 로 checkpoint 를 남겨
+    믹스나 업로드에서 실패해도 Demucs 를 다시 돌리지 않는다.
+    """
+    checkpoints = StageCheckpoints(job, storage)
+    keys = _result_keys(job)
+    mix_key = keys["mix"]
+    audio_type = audio_content_type(job.audio_format)
+    if checkpoints.has("mix"):
+        return {**ctx, "mix_key": mix_key}
+
+    # 가이드(flac) / 분리 결과(float wav) / 믹스 결과는 작으면 RAM(tmpfs) 에
+    output_dir = workspace.dir_for(_audio_bytes(job) * 4)
+    local_input_path = _input_path(job, workspace)
+
+    downloads = [storage.start_download(ctx["guide_work_key"], output_dir / "guide.flac")]
+    if checkpoints.has("separation"):
+        downloads.append(storage.start_download(
+            checkpoints.keys("separation")["non_drum"], workspace.disk_dir / "non_drum.wav"
+        ))
+    else:
+        downloads.append(get_input_cache().fetch(job.input_key, local_input_path, storage))
+    try:
+        paths = [Path(download.wait()) for download in downloads]
+    finally:
+        for download in downloads:
+            download.close()
+
+    def on_separated(stage: str, path: Path) -> None:
+        checkpoints.upload(stage, {"non_drum": (path, _work_key(job, "non_drum.wav"), "audio/wav")})
+
+    # 분리 결과 업로드는 믹스와, 결과물 가이드 인코딩은 분리/믹스와 겹쳐서 진행
+    with checkpoints.uploading(), ThreadPoolExecutor(max_workers=1, thread_name_prefix="drum-encode") as encoder:
+        guide_future = encoder.submit(encode_audio_file, paths[0], job.audio_format)
+
+        mix_path = run_mix_stages(
+            local_input_path,
+            paths[0],
+            output_dir=output_dir,
+            audio_format=job.audio_format,
+            stage=progress.stage,
+            non_drum_path=paths[1] if checkpoints.has("separation") else None,
+            on_complete=on_separated,
         )
+        workspace.check_budget()
+
+        with progress.stage("upload"):
+            # 두 결과물이 모두 올라가야 이 단계가 끝난 것으로 기록
+            checkpoints.upload("mix", {
+                "mix": (mix_path, mix_key, audio_type),
+                "guide": (guide_future.result(), keys["guide"], audio_type),
+            })
+            checkpoints.wait()
+
+    return {**ctx, "mix_key": mix_key}
+
+
+def _finish(job: DrumJob, storage, ctx: dict) -> None:
+    # DB 에는 결과물 "key" 만 저장하고 DONE 처리 (URL 은 presigned URL 로 따로 발급)
+    job.transition(
+        "DONE",
+        ["RUNNING"],
+        pdf_key=_result_keys(job)["pdf"],
+        audio_key=ctx["mix_key"],
+        progress=100,
+        error_message="",
+    )
+    _publish(job)
+    release_drum_job(job.id)
+
+    logger.info(
+        "[DrumJob] DONE job_id=%s pdf_key=%s audio_key=%s",
+        job.id,
+        job.pdf_key,
+        job.audio_key,
+    )
+
+    # 중간 산출물(work/) 정리
+    _clear_checkpoints(job, storage)
+
+
+@shared_task(bind=True, **RETRY_POLICY)
+def prepare_drum_job(self, job_id: str) -> dict:
+    # chain 1단계 (drum_light): _prepare
+    job = DrumJob.objects.get(pk=job_id)
+    if not _start(job, self):
+        # 이미 끝난 job 이면 chain 의 나머지 단계도 실행하지 않음
+        raise Ignore()
+
+    try:
+        workspace = _open_workspace(job, "prepare", audio_copies=3)
+    except ScratchSpaceFull as e:
+        _retry_when_scratch_full(self, job, e)
+
+    if not _count_attempt(job):
+        workspace.cleanup()
+        raise Ignore()
+
+    spans = []
+    try:
+        with collect_spans(spans):
+            return _prepare(job, get_storage(), workspace, JobProgress(job, on_change=_publish))
 
     except Exception as e:
-        logger.exception("[DrumJob] ERROR job_id=%s: %s", job_id, e)
-        job.status = "ERROR"
-        job.error_message = str(e)
+        _handle_failure(self, job, e)
+        raise
 
     finally:
-        # ✅ 임시 폴더 정리 (성공/실패 상관없이)
-        if tmp_dir and tmp_dir.exists():
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-                logger.info("[DrumJob] tmp_dir removed: %s", tmp_dir)
-            except Exception as e:
-                logger.warning("[DrumJob] tmp_dir cleanup failed %s: %s", tmp_dir, e)
-
-        job.save()
+        _save_spans(job, spans)
+        workspace.cleanup()
+
+
+@shared_task(bind=True, **RETRY_POLICY)
+def separate_drum_job(self, ctx: dict) -> dict:
+    # chain 2단계 (drum_heavy_*): _separate. 입력 오디오는 워커 로컬 캐시를 통해, 가이드는 넘겨받은 key 로
+    job = DrumJob.objects.get(pk=ctx["job_id"])
+    if not _start(job, self):
+        raise Ignore()
+
+    try:
+        workspace = _open_workspace(job, "separate", audio_copies=5)
+    except ScratchSpaceFull as e:
+        _retry_when_scratch_full(self, job, e)
+
+    if not _count_attempt(job):
+        workspace.cleanup()
+        raise Ignore()
+
+    spans = []
+    try:
+        with collect_spans(spans):
+            return _separate(job, get_storage(), workspace, JobProgress(job, on_change=_publish), ctx)
+
+    except Exception as e:
+        _handle_failure(self, job, e)
+        raise
+
+    finally:
+        _save_spans(job, spans)
+        workspace.cleanup()
+
+
+@shared_task(bind=True, **RETRY_POLICY)
+def finish_drum_job(self, ctx: dict) -> None:
+    # chain 3단계 (drum_light): DONE 처리, 중간 산출물 정리
+    job = DrumJob.objects.get(pk=ctx["job_id"])
+    if not _start(job, self):
+        raise Ignore()
+
+    try:
+        _finish(job, get_storage(), ctx)
+    except Exception as e:
+        _handle_failure(self, job, e)
+        raise
+
+
+@shared_task
+def preview_drum_job(job_id: str) -> None:
+    """
+    미리보기: 입력의 앞 preview_bars 마디만 분석해서 MIDI / PDF 를 results/{job_id}/preview.* 로 업로드.
+    전체 job(prepare → separate → finish)과 따로 guest 별 미리보기 대기열에서 실행되고, 실패해도 전체 job 에는 영향이 없다.
+    진행률 / 단계(stage) 는 전체 job 의 것이므로 건드리지 않는다.
+    """
+    try:
+        _run_preview(job_id)
+    finally:
+        # 성공 / 실패 / 건너뜀 모두 미리보기 자리를 반납
+        release_drum_preview(job_id)
+
+
+def _run_preview(job_id: str) -> None:
+    job = DrumJob.objects.get(pk=job_id)
+    if job.preview_bars is None or job.preview_ready or job.status not in ACTIVE_STATUSES:
+        # 이미 만들었거나 전체 결과가 먼저 나온 경우
+        return
+
+    try:
+        workspace = _open_workspace(job, "preview", audio_copies=1)
+    except ScratchSpaceFull as e:
+        logger.warning("[DrumJob] preview skipped job_id=%s: %s", job.id, e)
+        return
+
+    download = None
+    try:
+        storage = get_storage()
+        local_input_path = workspace.disk_dir / (Path(job.input_key).name or "input.wav")
+        download = get_input_cache().fetch(job.input_key, local_input_path, storage)
+
+        # 앞부분만 디코딩하므로 다운로드가 끝나기를 기다리지 않는다
+        with download.open_stream() as audio_stream:
+            preview = run_preview_stages(
+                local_input_path,
+                genre=job.genre or "Rock",
+                tempo=job.tempo or 120,
+                level=job.level or "Normal",
+                bars=job.preview_bars,
+                output_dir=workspace.dir_for(0),
+                audio_stream=audio_stream,
+            )
+
+        keys = preview_keys(job)
+        uploader = storage.uploader()
+        uploader.submit(preview["midi"], keys["midi"], content_type="audio/midi")
+        uploader.submit(preview["pdf"], keys["pdf"], content_type="application/pdf")
+        _log_uploads(uploader.wait())
+
+        DrumJob.objects.filter(pk=job.pk).update(preview_ready=True)
+        job.refresh_from_db()
+        _publish(job)
+        logger.info("[DrumJob] PREVIEW job_id=%s bars=%d", job.id, job.preview_bars)
+
+    except Exception as e:
+        logger.exception("[DrumJob] preview failed job_id=%s: %s", job.id, e)
+
+    finally:
+        if download is not None:
+            download.close()
+        workspace.cleanup()
+
+
+# ---------------------------------------------------------------------
+# 스케줄러 보조 task (drum_light)
+#   dispatch_drum_jobs: release 후 dispatch 가 실패했을 때 다시 시도
+#   sweep_drum_jobs:    celery beat 로 DRUM_SCHED_SWEEP_INTERVAL 초마다. 스케줄러(Redis)에서 사라진
+#                       PENDING job 을 다시 대기열에 넣고, 빈 자리가 있으면 dispatch
+# ---------------------------------------------------------------------
+
+
+@shared_task(autoretry_for=(redis.RedisError,), max_retries=5, retry_backoff=True)
+def dispatch_drum_jobs() -> None:
+    dispatch()
+
+
+@shared_task
+def sweep_drum_jobs() -> None:
+    # 방금 만들어져 아직 대기열에 들어가는 중인 job 은 건드리지 않도록 DRUM_SCHED_SWEEP_MIN_AGE 초 지난 것만
+    cutoff = timezone.now() - timedelta(seconds=settings.DRUM_SCHED_SWEEP_MIN_AGE)
+    pending = DrumJob.objects.filter(status="PENDING", created_at__lt=cutoff).only("id", "guest_id", "duration")
+    # guest 쿠키 없이 제출된 job 은 IP 를 저장하지 않으므로 ip:unknown lane 으로 다시 넣는다
+    jobs = [(str(job.id), guest_lane(job.guest_id), job_size(job.duration)) for job in pending]
+
+    requeued = requeue_lost_jobs(jobs)
+    if requeued:
+        logger.warning("[DrumJob] sweep requeued %d job(s): %s", len(requeued), ", ".join(requeued))
@@ -0,0 +1,1018 @@
+import io
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import wave
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+import fakeredis
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from api.storage import LocalStorage
+from drum.audio.encoding import encode_audio_file
+from drum.audio.probe import probe_duration
+from drum.watchdog import HANG_COUNTS, SubprocessTimeout, run_supervised
+from jobs import admission, scheduler
+from jobs.admission import AdmissionRejected, admit_drum_job, backlog_seconds, job_eta_seconds
+from jobs.checkpoints import StageCheckpoints
+from jobs.events import publish_job_event
+from jobs.models import DrumJob
+from jobs.progress import STAGE_ORDER, JobProgress
+from jobs.results import build_job_payload
+from jobs.views import _job_etag
+from jobs.views_events import _job_event_stream
+
+
+def _wav_bytes(seconds: float, sample_rate: int = 8000) -> bytes:
+    # 16-bit 모노 무음 wav
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\0\0" * int(seconds * sample_rate))
+    return buf.getvalue()
+
+
+def _create_job(guest_id="guest-1", **fields) -> DrumJob:
+    return DrumJob.objects.create(guest_id=guest_id, input_key=f"uploads/{uuid.uuid4().hex}.wav", **fields)
+
+
+class JobEtagTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        patcher = mock.patch("jobs.results.get_storage", return_value=LocalStorage(tmp))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, job, now, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        with mock.patch("jobs.views.time") as clock:
+            clock.time.return_value = now
+            return self.client.get(f"/api/jobs/drums/{job.id}", headers=headers)
+
+    def test_done_job_etag_changes_before_served_urls_expire(self):
+        job = _create_job(status="DONE", progress=100)
+        ttl = settings.PRESIGNED_URL_MIN_TTL
+        self.assertLess(ttl, settings.PRESIGNED_URL_EXPIRES_IN)
+
+        # 어느 시점에 받은 URL 이든(유효시간이 MIN_TTL 이상 남음) MIN_TTL 안에 ETag 가 바뀐다
+        start = ttl * 1000
+        for served_at in (start, start + ttl - 1):
+            self.assertNotEqual(_job_etag(job, served_at), _job_etag(job, served_at + ttl))
+
+        first = self._get(job, start)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self._get(job, start + 1, first["ETag"]).status_code, 304)
+
+        later = self._get(job, start + ttl, first["ETag"])
+        self.assertEqual(later.status_code, 200)
+        self.assertNotEqual(later["ETag"], first["ETag"])
+
+    def test_in_flight_job_etag_follows_eta_refresh(self):
+        job = _create_job(status="RUNNING", stage="analysis", progress=10)
+        ttl = settings.DRUM_ETA_BACKLOG_TTL
+        now = ttl * 1000
+
+        self.assertEqual(_job_etag(job, now), _job_etag(job, now + ttl - 1))
+        self.assertNotEqual(_job_etag(job, now), _job_etag(job, now + ttl))
+
+    def test_failed_job_etag_is_stable(self):
+        job = _create_job(status="ERROR", error_message="boom")
+        self.assertEqual(_job_etag(job, 0), _job_etag(job, 10 ** 9))
+
+    def test_state_change_changes_etag(self):
+        job = _create_job(status="RUNNING", stage="analysis", progress=10)
+        before = _job_etag(job, 0)
+        job.transition("RUNNING", ["RUNNING"], stage="midi", progress=30)
+        self.assertNotEqual(before, _job_etag(job, 0))
+
+
+class _DeferredUploader:
+    # submit 은 바로 반환하고, wait() 가 불릴 때 업로드를 끝내는 uploader (완료 순서를 테스트에서 정함)
+    def __init__(self, fail_keys=()):
+        self.pending = []
+        self.fail_keys = set(fail_keys)
+
+    def submit(self, local_path, key, content_type=None):
+        future = Future()
+        self.pending.append((future, Path(local_path), key))
+        return future
+
+    def complete(self):
+        for future, local_path, key in self.pending:
+            if key in self.fail_keys:
+                future.set_exception(OSError(f"upload failed: {key}"))
+            else:
+                future.set_result({"key": key, "bytes": local_path.stat().st_size, "seconds": 0.0})
+        self.pending = []
+
+    def wait(self):
+        self.complete()
+        return []
+
+
+class StageCheckpointUploadTests(TestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.file = tmp / "drums.mid"
+        self.file.write_bytes(b"midi")
+        self.job = _create_job(status="RUNNING")
+
+    def _checkpoints(self, uploader):
+        storage = mock.Mock()
+        storage.uploader.return_value = uploader
+        return StageCheckpoints(self.job, storage)
+
+    def test_upload_does_not_block_and_records_on_completion(self):
+        uploader = _DeferredUploader()
+        checkpoints = self._checkpoints(uploader)
+
+        checkpoints.upload("midi", {"midi": (self.file, "results/x/drums.mid", "audio/midi")})
+        checkpoints.upload("pdf", {"pdf": (self.file, "results/x/output.pdf", "application/pdf")})
+        # 아직 올라가지 않은 단계는 기록되지 않는다
+        self.assertFalse(checkpoints.has("midi"))
+        self.assertEqual(len(uploader.pending), 2)
+
+        checkpoints.wait()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.checkpoints, {
+            "midi": {"midi": "results/x/drums.mid"},
+            "pdf": {"pdf": "results/x/output.pdf"},
+        })
+
+    def test_failed_upload_is_not_recorded_and_raises_on_wait(self):
+        uploader = _DeferredUploader(fail_keys={"results/x/output.pdf"})
+        checkpoints = self._checkpoints(uploader)
+
+        checkpoints.upload("midi", {"midi": (self.file, "results/x/drums.mid", "audio/midi")})
+        checkpoints.upload("pdf", {"pdf": (self.file, "results/x/output.pdf", "application/pdf")})
+        with self.assertRaises(OSError):
+            checkpoints.wait()
+
+        self.job.refresh_from_db()
+        self.assertEqual(set(self.job.checkpoints), {"midi"})
+
+    def test_uploading_waits_for_finished_stages_when_block_fails(self):
+        uploader = _DeferredUploader()
+        checkpoints = self._checkpoints(uploader)
+
+        with self.assertRaises(RuntimeError):
+            with checkpoints.uploading():
+                checkpoints.upload("midi", {"midi": (self.file, "results/x/drums.mid", "audio/midi")})
+                raise RuntimeError("pdf failed")
+
+        # 재시도는 midi 부터 이어서 실행할 수 있다
+        self.job.refresh_from_db()
+        self.assertIn("midi", self.job.checkpoints)
+
+
+class LegacyRunDrumJobTests(TestCase):
+    def test_hands_active_job_to_chain(self):
+        from jobs import tasks
+
+        job = _create_job(duration=30)
+        with mock.patch.object(tasks, "enqueue_drum_job") as enqueue:
+            tasks.run_drum_job.apply(args=[str(job.id)])
+        enqueue.assert_called_once_with(str(job.id), size="short")
+
+    def test_skips_finished_job(self):
+        from jobs import tasks
+
+        job = _create_job(status="DONE")
+        with mock.patch.object(tasks, "enqueue_drum_job") as enqueue:
+            tasks.run_drum_job.apply(args=[str(job.id)])
+        enqueue.assert_not_called()
+
+
+class PreviewRequestTests(TestCase):
+    def setUp(self):
+        admission._backlogs.clear()
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        storage = LocalStorage(tmp)
+        storage.path("uploads/a.wav").parent.mkdir(parents=True, exist_ok=True)
+        storage.path("uploads/a.wav").write_bytes(_wav_bytes(1.0))
+
+        patches = [
+            mock.patch("jobs.submission.get_storage", return_value=storage),
+            mock.patch("jobs.submission.check_rate_limit", return_value=None),
+            mock.patch("jobs.submission.schedule_drum_job"),
+        ]
+        self.schedule = [p.start() for p in patches][-1]
+        for p in patches:
+            self.addCleanup(p.stop)
+
+    def _start(self, guest_id="guest-1", **data):
+        self.client.cookies["guest_id"] = guest_id
+        return self.client.post(
+            "/api/jobs/drums/start",
+            {"inputKey": "uploads/a.wav", "tempo": 120, **data},
+            content_type="application/json",
+        )
+
+    def _preview_calls(self):
+        return [c for c in self.schedule.call_args_list if c.kwargs.get("size") == scheduler.PREVIEW]
+
+    def test_preview_goes_through_guest_queue_once(self):
+        job_id = self._start(preview=True).json()["jobId"]
+        self._start(guest_id="guest-2", preview=True)
+        self._start(guest_id="guest-3", preview=True)
+
+        self.assertEqual(len(self._preview_calls()), 1)
+        self.assertEqual(self._preview_calls()[0].args, (uuid.UUID(job_id), "guest:guest-1"))
+        self.assertTrue(DrumJob.objects.get(pk=job_id).preview_requested)
+
+    def test_preview_requested_later_on_deduplicated_job(self):
+        job_id = self._start().json()["jobId"]
+        self.assertEqual(self._preview_calls(), [])
+
+        self._start(guest_id="guest-2", preview=True, previewBars=4)
+        self._start(guest_id="guest-3", preview=True, previewBars=8)
+
+        # 나중 요청이 미리보기를 넣고, 이미 요청된 job 에는 다시 넣지 않는다
+        self.assertEqual(len(self._preview_calls()), 1)
+        self.assertEqual(self._preview_calls()[0].args[1], "guest:guest-2")
+        self.assertEqual(DrumJob.objects.get(pk=job_id).preview_bars, 4)
+
+    def test_failed_preview_enqueue_can_be_requested_again(self):
+        failures = [OSError("broker down")]
+
+        def schedule(job_id, lane, size):
+            if size == scheduler.PREVIEW and failures:
+                raise failures.pop()
+
+        self.schedule.side_effect = schedule
+        first = self._start(preview=True)
+        self.assertEqual(first.status_code, 201)
+        self.assertFalse(DrumJob.objects.get(pk=first.json()["jobId"]).preview_requested)
+
+        self._start(guest_id="guest-2", preview=True)
+        self.assertEqual(len(self._preview_calls()), 2)
+        self.assertTrue(DrumJob.objects.get(pk=first.json()["jobId"]).preview_requested)
+
+
+@override_settings(
+    DRUM_SCHED_MAX_DISPATCHED={"short": 1, "long": 1, "preview": 1}, DRUM_SCHED_GUEST_CONCURRENCY=1
+)
+class PreviewSchedulingTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.enqueued = []
+        patches = [
+            mock.patch.object(scheduler, "_get_redis", return_value=self.redis),
+            mock.patch.object(scheduler, "_enqueue", side_effect=self.enqueued.extend),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_preview_has_its_own_slots(self):
+        scheduler.schedule_drum_job("a1", "guest:a", "short")
+        scheduler.schedule_drum_job("a1", "guest:a", scheduler.PREVIEW)
+        scheduler.schedule_drum_job("b1", "guest:b", scheduler.PREVIEW)
+
+        # guest 의 전체 job 이 실행 중이어도 미리보기는 미리보기 자리로 바로, 미리보기끼리는 대기열 순서대로
+        self.assertEqual(self.enqueued, [("a1", "short"), ("a1", scheduler.PREVIEW)])
+
+        # 미리보기 반납은 전체 job 자리를 건드리지 않는다
+        scheduler.release_drum_preview("a1")
+        self.assertEqual(self.enqueued[-1], ("b1", scheduler.PREVIEW))
+        self.assertTrue(self.redis.hexists(scheduler.RUNNING_KEY, "a1"))
+
+    def test_preview_task_releases_its_slot(self):
+        from jobs import tasks
+
+        job = _create_job(status="DONE")
+        with mock.patch.object(tasks, "release_drum_preview") as release:
+            tasks.preview_drum_job.apply(args=[str(job.id)])
+        release.assert_called_once_with(str(job.id))
+
+
+class PreviewTaskTests(TestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.scratch = tmp / "scratch"
+        self.storage = LocalStorage(tmp / "storage")
+        self.calls = []
+
+        self.job = _create_job(duration=1, status="RUNNING", preview_bars=4, preview_requested=True)
+        self.storage.path(self.job.input_key).parent.mkdir(parents=True)
+        self.storage.path(self.job.input_key).write_bytes(_wav_bytes(1.0))
+
+        from jobs import tasks
+
+        scratch_settings = override_settings(
+            DRUM_SCRATCH_DIR=self.scratch, DRUM_SCRATCH_RAM_DIR="", DRUM_SCRATCH_MIN_FREE_BYTES=0
+        )
+        scratch_settings.enable()
+        self.addCleanup(scratch_settings.disable)
+
+        patches = [
+            mock.patch("api.scratch._scratch_space", None),
+            mock.patch.object(tasks, "run_preview_stages", side_effect=self._run_preview_stages),
+            mock.patch.object(tasks, "get_storage", return_value=self.storage),
+            mock.patch.object(tasks, "get_input_cache", return_value=SimpleNamespace(
+                fetch=lambda key, path, storage: storage.start_download(key, path),
+            )),
+            mock.patch("jobs.results.get_storage", return_value=self.storage),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.publish = mock.patch.object(tasks, "_publish").start()
+        self.release = mock.patch.object(tasks, "release_drum_preview").start()
+        self.addCleanup(mock.patch.stopall)
+        self.tasks = tasks
+
+    def _run_preview_stages(self, audio_path, bars, output_dir, audio_stream, **kwargs):
+        self.calls.append(bars)
+        audio_stream.read(44)
+        midi, pdf = output_dir / "preview.mid", output_dir / "preview.pdf"
+        midi.write_bytes(b"MThd")
+        pdf.write_bytes(b"%PDF")
+        return {"midi": midi, "pdf": pdf}
+
+    def _run(self):
+        self.tasks.preview_drum_job.apply(args=[str(self.job.id)])
+        self.release.assert_called_once_with(str(self.job.id))
+        self.job.refresh_from_db()
+
+    def _workspaces(self):
+        return [p for p in self.scratch.iterdir() if not p.name.startswith(".")]
+
+    def test_uploads_preview_without_touching_job_progress(self):
+        preview = build_job_payload(self.job)["preview"]
+        self.assertEqual((preview["ready"], preview["pdfKey"], preview["midiKey"]), (False, None, None))
+
+        self._run()
+
+        self.assertEqual(self.calls, [4])
+        self.assertTrue(self.job.preview_ready)
+        self.assertEqual((self.job.status, self.job.stage, self.job.progress), ("RUNNING", None, 0))
+        self.assertEqual(self.storage.path(f"results/{self.job.id}/preview.mid").read_bytes(), b"MThd")
+        self.assertEqual(self.storage.path(f"results/{self.job.id}/preview.pdf").read_bytes(), b"%PDF")
+        self.publish.assert_called_once()
+        self.assertEqual(self._workspaces(), [])
+
+        preview = build_job_payload(self.job)["preview"]
+        self.assertEqual((preview["bars"], preview["ready"]), (4, True))
+        self.assertTrue(preview["midiKey"].endswith(f"results/{self.job.id}/preview.mid"))
+        self.assertTrue(preview["pdfKey"].endswith(f"results/{self.job.id}/preview.pdf"))
+
+    def test_skips_finished_or_ready_jobs(self):
+        for fields in ({"status": "DONE"}, {"status": "ERROR"}, {"preview_ready": True}):
+            DrumJob.objects.filter(pk=self.job.pk).update(**{"status": "RUNNING", "preview_ready": False, **fields})
+            self.release.reset_mock()
+            self._run()
+
+        self.assertEqual(self.calls, [])
+        self.publish.assert_not_called()
+
+    def test_failure_does_not_affect_job(self):
+        self.tasks.run_preview_stages.side_effect = RuntimeError("boom")
+
+        with self.assertLogs("jobs.tasks", "ERROR"):
+            self._run()
+
+        self.assertFalse(self.job.preview_ready)
+        self.assertEqual((self.job.status, self.job.error_message), ("RUNNING", None))
+        self.publish.assert_not_called()
+        self.assertEqual(self._workspaces(), [])
+
+
+class SubmitDedupeTests(TestCase):
+    def setUp(self):
+        admission._backlogs.clear()
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.storage = LocalStorage(tmp)
+        self.storage.path("uploads/a.wav").parent.mkdir(parents=True, exist_ok=True)
+        self.storage.path("uploads/a.wav").write_bytes(_wav_bytes(1.0))
+
+        patches = [
+            mock.patch("jobs.submission.get_storage", return_value=self.storage),
+            mock.patch("jobs.submission.check_rate_limit", return_value=None),
+            mock.patch("jobs.submission.schedule_drum_job"),
+        ]
+        self.rate_limit, self.schedule = [p.start() for p in patches][1:]
+        for p in patches:
+            self.addCleanup(p.stop)
+
+    def _start(self, guest_id="guest-1", idempotency_key=None, **data):
+        if guest_id:
+            self.client.cookies["guest_id"] = guest_id
+        elif "guest_id" in self.client.cookies:
+            del self.client.cookies["guest_id"]
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        return self.client.post(
+            "/api/jobs/drums/start",
+            {"inputKey": "uploads/a.wav", "tempo": 120, **data},
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_same_idempotency_key_returns_same_job(self):
+        first = self._start(idempotency_key="k1")
+        second = self._start(idempotency_key="k1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.json()["jobId"], second.json()["jobId"])
+        self.assertTrue(second.json()["deduplicated"])
+        self.assertEqual(DrumJob.objects.count(), 1)
+        # 재시도는 새 job 을 만들지 않으므로 제출 속도 제한에도, 대기열에도 한 번만
+        self.assertEqual(self.rate_limit.call_count, 1)
+        self.assertEqual(self.schedule.call_count, 1)
+
+    def test_reused_idempotency_key_with_different_options_is_rejected(self):
+        self._start(idempotency_key="k1")
+        response = self._start(idempotency_key="k1", tempo=90)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(response.json()["ok"])
+        self.assertEqual(DrumJob.objects.count(), 1)
+
+    def test_idempotency_key_ignored_without_guest_cookie(self):
+        first = self._start(guest_id=None, idempotency_key="k1")
+        second = self._start(guest_id=None, idempotency_key="k1", tempo=90)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertFalse(DrumJob.objects.exclude(idempotency_key=None).exists())
+
+    def test_same_input_and_options_reuse_in_flight_job(self):
+        first = self._start(guest_id="guest-1")
+        second = self._start(guest_id="guest-2")
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.json()["jobId"], second.json()["jobId"])
+
+    def test_stale_in_flight_job_is_failed_and_released(self):
+        job_id = self._start().json()["jobId"]
+        stale = timezone.now() - timedelta(seconds=settings.DRUM_JOB_STALE_SECONDS + 60)
+        DrumJob.objects.filter(pk=job_id).update(updated_at=stale)
+
+        with mock.patch("jobs.dedupe.release_drum_job") as release:
+            response = self._start()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.json()["jobId"], job_id)
+        self.assertEqual(DrumJob.objects.get(pk=job_id).status, "ERROR")
+        release.assert_called_once_with(uuid.UUID(job_id))
+
+
+@override_settings(DRUM_SCHED_MAX_DISPATCHED={"short": 1, "long": 1, "preview": 1}, DRUM_SCHED_GUEST_CONCURRENCY=1)
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.enqueued = []
+        patches = [
+            mock.patch.object(scheduler, "_get_redis", return_value=self.redis),
+            mock.patch.object(scheduler, "_enqueue", side_effect=self.enqueued.extend),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _dispatched(self):
+        return [job_id for job_id, _ in self.enqueued]
+
+    def test_round_robin_between_guests(self):
+        for job_id in ("a1", "a2", "a3"):
+            scheduler.schedule_drum_job(job_id, "guest:a", "short")
+        scheduler.schedule_drum_job("b1", "guest:b", "short")
+        self.assertEqual(self._dispatched(), ["a1"])
+
+        # 먼저 차례를 받은 guest 는 뒤로 간다
+        scheduler.release_drum_job("a1")
+        scheduler.release_drum_job("b1")
+        scheduler.release_drum_job("a2")
+        self.assertEqual(self._dispatched(), ["a1", "b1", "a2", "a3"])
+
+    def test_release_is_idempotent(self):
+        scheduler.schedule_drum_job("a1", "guest:a", "short")
+        scheduler.schedule_drum_job("b1", "guest:b", "short")
+        scheduler.schedule_drum_job("c1", "guest:c", "short")
+
+        scheduler.release_drum_job("a1")
+        scheduler.release_drum_job("a1")
+        self.assertEqual(self._dispatched(), ["a1", "b1"])
+
+    @override_settings(DRUM_SCHED_MAX_DISPATCHED={"short": 2, "long": 2, "preview": 1})
+    def test_guest_concurrency_limit(self):
+        scheduler.schedule_drum_job("a1", "guest:a", "short")
+        scheduler.schedule_drum_job("a2", "guest:a", "long")
+        self.assertEqual(self._dispatched(), ["a1"])
+
+    def test_error_after_queueing_does_not_enqueue_directly(self):
+        with mock.patch.object(self.redis, "zadd", side_effect=redis.exceptions.LockError("lock lost")):
+            scheduler.schedule_drum_job("a1", "guest:a", "short")
+        self.assertEqual(self._dispatched(), [])
+
+        # sweep 이 빠진 lane 을 다시 넣고 dispatch
+        self.assertEqual(scheduler.requeue_lost_jobs([("a1", "guest:a", "short")]), [])
+        self.assertEqual(self._dispatched(), ["a1"])
+
+    def test_error_before_queueing_enqueues_directly(self):
+        with mock.patch.object(self.redis, "rpush", side_effect=redis.exceptions.ConnectionError("down")):
+            scheduler.schedule_drum_job("a1", "guest:a", "short")
+        self.assertEqual(self.enqueued, [("a1", "short")])
+
+    def test_failed_dispatch_after_release_is_deferred(self):
+        scheduler.schedule_drum_job("a1", "guest:a", "short")
+        with mock.patch.object(scheduler, "dispatch", side_effect=redis.exceptions.LockError("busy")), \
+                mock.patch.object(scheduler, "_defer_dispatch") as defer:
+            scheduler.release_drum_job("a1")
+        defer.assert_called_once_with()
+        self.assertFalse(self.redis.hexists(scheduler.RUNNING_KEY, "a1"))
+
+    def test_sweep_requeues_pending_jobs_missing_from_redis(self):
+        from jobs.tasks import sweep_drum_jobs
+
+        lost = _create_job(duration=30)
+        fresh = _create_job(guest_id="guest-2", duration=30)
+        old = timezone.now() - timedelta(seconds=settings.DRUM_SCHED_SWEEP_MIN_AGE + 60)
+        DrumJob.objects.filter(pk=lost.pk).update(created_at=old)
+
+        sweep_drum_jobs()
+        sweep_drum_jobs()
+
+        # 방금 만든 job 은 아직 schedule 중일 수 있으므로 건드리지 않고, 다시 넣은 job 은 한 번만 dispatch
+        self.assertEqual(self.enqueued, [(str(lost.id), "short")])
+        self.assertNotIn(str(fresh.id), self._dispatched())
+
+
+# MPEG-1 Layer III, 128kbps, 44.1kHz, 스테레오 프레임 헤더
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x00"
+
+
+def _reader(data: bytes):
+    return lambda start, length: data[start:start + length]
+
+
+class ProbeDurationTests(SimpleTestCase):
+    def test_wav(self):
+        data = _wav_bytes(1.5)
+        self.assertAlmostEqual(probe_duration(_reader(data), len(data)), 1.5)
+
+    def test_streamed_wav_without_data_size_uses_file_size(self):
+        data = bytearray(_wav_bytes(2.0))
+        data_chunk = data.index(b"data")
+        data[data_chunk + 4:data_chunk + 8] = b"\0\0\0\0"
+        self.assertAlmostEqual(probe_duration(_reader(bytes(data)), len(data)), 2.0)
+
+    def test_cbr_mp3(self):
+        # 128kbps = 16000 바이트 / 초
+        data = MP3_FRAME_HEADER + bytes(32000 - 4)
+        self.assertAlmostEqual(probe_duration(_reader(data), len(data)), 2.0)
+
+    def test_cbr_mp3_skips_id3_tag(self):
+        tag = b"ID3\x04\x00\x00" + bytes([0, 0, 0, 100]) + bytes(100)
+        data = tag + MP3_FRAME_HEADER + bytes(16000 - 4)
+        self.assertAlmostEqual(probe_duration(_reader(data), len(data)), 1.0)
+
+    def test_vbr_mp3_uses_xing_frame_count(self):
+        # 헤더 4바이트 + 스테레오 side info 32바이트 뒤에 Xing 헤더 (flags=frames, 100 프레임)
+        xing = b"Xing" + (1).to_bytes(4, "big") + (100).to_bytes(4, "big")
+        data = MP3_FRAME_HEADER + bytes(32) + xing + bytes(4000)
+        self.assertAlmostEqual(probe_duration(_reader(data), len(data)), 100 * 1152 / 44100)
+
+    def test_unknown_format(self):
+        data = b"not an audio file" * 10
+        self.assertIsNone(probe_duration(_reader(data), len(data)))
+
+
+class JobListPaginationTests(TestCase):
+    def setUp(self):
+        admission._backlogs.clear()
+        self.client.cookies["guest_id"] = "guest-1"
+
+    def _list(self, **params):
+        response = self.client.get("/api/jobs/drums", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_every_job_once_in_order(self):
+        jobs = [_create_job() for _ in range(5)]
+        _create_job(guest_id="guest-2")
+        # 같은 created_at 이면 id 로 순서를 정한다
+        same_time = timezone.now()
+        DrumJob.objects.filter(pk__in=[job.pk for job in jobs[:3]]).update(created_at=same_time)
+
+        expected = [
+            str(job.id)
+            for job in DrumJob.objects.filter(guest_id="guest-1").order_by("-created_at", "-id")
+        ]
+        seen = []
+        cursor = None
+        while True:
+            page = self._list(limit=2, **({"cursor": cursor} if cursor else {}))
+            self.assertLessEqual(len(page["jobs"]), 2)
+            seen += [job["jobId"] for job in page["jobs"]]
+            cursor = page["nextCursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+
+    def test_last_full_page_has_no_next_cursor(self):
+        for _ in range(2):
+            _create_job()
+        page = self._list(limit=2)
+        self.assertEqual(len(page["jobs"]), 2)
+        self.assertIsNone(page["nextCursor"])
+
+    def test_invalid_cursor_and_limit(self):
+        self.assertEqual(self.client.get("/api/jobs/drums", {"cursor": "???"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/jobs/drums", {"limit": 0}).status_code, 400)
+
+    def test_without_guest_cookie(self):
+        _create_job()
+        del self.client.cookies["guest_id"]
+        self.assertEqual(self._list(), {"ok": True, "jobs": [], "nextCursor": None})
+
+
+class _FakeTensor:
+    def element_size(self):
+        return 4
+
+    def nelement(self):
+        return 1
+
+
+class CheckpointResumeTests(TestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.storage = LocalStorage(tmp / "storage")
+        self.calls = []
+
+        self.job = _create_job(duration=1, status="RUNNING", owner_task_id="separate-1")
+        self.storage.path(self.job.input_key).parent.mkdir(parents=True)
+        self.storage.path(self.job.input_key).write_bytes(_wav_bytes(1.0))
+        self.ctx = {"job_id": str(self.job.id), "guide_work_key": f"work/{self.job.id}/guide.flac"}
+        self.storage.path(self.ctx["guide_work_key"]).parent.mkdir(parents=True)
+        (tmp / "guide.wav").write_bytes(_wav_bytes(1.0))
+        encode_audio_file(tmp / "guide.wav", "flac", output_path=self.storage.path(self.ctx["guide_work_key"]))
+
+        import drum.pipeline
+        from jobs import tasks
+
+        separation_mix = SimpleNamespace(
+            separate_non_drum=self._separate_non_drum,
+            save_non_drum=self._save_non_drum,
+            load_non_drum=self._load_non_drum,
+            mix_audio_tracks=self._mix_audio_tracks,
+        )
+        scratch_settings = override_settings(
+            DRUM_SCRATCH_DIR=tmp / "scratch", DRUM_SCRATCH_RAM_DIR="", DRUM_SCRATCH_MIN_FREE_BYTES=0
+        )
+        scratch_settings.enable()
+        self.addCleanup(scratch_settings.disable)
+
+        patches = [
+            mock.patch("api.scratch._scratch_space", None),
+            mock.patch.object(drum.pipeline, "_stage_module", lambda name: separation_mix),
+            mock.patch.object(tasks, "get_storage", return_value=self.storage),
+            mock.patch.object(tasks, "get_input_cache", return_value=SimpleNamespace(
+                fetch=lambda key, path, storage: storage.start_download(key, path),
+            )),
+            mock.patch.object(tasks, "_publish"),
+            mock.patch.object(tasks, "release_drum_job"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.tasks = tasks
+
+    def _separate_non_drum(self, path):
+        self.calls.append("separate")
+        return _FakeTensor(), 44100
+
+    def _save_non_drum(self, tensor, sr, path):
+        path.write_bytes(b"non-drum")
+        return path
+
+    def _load_non_drum(self, path):
+        self.calls.append("load")
+        return _FakeTensor(), 44100
+
+    def _mix_audio_tracks(self, non_drum, guide, output_dir, audio_format, sr):
+        self.calls.append("mix")
+        if self.calls.count("mix") == 1:
+            raise RuntimeError("mix failed")
+        path = Path(output_dir) / f"mix.{audio_format}"
+        path.write_bytes(b"mix")
+        return path
+
+    def test_retry_resumes_after_separation_checkpoint(self):
+        result = self.tasks.separate_drum_job.apply(args=[self.ctx], task_id="separate-1")
+
+        self.assertEqual(result.state, "SUCCESS")
+        # 두 번째 시도는 저장해 둔 분리 결과를 받아서 믹스부터 (Demucs 는 한 번만)
+        self.assertEqual(self.calls, ["separate", "mix", "load", "mix"])
+        job = DrumJob.objects.get(pk=self.job.pk)
+        self.assertEqual(job.status, "RUNNING")
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(set(job.checkpoints), {"separation", "mix"})
+        self.assertTrue(self.storage.path(result.result["mix_key"]).exists())
+        # 결과물 가이드는 분리/믹스와 겹쳐서 인코딩해 믹스와 같은 단계에서 올린다
+        self.assertTrue(self.storage.path(job.checkpoints["mix"]["guide"]).exists())
+
+    def test_duplicate_chain_does_not_take_over_running_job(self):
+        result = self.tasks.separate_drum_job.apply(args=[self.ctx], task_id="separate-2")
+
+        self.assertEqual(result.state, "IGNORED")
+        self.assertEqual(self.calls, [])
+        # 실행 중인 원래 task 의 대기열 자리는 그대로
+        self.tasks.release_drum_job.assert_not_called()
+        self.assertEqual(DrumJob.objects.get(pk=self.job.pk).owner_task_id, "separate-1")
+
+
+def _process_running(pid: int) -> bool:
+    # 좀비(아직 회수되지 않은 종료 프로세스)는 종료된 것으로 본다
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return stat[stat.rindex(")") + 2] != "Z"
+
+
+@skipUnless(sys.platform.startswith("linux"), "uses /proc and process groups")
+class WatchdogTests(SimpleTestCase):
+    def test_timeout_kills_process_group(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        pid_file = tmp / "child.pid"
+        hangs = HANG_COUNTS["sleeper"]
+
+        # SIGTERM 을 무시하는 셸 + 그 자식(xvfb-run 이 띄운 Xvfb 처럼 남는 프로세스)
+        command = ["sh", "-c", f"trap '' TERM; sleep 30 & echo $! > {pid_file}; wait"]
+        started = time.monotonic()
+        with self.assertRaises(SubprocessTimeout) as raised:
+            run_supervised(command, tool="sleeper", timeout=0.5, kill_grace=0.2)
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(HANG_COUNTS["sleeper"], hangs + 1)
+        self.assertEqual(raised.exception.to_dict()["code"], "SUBPROCESS_TIMEOUT")
+        self.assertFalse(_process_running(int(pid_file.read_text())))
+
+    def test_non_zero_exit(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            run_supervised(["sh", "-c", "exit 3"], tool="sh", timeout=5)
+
+
+class SubprocessTimeoutFailureTests(TestCase):
+    def test_timeout_fails_job_without_retry(self):
+        # 재시도 횟수가 남아 있어도 바로 실패 처리 (checkpoint 정리 실패는 무시)
+        from jobs import tasks
+
+        job = _create_job(status="RUNNING", stage="pdf")
+        task = SimpleNamespace(name="prepare", request=SimpleNamespace(retries=0), max_retries=3)
+        error = SubprocessTimeout("musescore", 120, ["/usr/bin/mscore", "a.mid"])
+
+        with mock.patch.object(tasks, "_publish"), \
+                mock.patch.object(tasks, "release_drum_job") as release, \
+                mock.patch.object(tasks, "get_storage", side_effect=OSError("storage down")):
+            tasks._handle_failure(task, job, error)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "ERROR")
+        self.assertEqual(job.error_detail["code"], "SUBPROCESS_TIMEOUT")
+        self.assertEqual(job.error_detail["stage"], "pdf")
+        release.assert_called_once_with(job.id)
+
+
+class JobEventStreamTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        server = fakeredis.FakeServer()
+        patches = [
+            mock.patch("jobs.results.get_storage", return_value=LocalStorage(tmp)),
+            mock.patch("jobs.events._get_redis", return_value=fakeredis.FakeRedis(server=server)),
+            mock.patch("redis.asyncio.Redis.from_url", side_effect=lambda url: fakeredis.FakeAsyncRedis(server=server)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    async def _statuses(self, stream, limit=20):
+        # keep-alive 를 빼고 스트림이 끝날 때까지 받은 status 이벤트의 payload
+        payloads = []
+        for _ in range(limit):
+            try:
+                chunk = await anext(stream)
+            except StopAsyncIteration:
+                return payloads
+            if chunk.startswith("event: status"):
+                payloads.append(json.loads(chunk.split("data: ", 1)[1]))
+        self.fail(f"stream did not end: {payloads}")
+
+    async def test_finished_job_sends_final_state_and_ends(self):
+        job = await sync_to_async(_create_job)(status="DONE", progress=100)
+
+        payloads = await self._statuses(_job_event_stream(job.id))
+
+        self.assertEqual([p["status"] for p in payloads], ["DONE"])
+
+    @override_settings(JOB_EVENTS_HEARTBEAT_SECONDS=0.01)
+    async def test_pushes_published_transitions_until_terminal(self):
+        job = await sync_to_async(_create_job)(status="RUNNING", stage="midi", progress=30)
+        stream = _job_event_stream(job.id)
+
+        # 연결 직후 현재 상태 (이때는 이미 subscribe 되어 있음)
+        first = await anext(stream)
+        self.assertEqual(json.loads(first.split("data: ", 1)[1])["progress"], 30)
+
+        publish_job_event(job.id, {"status": "RUNNING", "stage": "separation", "progress": 60})
+        publish_job_event(job.id, {"status": "DONE", "progress": 100})
+        publish_job_event(job.id, {"status": "RUNNING", "progress": 0})
+
+        payloads = await self._statuses(stream)
+        self.assertEqual([(p["status"], p["progress"]) for p in payloads], [("RUNNING", 60), ("DONE", 100)])
+
+    @override_settings(JOB_EVENTS_HEARTBEAT_SECONDS=0.01)
+    async def test_idle_stream_sends_keep_alive(self):
+        job = await sync_to_async(_create_job)(status="PENDING")
+        stream = _job_event_stream(job.id)
+        await anext(stream)
+
+        chunks = [await anext(stream) for _ in range(2)]
+        await stream.aclose()
+
+        self.assertIn(": keep-alive\n\n", chunks)
+
+    async def test_unknown_job_is_404(self):
+        response = await self.async_client.get(f"/api/jobs/drums/{uuid.uuid4()}/events")
+        self.assertEqual(response.status_code, 404)
+
+
+# 분리만 오디오 길이만큼 걸리고 나머지 단계는 0초로 본 처리 속도 (ETA = 남은 오디오 길이의 합)
+SEPARATION_ONLY_RATES = {**{stage: 0.0 for stage in STAGE_ORDER}, "separation": 1.0}
+
+
+@override_settings(
+    DRUM_SCHED_MAX_DISPATCHED={"short": 2, "long": 1, "preview": 1},
+    DRUM_SHORT_JOB_MAX_SECONDS=180,
+    DRUM_ADMISSION_MAX_WAIT_SECONDS=1000,
+    DRUM_ADMISSION_GUEST_MAX_PENDING=5,
+)
+class AdmissionEtaTests(TestCase):
+    def setUp(self):
+        admission._backlogs.clear()
+        self.addCleanup(admission._backlogs.clear)
+        patcher = mock.patch.object(admission, "stage_rates", return_value=SEPARATION_ONLY_RATES)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def _job(self, minutes, duration, guest_id="guest-1", status="PENDING", **fields):
+        job = _create_job(guest_id=guest_id, duration=duration, status=status, **fields)
+        DrumJob.objects.filter(pk=job.pk).update(created_at=self.start + timedelta(minutes=minutes))
+        job.refresh_from_db()
+        return job
+
+    def test_pending_eta_counts_older_jobs_in_same_lane(self):
+        self._job(0, 60)
+        self._job(1, 100, status="RUNNING")
+        self._job(2, 600)  # long lane
+        target = self._job(3, 30)
+        self._job(4, 50)  # 나중에 들어온 job
+
+        # 자기 길이 + 앞선 short job (60 + 100) / short 동시 처리 2
+        self.assertEqual(job_eta_seconds(target), 30 + 80)
+
+    def test_running_and_finished_jobs(self):
+        self._job(0, 60)
+        running = self._job(1, 100, status="RUNNING", stage_timings={
+            "separation": {"startedAt": datetime.fromtimestamp(time.time() - 40).isoformat()},
+        })
+        done = self._job(2, 100, status="DONE")
+
+        # 실행 중인 job 은 대기열을 기다리지 않고, 진행 중인 단계는 지난 시간만큼 뺀다
+        self.assertEqual(job_eta_seconds(running), 60)
+        self.assertIsNone(job_eta_seconds(done))
+
+    @override_settings(DRUM_ADMISSION_MAX_WAIT_SECONDS=100)
+    def test_sheds_load_per_lane(self):
+        for minute, duration in enumerate((120, 150)):
+            self._job(minute, duration, guest_id=f"guest-{minute}")
+
+        # short lane: (120 + 150) / 2 = 135초 대기 > 100초
+        with self.assertRaises(AdmissionRejected) as rejected:
+            admit_drum_job("guest-new", 60)
+        self.assertEqual((rejected.exception.status_code, rejected.exception.code), (503, "SERVER_BUSY"))
+        self.assertEqual(rejected.exception.retry_after, 35)
+
+        # long lane 은 비어 있으므로 받는다 (대기 0 + 자기 길이)
+        self.assertEqual(admit_drum_job("guest-new", 600), 600)
+
+    @override_settings(DRUM_ADMISSION_GUEST_MAX_PENDING=2)
+    def test_guest_pending_limit(self):
+        self._job(0, 10)
+        self._job(1, 10, status="RUNNING")
+        self._job(2, 10, status="DONE")
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            admit_drum_job("guest-1", 10)
+        self.assertEqual(rejected.exception.status_code, 429)
+        self.assertEqual(admit_drum_job("guest-2", 10), 10 + 10)
+
+    def test_backlog_snapshot_is_cached_for_ttl(self):
+        self._job(0, 60)
+        self.assertEqual(backlog_seconds("short"), 60)
+
+        self._job(1, 40)
+        self.assertEqual(backlog_seconds("short"), 60)
+        with override_settings(DRUM_ETA_BACKLOG_TTL=0):
+            self.assertEqual(backlog_seconds("short"), 100)
+
+
+class StageRateTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(admission, "_rates", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _done_jobs(self, count):
+        for _ in range(count):
+            _create_job(status="DONE", duration=10, stage_timings={"separation": {"seconds": 20.0}})
+
+    def test_uses_median_of_recent_history(self):
+        self._done_jobs(admission.MIN_RATE_SAMPLES)
+        rates = admission.stage_rates()
+        self.assertEqual(rates["separation"], 2.0)
+        self.assertEqual(rates["mix"], admission.DEFAULT_STAGE_RATES["mix"])
+
+    def test_falls_back_to_defaults_without_enough_history(self):
+        self._done_jobs(admission.MIN_RATE_SAMPLES - 1)
+        self.assertEqual(admission.stage_rates(), admission.DEFAULT_STAGE_RATES)
+
+
+class JobStoreTests(TestCase):
+    def test_transition_only_from_expected_status(self):
+        job = _create_job(status="RUNNING")
+        stale = DrumJob.objects.get(pk=job.pk)
+
+        self.assertTrue(job.transition("DONE", ["RUNNING"], progress=100))
+        self.assertEqual((job.status, job.progress), ("DONE", 100))
+
+        # 같은 job 을 들고 있던 다른 워커는 끝난 job 을 되돌리지 못한다
+        self.assertFalse(stale.transition("ERROR", ["PENDING", "RUNNING"], error_message="late"))
+        self.assertEqual(stale.status, "RUNNING")
+        row = DrumJob.objects.get(pk=job.pk)
+        self.assertEqual((row.status, row.error_message), ("DONE", None))
+
+    def test_progress_save_does_not_overwrite_status(self):
+        job = _create_job(status="RUNNING")
+        DrumJob.objects.get(pk=job.pk).transition("ERROR", ["RUNNING"], error_message="stale")
+
+        # 진행률 기록은 stage / progress / stage_timings 만 쓴다
+        JobProgress(job).start("mix")
+
+        row = DrumJob.objects.get(pk=job.pk)
+        self.assertEqual((row.status, row.error_message, row.stage), ("ERROR", "stale", "mix"))
+
+    def test_claim(self):
+        job = _create_job()
+        self.assertTrue(job.claim("prepare-1"))
+        self.assertEqual((job.status, job.owner_task_id), ("RUNNING", "prepare-1"))
+
+        other = DrumJob.objects.get(pk=job.pk)
+        # 다른 chain 의 task 는 실행 중인 job 을 가져가지 못한다
+        self.assertFalse(other.claim("prepare-2"))
+        # 같은 task 의 재시도 / 다시 전달된 메시지
+        self.assertTrue(other.claim("prepare-1"))
+        # chain 의 다음 단계가 앞 단계를 이어받고, 그 뒤로 앞 단계는 다시 맡지 못한다
+        self.assertTrue(other.claim("separate-1", parent_task_id="prepare-1"))
+        self.assertFalse(other.claim("prepare-1"))
+
+        other.transition("DONE", ["RUNNING"])
+        self.assertFalse(DrumJob.objects.get(pk=job.pk).claim("separate-1"))
+
+    def test_one_in_flight_job_per_dedupe_key(self):
+        first = _create_job(dedupe_key="same")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            _create_job(dedupe_key="same")
+
+        first.transition("DONE", ["PENDING"])
+        _create_job(dedupe_key="same")
@@ -1,11 +1,18 @@
 from django.urls import path
-from .views import start_drum_job, get_drum_job
+from .views import start_drum_job, get_drum_job, list_drum_jobs
+from .views_events import stream_drum_job
 
 urlpatterns = [
     # POST /api/jobs/drums/start
     path("drums/start", start_drum_job),
 
+    # GET /api/jobs/drums?cursor=...  (guest 의 job 목록, 최신순)
+    path("drums", list_drum_jobs),
+
     # GET /api/jobs/drums/<job_id>
     # DrumJob.id 가 UUIDField 이므로 uuid converter 사용
     path("drums/<uuid:job_id>", get_drum_job),
+
+    # GET /api/jobs/drums/<job_id>/events  (SSE, ASGI 서버에서 실행)
+    path("drums/<uuid:job_id>/events", stream_drum_job),
 ]
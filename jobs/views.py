@@ -1,20 +1,23 @@
-import boto3
-from botocore.config import Config
+import base64
+import hashlib
+import time
+import uuid
+from datetime import datetime
+
 from django.conf import settings
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
+from .admission import AdmissionRejected
+from .dedupe import IdempotencyConflict
 from .models import DrumJob
-from .tasks import run_drum_job
-
-
-aws_region = getattr(settings, "AWS_S3_REGION_NAME", "ap-northeast-2")
-aws_config = Config(signature_version="s3v4")
-
-s3 = boto3.client("s3", region_name=aws_region, config=aws_config)
-BUCKET = settings.AWS_STORAGE_BUCKET_NAME
+from .results import build_job_list_payload, build_job_payload
+from .submission import InputNotFound, submit_drum_job
+from drum.audio.encoding import normalize_audio_format
 
 
 @api_view(["POST"])
@@ -22,7 +25,14 @@ def start_drum_job(request):
     """
     드럼 분석 Job 생성 API
     - 프론트에서 S3 업로드를 끝낸 뒤 호출
-    - inputKey (필수), genre/tempo/level 등 옵션 전달
+    - inputKey (필수), genre/tempo/level/audioFormat 등 옵션 전달
+    - Idempotency-Key 헤더(또는 idempotencyKey)가 같거나, 같은 음원 + 같은 옵션의
+      job 이 진행 중/완료면 새로 실행하지 않고 그 job 을 반환 (200, deduplicated=true)
+      Idempotency-Key 는 guest 쿠키가 있을 때만 쓰고, 같은 key 로 다른 입력 / 옵션을 보내면 422
+    - 대기 작업이 너무 많으면 429(guest 한도) / 503(전체 적체) + Retry-After
+    - etaSeconds: 예상 완료까지 남은 시간(초)
+    - preview=true (previewBars, 기본 DRUM_PREVIEW_BARS): 앞 N 마디만 분석한 MIDI / PDF 를
+      전체 작업과 별도로 먼저 만들어 job 상태의 preview 로 제공 (Demucs 없음)
     """
 
     data = request.data
@@ -39,27 +49,158 @@ def start_drum_job(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    job = DrumJob.objects.create(
-        guest_id=guest_id,
-        input_key=input_key,
-        genre=genre,
-        tempo=tempo or 0,
-        level=level or "Normal",
-        status="PENDING",
-    )
+    try:
+        audio_format = normalize_audio_format(
+            data.get("audioFormat") or settings.DRUM_AUDIO_FORMAT
+        )
+    except ValueError:
+        return Response(
+            {"ok": False, "message": "audioFormat must be one of wav/flac/mp3/opus"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    idempotency_key = request.headers.get("Idempotency-Key") or data.get("idempotencyKey")
+    if idempotency_key and len(idempotency_key) > 64:
+        return Response(
+            {"ok": False, "message": "Idempotency-Key must be at most 64 characters"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    preview_bars = None
+    if _is_true(data.get("preview")):
+        try:
+            preview_bars = int(data.get("previewBars") or settings.DRUM_PREVIEW_BARS)
+        except (TypeError, ValueError):
+            preview_bars = 0
+        if not 1 <= preview_bars <= settings.DRUM_PREVIEW_MAX_BARS:
+            return Response(
+                {"ok": False, "message": f"previewBars must be between 1 and {settings.DRUM_PREVIEW_MAX_BARS}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    try:
+        job, created, eta_seconds = submit_drum_job(
+            guest_id=guest_id,
+            remote_addr=request.META.get("REMOTE_ADDR"),
+            input_key=input_key,
+            genre=genre,
+            tempo=tempo,
+            level=level,
+            audio_format=audio_format,
+            idempotency_key=idempotency_key,
+            preview_bars=preview_bars,
+        )
+    except InputNotFound:
+        return Response(
+            {"ok": False, "message": "input object not found"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    except IdempotencyConflict:
+        return Response(
+            {"ok": False, "message": "Idempotency-Key was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    except AdmissionRejected as e:
+        return Response(
+            {"ok": False, "message": e.message, "retryAfter": e.retry_after},
+            status=e.status_code,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    return _job_accepted_response(job, created=created, eta_seconds=eta_seconds)
 
-    # Celery 비동기 작업 실행
-    run_drum_job.delay(str(job.id))
 
+def _is_true(value) -> bool:
+    # JSON true 와 form 값 "true" / "1" 모두 허용
+    if isinstance(value, str):
+        return value.lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def _job_accepted_response(job: DrumJob, created: bool, eta_seconds: int | None) -> Response:
     return Response(
         {
             "ok": True,
             "jobId": str(job.id),
+            "deduplicated": not created,
+            "etaSeconds": eta_seconds,
         },
-        status=status.HTTP_201_CREATED,
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
     )
 
 
+# 목록에 필요한 컬럼만 읽음 (stage_timings 등 큰 컬럼 제외)
+JOB_LIST_FIELDS = (
+    "id", "status", "stage", "progress", "genre", "tempo", "level", "duration",
+    "audio_format", "pdf_key", "audio_key", "error_message", "created_at", "updated_at",
+)
+
+
+@api_view(["GET"])
+def list_drum_jobs(request):
+    """
+    guest 의 Job 목록 API (최신순)
+    - ?cursor=<nextCursor> 로 다음 페이지, ?limit= 로 페이지 크기 (최대 DRUM_JOB_LIST_MAX_PAGE_SIZE)
+    - offset 대신 (created_at, id) keyset 페이지네이션 → job 이 많아도 페이지마다 인덱스 범위 조회 한 번
+    - DONE 인 job 만 결과물 presigned URL 포함
+    """
+    guest_id = request.COOKIES.get("guest_id")
+
+    try:
+        limit = int(request.query_params.get("limit") or settings.DRUM_JOB_LIST_PAGE_SIZE)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= settings.DRUM_JOB_LIST_MAX_PAGE_SIZE:
+        return Response(
+            {"ok": False, "message": f"limit must be between 1 and {settings.DRUM_JOB_LIST_MAX_PAGE_SIZE}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    cursor = request.query_params.get("cursor")
+    try:
+        after = _decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return Response(
+            {"ok": False, "message": "invalid cursor"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # guest 쿠키가 없으면 보여줄 job 도 없음
+    if not guest_id:
+        return Response({"ok": True, "jobs": [], "nextCursor": None})
+
+    qs = DrumJob.objects.filter(guest_id=guest_id)
+    if after is not None:
+        created_at, job_id = after
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=job_id))
+
+    # 한 개 더 읽어서 다음 페이지가 있는지 판단
+    jobs = list(qs.order_by("-created_at", "-id").only(*JOB_LIST_FIELDS)[:limit + 1])
+    next_cursor = _encode_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+    jobs = jobs[:limit]
+
+    return Response({
+        "ok": True,
+        "jobs": build_job_list_payload(jobs),
+        "nextCursor": next_cursor,
+    })
+
+
+def _encode_cursor(job: DrumJob) -> str:
+    # 마지막 행의 (created_at, id) 를 불투명한 문자열로
+    raw = f"{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, job_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(job_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
 @api_view(["GET"])
 def get_drum_job(request, job_id):
     """
@@ -69,65 +210,42 @@ def get_drum_job(request, job_id):
     """
     job = get_object_or_404(DrumJob, pk=job_id)
 
-    pdf_url = audio_url = midi_url = guide_url = None
-
-    if job.status == "DONE":
-        base_prefix = f"results/{job.id}"
-
-        # 우리가 업로드한 실제 key 규칙
-        midi_key = f"{base_prefix}/drums.mid"
-        pdf_key = job.pdf_key or f"{base_prefix}/output.pdf"
-        guide_key = f"{base_prefix}/guide.wav"
-        mix_key = job.audio_key or f"{base_prefix}/mix.wav"
-
-        pdf_url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": BUCKET,
-                "Key": pdf_key,
-                "ResponseContentDisposition": 'attachment; filename="easheet_score.pdf"',
-            },
-            ExpiresIn=600,
-        )
-        audio_url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": BUCKET,
-                "Key": mix_key,
-                "ResponseContentDisposition": 'attachment; filename="easheet_mix.wav"',
-            },
-            ExpiresIn=600,
-        )
-        midi_url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": BUCKET,
-                "Key": midi_key,
-                "ResponseContentDisposition": 'attachment; filename="easheet_drums.mid"',
-            },
-            ExpiresIn=600,
-        )
-        guide_url = s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": BUCKET,
-                "Key": guide_key,
-                "ResponseContentDisposition": 'attachment; filename="easheet_guide.wav"',
-            },
-            ExpiresIn=600,
-        )
-
-    return Response(
-        {
-            "ok": True,
-            "jobId": str(job.id),
-            "status": job.status,
-            "pdfKey": pdf_url,
-            "audioKey": audio_url,   # mix.wav
-            "midiKey": midi_url,
-            "guideKey": guide_url,
-            "errorMessage": job.error_message,
-            "createdAt": job.created_at,
-            "updatedAt": job.updated_at,
-        }
-    )
+    # 상태가 바뀌지 않았으면 payload 를 만들지 않고(URL 서명 / ETA 계산 없이) 304 로 본문 없이 응답
+    etag = _job_etag(job)
+    if _etag_matches(etag, request.headers.get("If-None-Match", "")):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    payload = build_job_payload(job)
+    return Response(payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _job_etag(job: DrumJob, now: float | None = None) -> str:
+    # 응답 본문(presigned URL 은 워커마다 다르고 etaSeconds 는 시간에 따라 바뀜)이 아니라
+    # job 의 상태로 만든다 → 어느 웹 워커가 받아도 같은 상태면 같은 ETag
+    parts = [
+        job.id,
+        job.status,
+        job.stage,
+        job.progress,
+        job.preview_ready,
+        job.updated_at.isoformat() if job.updated_at else "",
+    ]
+
+    # 상태가 그대로여도 시간이 지나면 바뀌는 값이 본문에 있으면 그 주기로 ETag 도 바꾼다
+    now = int(time.time() if now is None else now)
+    if job.status == "DONE" or job.preview_ready:
+        # presigned URL 은 캐시에서 꺼내도 남은 유효시간이 PRESIGNED_URL_MIN_TTL 이상이므로,
+        # 이 주기로 바꾸면 304 로 계속 쓰던 URL 이 만료되기 전에 새 URL 을 받는다
+        parts.append(f"url:{now // max(1, settings.PRESIGNED_URL_MIN_TTL)}")
+    if job.status in ("PENDING", "RUNNING"):
+        # etaSeconds 는 DRUM_ETA_BACKLOG_TTL 마다 다시 계산하는 적체 기준이라 그보다 자주 바꿀 필요는 없다
+        parts.append(f"eta:{now // max(1, settings.DRUM_ETA_BACKLOG_TTL)}")
+
+    state = "|".join(str(value) for value in parts)
+    return quote_etag(hashlib.sha1(state.encode("utf-8")).hexdigest())
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    # 프록시가 gzip 등으로 붙인 weak ETag(W/"...") 도 같은 것으로 취급
+    candidates = parse_etags(if_none_match)
+    return "*" in candidates or etag in (c.removeprefix("W/") for c in candidates)
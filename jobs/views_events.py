@@ -0,0 +1,94 @@
+import asyncio
+import json
+import logging
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .events import TERMINAL_STATUSES, encode_event, job_channel
+from .models import DrumJob
+from .results import build_job_payload
+
+logger = logging.getLogger(__name__)
+
+
+@require_GET
+async def stream_drum_job(request, job_id):
+    """
+    Job 진행 상황 SSE (Server-Sent Events) 스트림
+    - GET /api/jobs/drums/<job_id>/events
+    - 연결 직후 현재 상태를 한 번 보내고, 이후 워커가 publish 하는 상태/단계 전환을 push
+    - DONE / ERROR 이벤트(최종 URL 포함)를 보낸 뒤 스트림 종료
+    - ASGI 서버(config.asgi)에서 실행해야 연결 하나가 워커를 점유하지 않는다
+    """
+    if not await DrumJob.objects.filter(pk=job_id).aexists():
+        raise Http404("DrumJob not found")
+
+    response = StreamingHttpResponse(
+        _job_event_stream(job_id),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx 버퍼링 끄기
+    return response
+
+
+async def _current_payload(job_id) -> dict:
+    job = await DrumJob.objects.aget(pk=job_id)
+    return await sync_to_async(build_job_payload)(job)
+
+
+def _sse(payload: dict, event: str = "status") -> str:
+    return f"event: {event}\ndata: {encode_event(payload)}\n\n"
+
+
+async def _job_event_stream(job_id):
+    client = aioredis.Redis.from_url(settings.JOB_EVENTS_REDIS_URL)
+    pubsub = client.pubsub()
+
+    try:
+        # DB 상태를 읽기 전에 먼저 subscribe 해야 그 사이의 이벤트를 놓치지 않음
+        await pubsub.subscribe(job_channel(job_id))
+
+        payload = await _current_payload(job_id)
+        yield _sse(payload)
+        if payload["status"] in TERMINAL_STATUSES:
+            return
+
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.JOB_EVENTS_HEARTBEAT_SECONDS,
+            )
+            if message is None:
+                # 프록시가 idle 연결을 끊지 않도록 주기적으로 주석 라인 전송
+                yield ": keep-alive\n\n"
+                continue
+
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            yield f"event: status\ndata: {data}\n\n"
+
+            if _is_terminal(data):
+                return
+    except asyncio.CancelledError:
+        # 클라이언트 연결 종료
+        raise
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+        except Exception as e:
+            logger.warning("[JobEvents] redis cleanup failed job_id=%s: %s", job_id, e)
+
+
+def _is_terminal(data: str) -> bool:
+    try:
+        return json.loads(data).get("status") in TERMINAL_STATUSES
+    except (ValueError, AttributeError):
+        return False